@@ -13,37 +13,54 @@ LIDA 自定义LLM配置文件 - OpenAI客户端方式
 
 import os
 import sys
+import threading
 from pathlib import Path
 
 # 添加项目路径
 sys.path.insert(0, str(Path(__file__).parent))
 
+# 每组后端地址只创建一个LIDA管理器，所有会话共享；数据不保存在管理器中，每次调用时传入
+_lida_managers = {}
+_lida_managers_lock = threading.Lock()
+
 def get_lida_manager():
     """
     获取配置好的LIDA管理器
     使用直接的OpenAI客户端方式
     
+    管理器在进程内共享，调用方需通过 data 参数传入各自的数据，
+    并以 keep_data=False 调用 summarize，不要修改 lida.data
+    
     返回:
         Manager: 配置好的LIDA管理器实例
     """
     from lida import Manager
+    from lida.components.coalescer import CoalescingTextGenerator
+    from lida.components.limiter import RateLimitedTextGenerator
+    from lida.components.registry import text_generators
+    from lida.components.router import RoutingTextGenerator
     import openai
     
-    print("🚀 正在初始化自定义LLM服务...")
+    print("🚀 正在获取自定义LLM服务...")
     
-    # 创建自定义OpenAI客户端
-    client = openai.OpenAI(
-        base_url="http://10.254.28.17:30000/v1",
-        api_key="EMPTY"
-    )
+    # 多个OpenAI兼容地址用逗号分隔，例如 LIDA_LLM_BASE_URLS="http://a:30000/v1,http://b:30000/v1"
+    base_urls = [url.strip() for url in os.environ.get(
+        "LIDA_LLM_BASE_URLS", "http://10.254.28.17:30000/v1").split(",") if url.strip()]
+    endpoint = ",".join(base_urls)
+    
+    lida_manager = _lida_managers.get(endpoint)
+    if lida_manager is not None:
+        return lida_manager
     
     # 创建一个兼容LIDA的文本生成器包装器
     class CustomTextGenerator:
-        def __init__(self, client):
+        def __init__(self, client, raise_errors=False):
             self.client = client
             # 添加LIDA需要的属性
             self.provider = "openai"  # 设置provider属性
             self.model = "default"    # 设置模型名称
+            # 路由模式下需要抛出异常，以便切换到其他后端
+            self.raise_errors = raise_errors
             
         def generate(self, messages=None, config=None, **kwargs):
             """
@@ -140,20 +157,64 @@ def get_lida_manager():
                 
             except Exception as e:
                 print(f"❌ LLM调用失败: {e}")
+                if self.raise_errors:
+                    raise
                 # 返回空响应以避免崩溃
                 class EmptyResponse:
                     def __init__(self):
                         self.text = [{"content": "处理中..."}]
                 return EmptyResponse()
     
-    text_gen = CustomTextGenerator(client)
+    def build_text_gen():
+        # 创建自定义OpenAI客户端（客户端内部维护HTTP连接池）
+        clients = [
+            openai.OpenAI(
+                base_url=base_url,
+                api_key="EMPTY",
+                timeout=float(os.environ.get("LIDA_LLM_TIMEOUT", "120"))
+            )
+            for base_url in base_urls
+        ]
+        if len(clients) == 1:
+            text_gen = CustomTextGenerator(clients[0])
+        else:
+            # 多后端：按延迟路由、慢请求对冲、熔断快速失败
+            text_gen = RoutingTextGenerator(
+                [CustomTextGenerator(client, raise_errors=True) for client in clients],
+                hedge_percentile=0.95
+            )
+        # 限流：每分钟请求数/令牌数预算与最大并发数，例如 LIDA_LLM_RPM=60 LIDA_LLM_MAX_IN_FLIGHT=4
+        rpm = os.environ.get("LIDA_LLM_RPM")
+        tpm = os.environ.get("LIDA_LLM_TPM")
+        max_in_flight = os.environ.get("LIDA_LLM_MAX_IN_FLIGHT")
+        if rpm or tpm or max_in_flight:
+            text_gen = RateLimitedTextGenerator(
+                text_gen,
+                rpm=float(rpm) if rpm else None,
+                tpm=float(tpm) if tpm else None,
+                max_in_flight=int(max_in_flight) if max_in_flight else None
+            )
+        # 合并并发的相同请求（多用户打开同一数据集、重复提交），只向后端发送一次
+        if os.environ.get("LIDA_LLM_COALESCE", "1") == "1":
+            text_gen = CoalescingTextGenerator(text_gen)
+        return text_gen
     
-    # 创建LIDA管理器
-    lida_manager = Manager(text_gen=text_gen)
+    # 复用已初始化的文本生成器，避免每次操作都重新建立连接
+    text_gen = text_generators.get(
+        provider="openai",
+        model="default",
+        endpoint=endpoint,
+        factory=build_text_gen
+    )
     
-    print("✅ 自定义LLM服务初始化成功！")
-    print(f"API地址: http://10.254.28.17:30000/v1")
-    print(f"模型名称: default")
+    # 创建LIDA管理器（并发的首次调用只创建一个）
+    with _lida_managers_lock:
+        lida_manager = _lida_managers.get(endpoint)
+        if lida_manager is None:
+            lida_manager = _lida_managers[endpoint] = Manager(text_gen=text_gen)
+            print("✅ 自定义LLM服务初始化成功！")
+            print(f"API地址: {', '.join(base_urls)}")
+            print(f"模型名称: default")
     
     return lida_manager
 
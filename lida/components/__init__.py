@@ -5,3 +5,9 @@ from .scaffold import *
 from .executor import *
 from .manager import *
 from .persona import *
+from .router import *
+from .limiter import *
+from .coalescer import *
+from .codelibrary import *
+from .annotations import *
+from .datasource import *
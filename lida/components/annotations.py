@@ -0,0 +1,63 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Dict, Optional
+
+from diskcache import Cache
+
+from lida.utils import schema_fingerprint
+
+logger = logging.getLogger("lida")
+
+
+def value_shape(value) -> str:
+    """Shape of a sample value e.g. `A-1023` -> `a-9`, `john@x.com` -> `a@a.a`"""
+    shape = re.sub(r"[0-9]", "9", str(value).strip().lower())
+    shape = re.sub(r"[^\W\d_]", "a", shape)
+    return re.sub(r"(.)\1+", r"\1", shape)
+
+
+def column_signature(field: Dict) -> str:
+    """Signature of a summary field from its cleaned name, dtype and the shape of its samples"""
+    properties = field.get("properties", {})
+    name = re.sub(r"[^0-9a-z]", "", str(field["column"]).lower())
+    shapes = sorted({value_shape(sample) for sample in properties.get("samples") or []})
+    signature = [name, properties.get("dtype", ""), shapes]
+    return hashlib.md5(json.dumps(signature).encode("utf-8")).hexdigest()
+
+
+class ColumnAnnotationCache:
+    """Persistent cache of the semantic type and description of summary fields.
+
+    Annotations are keyed by column signature (see column_signature), so a column such as
+    `order_id` is described by the LLM once and reused in every dataset that has it. Dataset
+    descriptions are kept per schema fingerprint.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        path = path or os.path.join(os.path.expanduser("~"), ".cache", "lida", "column_annotations")
+        self.cache = Cache(path)
+
+    def get(self, field: Dict) -> Optional[Dict]:
+        """Return {"semantic_type": .., "description": ..} for the field, None if not cached"""
+        return self.cache.get(f"column|{column_signature(field)}")
+
+    def put(self, field: Dict) -> None:
+        properties = field.get("properties", {})
+        if properties.get("description"):
+            self.cache.set(f"column|{column_signature(field)}", {
+                "semantic_type": properties.get("semantic_type", ""),
+                "description": properties["description"]})
+
+    def get_dataset(self, summary: Dict) -> Optional[str]:
+        """Return the cached dataset description for the schema of the summary, None if there is none"""
+        return self.cache.get(f"dataset|{schema_fingerprint(summary)}")
+
+    def put_dataset(self, summary: Dict) -> None:
+        if summary.get("dataset_description"):
+            self.cache.set(f"dataset|{schema_fingerprint(summary)}", summary["dataset_description"])
+
+    def clear(self) -> None:
+        self.cache.clear()
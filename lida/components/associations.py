@@ -0,0 +1,107 @@
+import logging
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("lida")
+
+
+def _correlation_ratios(codes: np.ndarray, n_groups: int, values: np.ndarray) -> np.ndarray:
+    """Correlation ratio (eta) between one categorical column and every numeric column at once"""
+    valid = codes >= 0
+    codes, values = codes[valid], values[valid]
+    if len(codes) == 0:
+        return np.zeros(values.shape[1])
+    means = values.mean(axis=0)
+    counts = np.bincount(codes, minlength=n_groups).astype(float)
+    sums = np.zeros((n_groups, values.shape[1]))
+    np.add.at(sums, codes, values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        group_means = sums / counts[:, None]
+        between = np.nansum(counts[:, None] * (group_means - means) ** 2, axis=0)
+        total = ((values - means) ** 2).sum(axis=0)
+        return np.sqrt(np.where(total > 0, between / total, 0.0))
+
+
+def _cramers_v(a: np.ndarray, n_a: int, b: np.ndarray, n_b: int) -> float:
+    """Cramér's V between two factorized categorical columns"""
+    valid = (a >= 0) & (b >= 0)
+    a, b = a[valid], b[valid]
+    n = len(a)
+    if n == 0 or min(n_a, n_b) < 2:
+        return 0.0
+    observed = np.bincount(a * n_b + b, minlength=n_a * n_b).reshape(n_a, n_b).astype(float)
+    expected = observed.sum(axis=1, keepdims=True) * observed.sum(axis=0, keepdims=True) / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        chi2 = np.nansum(np.where(expected > 0, (observed - expected) ** 2 / expected, 0.0))
+    return float(np.sqrt(chi2 / n / (min(n_a, n_b) - 1)))
+
+
+def compute_associations(
+        df: pd.DataFrame, properties_list: List[Dict], top_k: int = 10,
+        max_rows: int = 5000, max_columns: int = 100, max_categories: int = 50) -> List[Dict]:
+    """Rank field pairs by strength of association.
+
+    Uses the larger of |Pearson| and |Spearman| for numeric pairs, the correlation ratio for
+    category-numeric pairs and Cramér's V for category-category pairs, all in [0, 1]. Rows are
+    sampled down to max_rows and, for very wide tables, at most max_columns columns of each
+    kind are considered.
+
+    :return: The top_k pairs as {"fields": [a, b], "measure": .., "score": ..}, strongest first.
+    """
+    if len(df) > max_rows:
+        df = df.sample(max_rows, random_state=42)
+    rng = np.random.default_rng(42)
+
+    numeric, categorical = [], []
+    for field in properties_list:
+        column, properties = field["column"], field["properties"]
+        if column not in df.columns:
+            continue
+        if properties.get("dtype") == "number":
+            numeric.append(column)
+        elif properties.get("dtype") in ("category", "boolean") and \
+                1 < (properties.get("num_unique_values") or 0) <= max_categories:
+            categorical.append(column)
+    if len(numeric) > max_columns:
+        numeric = [numeric[i] for i in sorted(rng.choice(len(numeric), max_columns, replace=False))]
+    if len(categorical) > max_columns:
+        categorical = [categorical[i] for i in sorted(
+            rng.choice(len(categorical), max_columns, replace=False))]
+
+    pairs = []
+    if len(numeric) > 1:
+        numeric_df = df[numeric].apply(pd.to_numeric, errors="coerce")
+        pearson = numeric_df.corr(method="pearson").abs().to_numpy()
+        spearman = numeric_df.rank().corr(method="pearson").abs().to_numpy()
+        rows, cols = np.triu_indices(len(numeric), k=1)
+        for i, j in zip(rows, cols):
+            if np.isnan(pearson[i, j]) and np.isnan(spearman[i, j]):
+                continue
+            use_spearman = np.nan_to_num(spearman[i, j]) > np.nan_to_num(pearson[i, j])
+            pairs.append((float(np.nan_to_num(spearman[i, j] if use_spearman else pearson[i, j])),
+                          numeric[i], numeric[j], "spearman" if use_spearman else "pearson"))
+
+    factorized = {column: pd.factorize(df[column]) for column in categorical}
+    if numeric and categorical:
+        numeric_values = df[numeric].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        # fill missing values with the column mean so they do not add variance
+        column_means = np.nanmean(numeric_values, axis=0)
+        numeric_values = np.where(np.isnan(numeric_values), np.nan_to_num(column_means), numeric_values)
+        for column in categorical:
+            codes, uniques = factorized[column]
+            ratios = _correlation_ratios(codes, len(uniques), numeric_values)
+            for numeric_column, ratio in zip(numeric, ratios):
+                pairs.append((float(np.nan_to_num(ratio)), column, numeric_column, "correlation_ratio"))
+
+    for i, column_a in enumerate(categorical):
+        codes_a, uniques_a = factorized[column_a]
+        for column_b in categorical[i + 1:]:
+            codes_b, uniques_b = factorized[column_b]
+            pairs.append((_cramers_v(codes_a, len(uniques_a), codes_b, len(uniques_b)),
+                          column_a, column_b, "cramers_v"))
+
+    pairs.sort(key=lambda pair: -pair[0])
+    return [{"fields": [a, b], "measure": measure, "score": round(score, 3)}
+            for score, a, b, measure in pairs[:top_k] if score > 0]
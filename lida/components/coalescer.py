@@ -0,0 +1,86 @@
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import Future
+from dataclasses import asdict, is_dataclass
+from typing import Dict, List, Optional, Union
+
+from llmx import TextGenerator, TextGenerationConfig, TextGenerationResponse
+
+logger = logging.getLogger("lida")
+
+
+def request_key(messages: Union[List[Dict], str], config: TextGenerationConfig, **kwargs) -> str:
+    """Hash of the messages, config and extra arguments of a generate call.
+
+    Message content is hashed verbatim, prompts with code differing only in indentation differ.
+    """
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    normalized = [{"role": message.get("role", ""), "content": str(message.get("content", ""))}
+                  for message in messages]
+    config_dict = asdict(config) if is_dataclass(config) else dict(vars(config))
+    params = {"messages": normalized, "config": config_dict, "kwargs": kwargs}
+    return hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class CoalescingTextGenerator(TextGenerator):
+    """Collapse concurrent identical generate calls into a single upstream request (single-flight).
+
+    The first caller for a key issues the request; callers arriving while it is in flight wait
+    for and share its response (or exception). Only calls that accept a shared answer are
+    coalesced, i.e. use_cache is enabled; independent samples (e.g. hedged candidates with
+    use_cache=False) always go upstream, whatever their temperature.
+    """
+
+    def __init__(self, text_gen: TextGenerator, provider: Optional[str] = None) -> None:
+        # a wrapper, responses are cached (or not) by the wrapped generator
+        self.provider = provider or getattr(text_gen, "provider", "openai")
+        self.model_name = getattr(text_gen, "model_name", None)
+        self.text_gen = text_gen
+        self.coalesced = 0
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _shareable(config: TextGenerationConfig) -> bool:
+        return bool(getattr(config, "use_cache", False))
+
+    def generate(
+        self,
+        messages: Union[List[Dict], str],
+        config: TextGenerationConfig = TextGenerationConfig(),
+        **kwargs,
+    ) -> TextGenerationResponse:
+        if not self._shareable(config):
+            return self.text_gen.generate(messages=messages, config=config, **kwargs)
+
+        key = request_key(messages, config, **kwargs)
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.info("Coalescing identical in-flight request %s", key)
+            return future.result()
+
+        try:
+            response = self.text_gen.generate(messages=messages, config=config, **kwargs)
+            future.set_result(response)
+            return response
+        except Exception as exception_error:
+            future.set_exception(exception_error)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def count_tokens(self, text) -> int:
+        count_tokens = getattr(self.text_gen, "count_tokens", None)
+        return count_tokens(text) if count_tokens is not None else len(str(text)) // 4
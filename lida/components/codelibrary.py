@@ -0,0 +1,48 @@
+import logging
+import os
+import re
+from typing import List, Optional
+
+from diskcache import Cache
+
+from lida.datamodel import Goal
+from lida.utils import schema_fingerprint
+
+logger = logging.getLogger("lida")
+
+
+def normalize_goal(goal: Goal) -> str:
+    """Lowercase the goal question and visualization and strip punctuation and extra whitespace"""
+    text = f"{goal.question} | {goal.visualization}".lower()
+    text = re.sub(r"[^\w|]+", " ", text)
+    return " ".join(text.split())
+
+
+class ChartCodeLibrary:
+    """Persistent library of chart code that executed successfully.
+
+    Entries are keyed by (schema fingerprint, normalized goal, library), so code generated for
+    one dataset is reused for any other dataset with the same field names and dtypes, e.g.
+    daily extracts of the same table.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        path = path or os.path.join(os.path.expanduser("~"), ".cache", "lida", "chart_code")
+        self.cache = Cache(path)
+
+    def key(self, summary, goal: Goal, library: str) -> str:
+        return f"{schema_fingerprint(summary)}|{library}|{normalize_goal(goal)}"
+
+    def get(self, summary, goal: Goal, library: str) -> Optional[List[str]]:
+        """Return stored code specs for the schema, goal and library, None if there are none"""
+        return self.cache.get(self.key(summary, goal, library))
+
+    def put(self, summary, goal: Goal, library: str, code_specs: List[str]) -> None:
+        if code_specs:
+            self.cache.set(self.key(summary, goal, library), list(code_specs))
+
+    def remove(self, summary, goal: Goal, library: str) -> None:
+        self.cache.delete(self.key(summary, goal, library))
+
+    def clear(self) -> None:
+        self.cache.clear()
@@ -0,0 +1,95 @@
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from lida.utils import clean_column_name, parse_dates
+
+logger = logging.getLogger("lida")
+
+
+class ColumnarDataSource(object):
+    """Column-oriented dataset that materializes only the columns a chart uses.
+
+    Wraps a Parquet, Feather or Arrow IPC file, a pyarrow Table or a DataFrame. Columns are
+    loaded on first use (for files, by reading only those column chunks), converted to pandas
+    once and cached, so ChartExecutor can hand each chart a frame of just the columns its code
+    references (see validator.used_columns). Column names are cleaned like read_dataframe.
+    """
+
+    def __init__(self, source: Any) -> None:
+        self.source = source
+        # keyed by (column, parsed as dates)
+        self._cache: Dict[Tuple[str, bool], pd.Series] = {}
+        self._lock = threading.Lock()
+        if isinstance(source, pd.DataFrame):
+            names = [str(column) for column in source.columns]
+            self.num_rows = len(source)
+        elif isinstance(source, str):
+            names, self.num_rows = self._file_schema(source)
+        else:
+            # pyarrow Table
+            names, self.num_rows = list(source.column_names), source.num_rows
+        self._names = {clean_column_name(name): name for name in names}
+        self.columns: List[str] = list(self._names)
+
+    @staticmethod
+    def _file_schema(path: str):
+        import pyarrow.parquet as pq
+        if path.endswith(".parquet"):
+            metadata = pq.ParquetFile(path).metadata
+            return list(metadata.schema.names), metadata.num_rows
+        import pyarrow.feather as feather
+        table = feather.read_table(path, memory_map=True)
+        return list(table.column_names), table.num_rows
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def _load(self, names: List[str]) -> Dict[str, pd.Series]:
+        originals = [self._names[name] for name in names]
+        if isinstance(self.source, pd.DataFrame):
+            frame = self.source[[column for column in self.source.columns if str(column) in originals]]
+        elif isinstance(self.source, str):
+            if self.source.endswith(".parquet"):
+                import pyarrow.parquet as pq
+                table = pq.read_table(self.source, columns=originals)
+            else:
+                import pyarrow.feather as feather
+                table = feather.read_table(self.source, columns=originals, memory_map=True)
+            frame = table.to_pandas()
+        else:
+            frame = self.source.select(originals).to_pandas()
+        return {clean_column_name(str(column)): frame[column] for column in frame.columns}
+
+    def to_pandas(self, columns: Optional[Iterable[str]] = None,
+                  parse_date_columns: Iterable[str] = ()) -> pd.DataFrame:
+        """Return a DataFrame of the given columns (all columns if None), in source order.
+
+        Columns in parse_date_columns are parsed to datetime64 (see utils.parse_dates). Raw and
+        parsed columns are cached separately, parsed ones from the raw column if it is cached.
+        """
+        wanted = set(self.columns if columns is None else columns)
+        parse = set(parse_date_columns)
+        keys = [(name, name in parse) for name in self.columns if name in wanted]
+        with self._lock:
+            missing = [key for key in keys if key not in self._cache]
+            if missing:
+                loaded = {}
+                to_load = [name for name, _ in missing if (name, False) not in self._cache]
+                if to_load:
+                    logger.info("Loading %d of %d columns", len(to_load), len(self.columns))
+                    loaded = self._load(to_load)
+                for name, parsed_dates in missing:
+                    series = loaded[name] if name in loaded else self._cache[(name, False)]
+                    if parsed_dates:
+                        parsed = parse_dates(series)
+                        series = series if parsed is None else parsed
+                    self._cache[(name, parsed_dates)] = series
+            series = {name: self._cache[(name, parsed_dates)] for name, parsed_dates in keys}
+        return pd.DataFrame(series, copy=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
@@ -2,10 +2,11 @@ import ast
 import base64
 import importlib
 import io
-import os
+import json
+import logging
 import re
 import traceback
-from typing import Any, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import matplotlib.pyplot as plt
 import matplotlib
@@ -16,7 +17,14 @@ import plotly.io as pio
 matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
 matplotlib.rcParams['axes.unicode_minus'] = False
 
-from lida.datamodel import ChartExecutorResponse, Summary
+from lida.datamodel import ChartExecutorResponse, ExecutionLimits, Summary
+from lida.utils import parse_dates
+from .datasource import ColumnarDataSource
+from .governor import ExecutionGovernor, ExecutionLimitError
+from .reduction import reduce_altair, reduce_matplotlib, reduce_plotly, reduce_points
+from .validator import CodeValidationError, used_columns, validate_code
+
+logger = logging.getLogger("lida")
 
 
 def preprocess_code(code: str) -> str:
@@ -79,16 +87,153 @@ def get_globals_dict(code_string, data):
         else:
             globals_dict[module_name.split(".")[-1]] = obj
 
-    ex_dicts = {"pd": pd, "data": data, "plt": plt}
+    ex_dicts = {"pd": pd, "data": data, "plt": plt, "reduce_points": reduce_points}
     globals_dict.update(ex_dicts)
     return globals_dict
 
 
+def copy_on_write_enabled() -> bool:
+    """True if pandas copies shared column buffers when they are written (always from pandas 3)"""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    try:
+        return pd.get_option("mode.copy_on_write") is True
+    except Exception:
+        return False
+
+
+def isolated_data(data: Any, deep: bool = False) -> Any:
+    """A logically private copy of data for one chart execution.
+
+    A shallow copy shares the column buffers; under Copy-on-Write a column is only copied
+    when the chart code writes to it, and in a forked child writes never reach the caller.
+    Without either, in-place writes (e.g. .loc assignments) reach the shared buffers, so
+    in-process execution asks for a deep copy.
+    """
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return data.copy(deep=deep)
+    return data
+
+
+def render_chart(code: str, data: Any, library: str, max_line_points: Optional[int] = None,
+                 max_scatter_points: Optional[int] = None,
+                 deep_copy: bool = False) -> Tuple[Optional[Dict], Optional[str], List[Dict]]:
+    """Execute preprocessed chart code and return the (spec, raster, reductions) for the library.
+
+    Lines longer than max_line_points and scatters larger than max_scatter_points are reduced
+    before rendering (see reduction); reductions lists what was reduced. The code gets a copy
+    of data, a deep one with deep_copy (see isolated_data).
+    """
+    ex_locals = get_globals_dict(code, isolated_data(data, deep=deep_copy))
+    exec(code, ex_locals, ex_locals)
+    chart = ex_locals["chart"]
+
+    if library == "altair":
+        # 保持原有的数据结构，不修改数据源
+        # 这样图表可以直接使用传入的数据而不需要文件路径
+        chart, reductions = reduce_altair(chart, max_line_points, max_scatter_points)
+        return chart.to_dict(), None, reductions
+    if library == "matplotlib" or library == "seaborn":
+        reductions = reduce_matplotlib(max_line_points, max_scatter_points)
+        buf = io.BytesIO()
+        plt.box(False)
+        plt.grid(color="lightgray", linestyle="dashed", zorder=-10)
+        plt.savefig(buf, format="png", dpi=100, pad_inches=0.2)
+        buf.seek(0)
+        plot_data = base64.b64encode(buf.read()).decode("ascii")
+        plt.close()
+        return None, plot_data, reductions
+    if library == "ggplot":
+        buf = io.BytesIO()
+        chart.save(buf, format="png")
+        return None, base64.b64encode(buf.getvalue()).decode("utf-8"), []
+    if library == "plotly":
+        chart, reductions = reduce_plotly(chart, max_line_points, max_scatter_points)
+        chart_bytes = pio.to_image(chart, 'png')
+        return None, base64.b64encode(chart_bytes).decode('utf-8'), reductions
+    raise Exception(
+        f"Unsupported library. Supported libraries are altair, matplotlib, seaborn, ggplot, plotly. You provided {library}"
+    )
+
+
+def output_size_mb(spec: Optional[Dict], raster: Optional[str]) -> float:
+    """Size of the rendered output in megabytes"""
+    size = 0
+    if raster:
+        # base64 encodes 3 bytes in 4 characters
+        size += len(raster) * 3 / 4
+    if spec:
+        size += len(json.dumps(spec, default=str))
+    return size / (1024 * 1024)
+
+
 class ChartExecutor:
     """Execute code and return chart object"""
 
-    def __init__(self) -> None:
-        pass
+    def __init__(self, limits: Optional[ExecutionLimits] = None, validate: bool = True,
+                 project_columns: bool = True,
+                 max_line_points: Optional[int] = 2000, max_scatter_points: Optional[int] = 10000) -> None:
+        self.governor = ExecutionGovernor(limits)
+        self.validate = validate
+        self.project_columns = project_columns
+        # render-time point reduction thresholds, None disables the reduction
+        self.max_line_points = max_line_points
+        self.max_scatter_points = max_scatter_points
+
+    @staticmethod
+    def date_fields(summary: Summary) -> List[str]:
+        """Columns the summary types as dates"""
+        return [field.get("column") for field in summary.fields or []
+                if isinstance(field, dict) and field.get("properties", {}).get("dtype") == "date"]
+
+    @staticmethod
+    def _string_date_fields(code: str, date_fields: List[str]) -> List[str]:
+        """Date fields the code uses as strings, e.g. data["Date"].str[:4]"""
+        return [column for column in date_fields if re.search(
+            r"""(\[\s*['"]%s['"]\s*\]|\.%s)\.str\b""" % (re.escape(column), re.escape(column)), code)]
+
+    def materialize(self, data: Any, code: str, summary: Summary, typed: Any = None) -> Any:
+        """Return the data handed to one chart's code.
+
+        For a ColumnarDataSource only the columns the code references are materialized (all
+        columns if the usage is dynamic, see used_columns); other data is passed as typed (see
+        typed_data). Date fields the code uses as strings keep their original values.
+        """
+        date_fields = self.date_fields(summary)
+        string_dates = self._string_date_fields(code, date_fields)
+        if isinstance(data, ColumnarDataSource):
+            columns = used_columns(code, data.columns) if self.project_columns else None
+            return data.to_pandas(columns, parse_date_columns=[
+                column for column in date_fields if column not in string_dates])
+        if typed is None or typed is data:
+            return data
+        if string_dates:
+            typed = typed.copy(deep=False)
+            for column in string_dates:
+                if column in data.columns:
+                    typed[column] = data[column]
+        return typed
+
+    def typed_data(self, data: Any, summary: Summary) -> Any:
+        """Return data with the summary's date fields parsed to datetime64.
+
+        Date strings are parsed once, so the pd.to_datetime calls in generated code are no-ops;
+        Manager parses them when data is summarized and passes the result to execute. Columns
+        with values that are not valid dates are left as they are.
+        """
+        if not isinstance(data, pd.DataFrame):
+            return data
+        date_fields = [column for column in self.date_fields(summary) if column in data.columns
+                       and not pd.api.types.is_datetime64_any_dtype(data[column])]
+        if not date_fields:
+            return data
+
+        typed = data.copy(deep=False)
+        for column in date_fields:
+            parsed = parse_dates(data[column])
+            if parsed is not None:
+                typed[column] = parsed
+        return typed
 
     def execute(
         self,
@@ -97,8 +242,13 @@ class ChartExecutor:
         summary: Summary,
         library="altair",
         return_error: bool = False,
+        typed: Any = None,
     ) -> Any:
-        """Validate and convert code"""
+        """Validate and convert code.
+
+        typed is data with the summary's date fields already parsed (see typed_data), it is
+        computed here if None.
+        """
 
         # # check if user has given permission to execute code. if env variable
         # # LIDA_ALLOW_CODE_EVAL is set to '1'. Else raise exception
@@ -109,176 +259,63 @@ class ChartExecutor:
         if isinstance(summary, dict):
             summary = Summary(**summary)
 
+        if library not in ["altair", "matplotlib", "seaborn", "ggplot", "plotly"]:
+            raise Exception(
+                f"Unsupported library. Supported libraries are altair, matplotlib, seaborn, ggplot, plotly. You provided {library}"
+            )
+
         charts = []
-        code_spec_copy = code_specs.copy()
+        if typed is None:
+            typed = self.typed_data(data, summary)
+        # in process execution without Copy-on-Write must not write through to the caller's data
+        deep_copy = not self.governor.can_isolate and not copy_on_write_enabled()
         code_specs = [preprocess_code(code) for code in code_specs]
-        if library == "altair":
-            for code in code_specs:
-                try:
-                    ex_locals = get_globals_dict(code, data)
-                    exec(code, ex_locals, ex_locals)
-                    chart = ex_locals["chart"]
-                    vega_spec = chart.to_dict()
-                    # 保持原有的数据结构，不修改数据源
-                    # 这样图表可以直接使用传入的数据而不需要文件路径
-                    charts.append(
-                        ChartExecutorResponse(
-                            spec=vega_spec,
-                            status=True,
-                            raster=None,
-                            code=code,
-                            library=library,
-                        )
-                    )
-                except Exception as exception_error:
-                    print(code_spec_copy, "\n===========\n")
-                    print(exception_error)
-                    print(traceback.format_exc())
-                    if return_error:
-                        charts.append(
-                            ChartExecutorResponse(
-                                spec=None,
-                                status=False,
-                                raster=None,
-                                code=code,
-                                library=library,
-                                error={
-                                    "message": str(exception_error),
-                                    "traceback": traceback.format_exc(),
-                                },
-                            )
-                        )
-            return charts
-        elif library == "matplotlib" or library == "seaborn":
-            # print colum dtypes
-            for code in code_specs:
-                try:
-                    ex_locals = get_globals_dict(code, data)
-                    # print(ex_locals)
-                    exec(code, ex_locals, ex_locals)
-                    chart = ex_locals["chart"]
-                    if plt:
-                        buf = io.BytesIO()
-                        plt.box(False)
-                        plt.grid(color="lightgray", linestyle="dashed", zorder=-10)
-                        # try:
-                        #     plt.draw()
-                        #     # plt.tight_layout()
-                        # except AttributeError:
-                        #     print("Warning: tight_layout encountered an error. The layout may not be optimal.")
-                        #     pass
-
-                        plt.savefig(buf, format="png", dpi=100, pad_inches=0.2)
-                        buf.seek(0)
-                        plot_data = base64.b64encode(buf.read()).decode("ascii")
-                        plt.close()
-                    charts.append(
-                        ChartExecutorResponse(
-                            spec=None,
-                            status=True,
-                            raster=plot_data,
-                            code=code,
-                            library=library,
-                        )
+        limits = self.governor.limits
+        for code in code_specs:
+            try:
+                # fail fast on unknown columns or dtype misuse before paying for execution
+                if self.validate:
+                    diagnostics = validate_code(code, summary)
+                    if diagnostics:
+                        raise CodeValidationError(diagnostics)
+                spec, raster, reductions = self.governor.run(
+                    render_chart, code, self.materialize(data, code, summary, typed), library,
+                    self.max_line_points, self.max_scatter_points, deep_copy)
+                if limits.max_image_mb and output_size_mb(spec, raster) > limits.max_image_mb:
+                    raise ExecutionLimitError(
+                        "max_image_mb", limits.max_image_mb,
+                        f"Chart output of {output_size_mb(spec, raster):.2f} MB exceeds the limit of {limits.max_image_mb} MB")
+                charts.append(
+                    ChartExecutorResponse(
+                        spec=spec,
+                        status=True,
+                        raster=raster,
+                        code=code,
+                        library=library,
+                        reductions=reductions or None,
                     )
-                except Exception as exception_error:
-                    print(code_spec_copy[0])
-                    print("****\n", str(exception_error))
-                    # print(traceback.format_exc())
-                    if return_error:
-                        charts.append(
-                            ChartExecutorResponse(
-                                spec=None,
-                                status=False,
-                                raster=None,
-                                code=code,
-                                library=library,
-                                error={
-                                    "message": str(exception_error),
-                                    "traceback": traceback.format_exc(),
-                                },
-                            )
-                        )
-            return charts
-        elif library == "ggplot":
-            # print colum dtypes
-            for code in code_specs:
-                try:
-                    ex_locals = get_globals_dict(code, data)
-                    exec(code, ex_locals)
-                    chart = ex_locals["chart"]
-                    if plt:
-                        buf = io.BytesIO()
-                        chart.save(buf, format="png")
-                        plot_data = base64.b64encode(buf.getvalue()).decode("utf-8")
+                )
+            except Exception as exception_error:
+                error = {
+                    "message": str(exception_error),
+                    "traceback": getattr(exception_error, "traceback", None) or traceback.format_exc(),
+                }
+                if isinstance(exception_error, ExecutionLimitError):
+                    error["limit"] = exception_error.limit
+                    error["limit_value"] = exception_error.value
+                if isinstance(exception_error, CodeValidationError):
+                    error["traceback"] = str(exception_error)
+                    error["diagnostics"] = exception_error.diagnostics
+                logger.info("Chart execution failed: %s\n%s", error["message"], code)
+                if return_error:
                     charts.append(
                         ChartExecutorResponse(
                             spec=None,
-                            status=True,
-                            raster=plot_data,
+                            status=False,
+                            raster=None,
                             code=code,
                             library=library,
+                            error=error,
                         )
                     )
-                except Exception as exception_error:
-                    print(code)
-                    print(traceback.format_exc())
-                    if return_error:
-                        charts.append(
-                            ChartExecutorResponse(
-                                spec=None,
-                                status=False,
-                                raster=None,
-                                code=code,
-                                library=library,
-                                error={
-                                    "message": str(exception_error),
-                                    "traceback": traceback.format_exc(),
-                                },
-                            )
-                        )
-            return charts
-
-        elif library == "plotly":
-            for code in code_specs:
-                try:
-                    ex_locals = get_globals_dict(code, data)
-                    exec(code, ex_locals)
-                    chart = ex_locals["chart"]
-
-                    if pio:
-                        chart_bytes = pio.to_image(chart, 'png')
-                        plot_data = base64.b64encode(chart_bytes).decode('utf-8')
-
-                        charts.append(
-                            ChartExecutorResponse(
-                                spec=None,
-                                status=True,
-                                raster=plot_data,
-                                code=code,
-                                library=library,
-                            )
-                        )
-                except Exception as exception_error:
-                    print(code)
-                    print(traceback.format_exc())
-                    if return_error:
-                        charts.append(
-                            ChartExecutorResponse(
-                                spec=None,
-                                status=False,
-                                raster=None,
-                                code=code,
-                                library=library,
-                                error={
-                                    "message": str(exception_error),
-                                    "traceback": traceback.format_exc(),
-                                },
-                            )
-                        )
-            return charts
-
-        else:
-            raise Exception(
-                f"Unsupported library. Supported libraries are altair, matplotlib, seaborn, ggplot, plotly. You provided {library}"
-            )
+        return charts
@@ -1,8 +1,10 @@
 import json
 import logging
+from typing import List, Tuple
 from lida.utils import clean_code_snippet
 from llmx import TextGenerator
 from lida.datamodel import Goal, TextGenerationConfig, Persona
+from .semantic import name_tokens
 
 
 SYSTEM_INSTRUCTIONS = """
@@ -63,3 +65,128 @@ class GoalExplorer():
             raise ValueError(
                 "The model did not return a valid JSON object while attempting generate goals. Consider using a larger model or a model with higher max token length.")
         return result
+
+
+# trailing column name tokens of identifiers e.g. order_id, CustomerID, rowIndex
+ID_TOKENS = {"id", "key", "uuid", "index"}
+# persona words that say nothing about which fields matter
+PERSONA_STOPWORDS = {"the", "and", "who", "with", "about", "data", "analyst", "highly", "skilled",
+                     "can", "come", "complex", "insightful", "goals", "interested", "for", "that"}
+
+
+def is_identifier(field: dict) -> bool:
+    tokens = name_tokens(str(field["column"]))
+    return bool(tokens) and tokens[-1] in ID_TOKENS or \
+        field.get("properties", {}).get("semantic_type") == "identifier"
+
+
+class HeuristicGoalExplorer():
+    """Derive ranked goals directly from summary statistics, without an LLM.
+
+    Goals cover distributions of numeric fields, breakdowns of low cardinality categories,
+    trends of numeric fields over date fields and relationships between numeric fields. Goals
+    on fields named in the persona are ranked higher. The visualization text uses the patterns
+    understood by VizRuleGenerator, so the resulting charts can also be rendered without an LLM.
+    """
+
+    def __init__(self, max_categories: int = 20) -> None:
+        self.max_categories = max_categories
+
+    @staticmethod
+    def _fields(summary) -> List[dict]:
+        fields = summary.get("fields") if isinstance(summary, dict) else summary.fields
+        return [field for field in fields or [] if isinstance(field, dict) and "column" in field]
+
+    def candidates(self, summary) -> List[Tuple[float, Goal]]:
+        """Return (score, goal) pairs for every applicable goal template"""
+        numeric, categorical, dates = [], [], []
+        for field in self._fields(summary):
+            column, properties = str(field["column"]), field.get("properties", {})
+            if is_identifier(field):
+                continue
+            dtype = properties.get("dtype")
+            n_unique = properties.get("num_unique_values") or 0
+            if dtype == "number" and n_unique > 1:
+                numeric.append((column, properties))
+            elif dtype in ("category", "boolean") and 1 < n_unique <= self.max_categories:
+                categorical.append((column, properties))
+            elif dtype == "date":
+                dates.append((column, properties))
+
+        candidates = []
+        for column, properties in numeric:
+            n_unique = properties.get("num_unique_values") or 0
+            # continuous fields make more informative histograms than near-constant ones
+            score = 0.5 + 0.2 * min(n_unique, 50) / 50
+            candidates.append((score, Goal(
+                question=f"What is the distribution of {column}?",
+                visualization=f"histogram of {column}",
+                rationale=f"A histogram of {column} shows its range, central tendency, skew and outliers.")))
+
+        for column, properties in categorical:
+            n_unique = properties.get("num_unique_values") or 0
+            # breakdowns with a handful of groups are easiest to compare
+            score = 0.75 if 3 <= n_unique <= 12 else 0.6
+            candidates.append((score, Goal(
+                question=f"How many records are there for each {column}?",
+                visualization=f"bar chart of count by {column}",
+                rationale=f"Counting records per {column} ({n_unique} groups) shows how the data is split across groups and which dominate.")))
+
+        for date_column, _ in dates:
+            for column, _ in numeric[:3]:
+                candidates.append((0.85, Goal(
+                    question=f"How does {column} change over {date_column}?",
+                    visualization=f"line of {column} over {date_column}",
+                    rationale=f"Plotting the average {column} over {date_column} reveals trends, seasonality and breaks over time.")))
+
+        for score, (x, y) in self._related_pairs(summary, numeric):
+            candidates.append((score, Goal(
+                question=f"What is the relationship between {x} and {y}?",
+                visualization=f"scatter of {x} vs {y}",
+                rationale=f"A scatter plot of {x} against {y} shows whether the two fields move together and highlights clusters or outliers.")))
+
+        return candidates
+
+    @staticmethod
+    def _related_pairs(summary, numeric: list) -> List[Tuple[float, Tuple[str, str]]]:
+        """Numeric pairs worth a scatter plot, ranked by association strength when available"""
+        associations = summary.get("associations") if isinstance(summary, dict) else \
+            getattr(summary, "associations", None)
+        names = [column for column, _ in numeric]
+        if associations:
+            return [(0.5 + 0.45 * association["score"], tuple(association["fields"]))
+                    for association in associations
+                    if association["measure"] in ("pearson", "spearman")
+                    and all(field in names for field in association["fields"])]
+        names = names[:5]
+        return [(0.55, (x, y)) for i, x in enumerate(names) for y in names[i + 1:]]
+
+    def persona_fields(self, summary, persona: Persona = None) -> List[str]:
+        """Columns sharing a word with the persona description"""
+        if not persona:
+            return []
+        words = {token for token in name_tokens(f"{persona.persona} {persona.rationale or ''}")
+                 if len(token) > 2 and token not in PERSONA_STOPWORDS}
+        return [str(field["column"]) for field in self._fields(summary)
+                if words & set(name_tokens(str(field["column"])))]
+
+    def generate(self, summary, n: int = 5, persona: Persona = None) -> List[Goal]:
+        """Generate the n highest ranked goals, alternating goal types where possible"""
+        relevant = self.persona_fields(summary, persona)
+        ranked = sorted(
+            ((score + (0.2 if any(column in goal.visualization for column in relevant) else 0.0), goal)
+             for score, goal in self.candidates(summary)),
+            key=lambda item: -item[0])
+        goals, seen_kinds, deferred = [], set(), []
+        # favour variety: the best goal of each kind first, then the rest by score
+        for score, goal in ranked:
+            kind = goal.visualization.split(" of ")[0]
+            if kind in seen_kinds:
+                deferred.append(goal)
+                continue
+            seen_kinds.add(kind)
+            goals.append(goal)
+        goals = (goals + deferred)[:n]
+        for index, goal in enumerate(goals):
+            goal.index = index
+        return goals
@@ -0,0 +1,169 @@
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import traceback
+from typing import Any, Callable, Optional
+
+from lida.datamodel import ExecutionLimits
+
+try:
+    import resource
+except ImportError:  # resource is unavailable on windows
+    resource = None
+
+logger = logging.getLogger("lida")
+
+
+class ExecutionLimitError(Exception):
+    """Raised when generated code exceeds one of the configured execution limits"""
+
+    def __init__(self, limit: str, value: Any, message: str) -> None:
+        super().__init__(message)
+        self.limit = limit
+        self.value = value
+
+
+class RemoteExecutionError(Exception):
+    """Raised in the parent when generated code failed inside the child process"""
+
+    def __init__(self, message: str, traceback_str: str) -> None:
+        super().__init__(message)
+        self.traceback = traceback_str
+
+
+def _address_space_bytes() -> int:
+    """Return the current virtual memory size of this process (0 if unknown)"""
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _children_cpu_time() -> float:
+    """Cpu seconds used by the terminated and waited for children of this process"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _apply_rlimits(limits: ExecutionLimits) -> None:
+    """Apply cpu and address space rlimits to the current (child) process"""
+    if resource is None:
+        return
+    if limits.cpu_time:
+        cpu_time = int(limits.cpu_time)
+        # soft limit sends SIGXCPU, hard limit a second later sends SIGKILL
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_time, cpu_time + 1))
+    if limits.memory_mb:
+        # the forked child already maps everything the parent had, so the budget
+        # is added on top of the inherited address space
+        budget = _address_space_bytes() + int(limits.memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (budget, budget))
+
+
+def _governed_target(conn, limits: ExecutionLimits, fn: Callable, args: tuple) -> None:
+    """Entry point of the child process, sends (status, payload) back to the parent"""
+    try:
+        _apply_rlimits(limits)
+        result = fn(*args)
+        conn.send(("ok", result))
+    except MemoryError:
+        conn.send(("limit", "memory_mb"))
+    except Exception as exception_error:
+        conn.send(("error", (str(exception_error), traceback.format_exc())))
+    finally:
+        conn.close()
+
+
+class ExecutionGovernor:
+    """Run a callable under wall clock, cpu time and memory limits.
+
+    When isolation is enabled (and fork is available), the callable runs in a child process.
+    The parent waits for at most `timeout` seconds and kills the child if it does not answer
+    in time. Otherwise the callable runs in process without any limits.
+
+    A single threaded process forks the child, which inherits the data without copying.
+    Forking a process with other threads can deadlock the child on locks those threads hold
+    (logging, matplotlib, BLAS), so threaded callers (thread pools, web servers) start the
+    child from a forkserver instead and the arguments are pickled.
+    """
+
+    def __init__(self, limits: Optional[ExecutionLimits] = None) -> None:
+        self.limits = limits or ExecutionLimits()
+
+    @property
+    def can_isolate(self) -> bool:
+        return self.limits.isolate and "fork" in multiprocessing.get_all_start_methods()
+
+    def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) and return its result or raise ExecutionLimitError"""
+        if not self.can_isolate:
+            return fn(*args)
+
+        ctx = self._context(fn)
+        cpu_before = _children_cpu_time()
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        process = ctx.Process(
+            target=_governed_target, args=(child_conn, self.limits, fn, args), daemon=True)
+        process.start()
+        child_conn.close()
+
+        try:
+            if not parent_conn.poll(self.limits.timeout):
+                process.kill()
+                raise ExecutionLimitError(
+                    "timeout", self.limits.timeout,
+                    f"Chart execution exceeded the wall clock limit of {self.limits.timeout} seconds")
+            try:
+                status, payload = parent_conn.recv()
+            except EOFError:
+                # the child died without answering, most likely killed by an rlimit
+                process.join()
+                # forkserver children are not children of this process, their usage is unknown
+                cpu_used = _children_cpu_time() - cpu_before if ctx.get_start_method() == "fork" else None
+                raise self._limit_from_exitcode(process.exitcode, cpu_used)
+        finally:
+            parent_conn.close()
+            process.join(1)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+        if status == "limit":
+            raise ExecutionLimitError(
+                payload, getattr(self.limits, payload),
+                f"Chart execution exceeded the {payload} limit of {getattr(self.limits, payload)}")
+        if status == "error":
+            message, traceback_str = payload
+            raise RemoteExecutionError(message, traceback_str)
+        return payload
+
+    @staticmethod
+    def _context(fn: Callable):
+        if threading.active_count() == 1:
+            return multiprocessing.get_context("fork")
+        if "forkserver" not in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context("spawn")
+        ctx = multiprocessing.get_context("forkserver")
+        # only takes effect before the forkserver starts, its children then fork with fn loaded
+        ctx.set_forkserver_preload([fn.__module__])
+        return ctx
+
+    def _limit_from_exitcode(self, exitcode: Optional[int],
+                             cpu_used: Optional[float] = None) -> ExecutionLimitError:
+        # the soft cpu limit sends SIGXCPU, a SIGKILL is only the hard cpu limit if the child
+        # used that much cpu (the OOM killer also sends SIGKILL)
+        cpu_exceeded = exitcode == -signal.SIGXCPU or (
+            exitcode == -signal.SIGKILL and cpu_used is not None and cpu_used >= (self.limits.cpu_time or 0))
+        if cpu_exceeded and self.limits.cpu_time:
+            return ExecutionLimitError(
+                "cpu_time", self.limits.cpu_time,
+                f"Chart execution exceeded the cpu time limit of {self.limits.cpu_time} seconds")
+        return ExecutionLimitError(
+            "memory_mb", self.limits.memory_mb,
+            f"Chart execution process terminated unexpectedly (exit code {exitcode}), "
+            f"likely exceeding the memory limit of {self.limits.memory_mb} MB")
@@ -0,0 +1,199 @@
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, List, Optional, Union
+
+from llmx import TextGenerator, TextGenerationConfig, TextGenerationResponse
+
+logger = logging.getLogger("lida")
+
+# lower values are served first
+INTERACTIVE = 0
+BATCH = 10
+
+_priority = contextvars.ContextVar("lida_llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Set the queueing priority of LLM calls made in this context e.g. with llm_priority(BATCH):"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def submit_in_context(pool: Executor, fn: Callable, *args, **kwargs) -> Future:
+    """Submit fn to a thread pool in a copy of the caller's context, so e.g. llm_priority applies.
+
+    Thread pool workers do not inherit the context variables of the submitting thread.
+    """
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute` tokens per minute.
+
+    The bucket holds at most `burst_seconds` worth of tokens, so even a cold start spreads the
+    per-minute budget over the minute instead of spending it at once.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 5.0) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (requests above capacity wait for a full bucket)"""
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        # may go negative for requests above capacity, later requests then wait longer
+        self.tokens -= amount
+
+    def refund(self, amount: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimitedTextGenerator(TextGenerator):
+    """Wrap a text generator with requests/tokens per minute budgets and a max in-flight cap.
+
+    Calls wait in a priority queue (see llm_priority) until the head of the queue fits all
+    budgets, so the backend receives a steady stream at its sustainable rate instead of bursts
+    that end in 429s. Token usage is estimated up front from the prompt and max_tokens and
+    corrected with the usage the backend reports.
+    """
+
+    def __init__(
+        self,
+        text_gen: TextGenerator,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_in_flight: Optional[int] = None,
+        burst_seconds: float = 5.0,
+        provider: Optional[str] = None,
+    ) -> None:
+        # a wrapper, responses are cached (or not) by the wrapped generator
+        self.provider = provider or getattr(text_gen, "provider", "openai")
+        self.model_name = getattr(text_gen, "model_name", None)
+        self.text_gen = text_gen
+        self.requests = TokenBucket(rpm, burst_seconds) if rpm else None
+        self.tokens = TokenBucket(tpm, burst_seconds) if tpm else None
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._waiting: List = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._wait_times = deque(maxlen=1000)
+        self._total_wait = 0.0
+        self._total_calls = 0
+
+    def estimate_tokens(self, messages: Union[List[Dict], str], config: TextGenerationConfig) -> int:
+        text = messages if isinstance(messages, str) else json.dumps(messages, default=str)
+        count_tokens = getattr(self.text_gen, "count_tokens", None)
+        try:
+            prompt_tokens = count_tokens(text) if count_tokens is not None else None
+        except NotImplementedError:
+            prompt_tokens = None
+        if prompt_tokens is None:
+            # roughly four characters per token
+            prompt_tokens = len(text) // 4
+        return prompt_tokens + (config.max_tokens or 0) * (config.n or 1)
+
+    def _delay(self, estimated_tokens: int) -> float:
+        """Seconds until the head of the queue may start, 0 if it can start now"""
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return float("inf")
+        delay = 0.0
+        if self.requests:
+            delay = max(delay, self.requests.wait_time(1))
+        if self.tokens:
+            delay = max(delay, self.tokens.wait_time(estimated_tokens))
+        return delay
+
+    def _acquire(self, estimated_tokens: int) -> None:
+        entry = (_priority.get(), next(self._counter))
+        enqueued = time.monotonic()
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            while True:
+                if self._waiting[0] == entry:
+                    delay = self._delay(estimated_tokens)
+                    if delay <= 0:
+                        break
+                    self._condition.wait(None if delay == float("inf") else delay)
+                else:
+                    self._condition.wait()
+            heapq.heappop(self._waiting)
+            if self.requests:
+                self.requests.consume(1)
+            if self.tokens:
+                self.tokens.consume(estimated_tokens)
+            self.in_flight += 1
+            waited = time.monotonic() - enqueued
+            self._wait_times.append(waited)
+            self._total_wait += waited
+            self._total_calls += 1
+            # let the next caller re-evaluate its position
+            self._condition.notify_all()
+
+    def _release(self, estimated_tokens: int, response: Optional[TextGenerationResponse]) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            usage = getattr(response, "usage", None)
+            if self.tokens and isinstance(usage, dict) and usage.get("total_tokens"):
+                actual = usage["total_tokens"]
+                if actual < estimated_tokens:
+                    self.tokens.refund(estimated_tokens - actual)
+                else:
+                    self.tokens.consume(actual - estimated_tokens)
+            self._condition.notify_all()
+
+    def generate(
+        self,
+        messages: Union[List[Dict], str],
+        config: TextGenerationConfig = TextGenerationConfig(),
+        **kwargs,
+    ) -> TextGenerationResponse:
+        estimated_tokens = self.estimate_tokens(messages, config)
+        self._acquire(estimated_tokens)
+        response = None
+        try:
+            response = self.text_gen.generate(messages=messages, config=config, **kwargs)
+            return response
+        finally:
+            self._release(estimated_tokens, response)
+
+    def count_tokens(self, text) -> int:
+        count_tokens = getattr(self.text_gen, "count_tokens", None)
+        return count_tokens(text) if count_tokens is not None else len(str(text)) // 4
+
+    def metrics(self) -> Dict:
+        """Queue wait time statistics and current load"""
+        with self._condition:
+            waits = sorted(self._wait_times)
+            return {
+                "calls": self._total_calls,
+                "queued": len(self._waiting),
+                "in_flight": self.in_flight,
+                "mean_wait": self._total_wait / self._total_calls if self._total_calls else 0.0,
+                "p95_wait": waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0,
+                "max_wait": waits[-1] if waits else 0.0,
+            }
@@ -6,18 +6,25 @@
 # execute the specification given some data
 
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from dataclasses import replace
 from typing import List, Union
 import logging
 
 import pandas as pd
 from llmx import llm, TextGenerator
-from lida.datamodel import Goal, Summary, TextGenerationConfig, Persona
-from lida.utils import read_dataframe
+from lida.datamodel import ChartExecutorResponse, ExecutionLimits, Goal, Summary, TextGenerationConfig, Persona
+from lida.utils import arrow_string_dtype, optimize_dtypes, read_dataframe
 from ..components.summarizer import Summarizer
-from ..components.goal import GoalExplorer
+from ..components.goal import GoalExplorer, HeuristicGoalExplorer
 from ..components.persona import PersonaExplorer
 from ..components.executor import ChartExecutor
-from ..components.viz import VizGenerator, VizEditor, VizExplainer, VizEvaluator, VizRepairer, VizRecommender
+from ..components.registry import text_generators
+from ..components.codelibrary import ChartCodeLibrary
+from ..components.limiter import submit_in_context
+from ..components.annotations import ColumnAnnotationCache
+from ..components.viz import VizGenerator, VizEditor, VizExplainer, VizEvaluator, VizRepairer, VizRecommender, VizRuleGenerator
 
 import lida.web as lida
 
@@ -26,28 +33,43 @@ logger = logging.getLogger("lida")
 
 
 class Manager(object):
-    def __init__(self, text_gen: TextGenerator = None) -> None:
+    def __init__(self, text_gen: TextGenerator = None,
+                 execution_limits: ExecutionLimits = None,
+                 code_library: ChartCodeLibrary = None,
+                 annotation_cache: ColumnAnnotationCache = None) -> None:
         """
         Initialize the Manager object.
 
         Args:
             text_gen (TextGenerator, optional): Text generator object. Defaults to None.
+            execution_limits (ExecutionLimits, optional): Time, memory and output size limits
+                applied to generated chart code. Defaults to ExecutionLimits().
+            code_library (ChartCodeLibrary, optional): Library of chart code that executed
+                successfully, reused by visualize for datasets with the same schema. Defaults to None.
+            annotation_cache (ColumnAnnotationCache, optional): Cache of column annotations reused
+                by summarize(summary_method="llm") for familiar columns. Defaults to None.
         """
 
         self.text_gen = text_gen or llm()
 
-        self.summarizer = Summarizer()
+        self.summarizer = Summarizer(annotation_cache=annotation_cache)
         self.goal = GoalExplorer()
+        self.heuristic_goal = HeuristicGoalExplorer()
         self.vizgen = VizGenerator()
+        self.rulegen = VizRuleGenerator()
         self.vizeditor = VizEditor()
-        self.executor = ChartExecutor()
+        self.executor = ChartExecutor(limits=execution_limits)
         self.explainer = VizExplainer()
         self.evaluator = VizEvaluator()
         self.repairer = VizRepairer()
         self.recommender = VizRecommender()
         self.data = None
+        # (date fields, self.data with them parsed), see typed_data
+        self._typed_data = None
+        self.data_memory = None
         self.infographer = None
         self.persona = PersonaExplorer()
+        self.code_library = code_library
 
     def check_textgen(self, config: TextGenerationConfig):
         """
@@ -67,7 +89,7 @@ class Manager(object):
                 "Switching Text Generator Provider from %s to %s",
                 self.text_gen.provider,
                 config.provider)
-            self.text_gen = llm(provider=config.provider)
+            self.text_gen = text_generators.get(provider=config.provider)
 
     def summarize(
         self,
@@ -76,6 +98,12 @@ class Manager(object):
         n_samples: int = 3,
         summary_method: str = "default",
         textgen_config: TextGenerationConfig = TextGenerationConfig(n=1, temperature=0),
+        top_k_associations: int = 0,
+        streaming: bool = False,
+        optimize_data: bool = False,
+        chunk_tokens: int = None,
+        enrich_protocol: str = None,
+        keep_data: bool = True,
     ) -> Summary:
         """
         Summarize data given a DataFrame or file path.
@@ -86,6 +114,12 @@ class Manager(object):
             n_samples (int, optional): Number of summary samples to generate. Defaults to 3.
             summary_method (str, optional): Summary method to use. Defaults to "default".
             textgen_config (TextGenerationConfig, optional): Text generation configuration. Defaults to TextGenerationConfig(n=1, temperature=0).
+            top_k_associations (int, optional): Number of most associated field pairs to add to the summary. Defaults to 0 (none).
+            streaming (bool, optional): Summarize a csv, tsv or parquet file chunk by chunk in constant memory. The data used for visualization is then a random sample of the rows. Defaults to False.
+            optimize_data (bool, optional): Convert the data kept for visualization to memory-lean dtypes (parsed dates, Arrow strings, lossless float32) using the summary field dtypes, see optimize_dtypes. The memory report is kept in self.data_memory. Defaults to False.
+            chunk_tokens (int, optional): Enrich wide summaries (summary_method="llm") in concurrent chunks of at most chunk_tokens prompt tokens, see Summarizer.enrich_chunked. Defaults to None (a single request).
+            enrich_protocol (str, optional): "full" to have the model return the annotated summary, "delta" to request only the annotations and merge them locally, see Summarizer.enrich_delta. Defaults to None (the summarizer's protocol, "full").
+            keep_data (bool, optional): Keep the data as self.data, used by later calls that are not given data. A Manager shared by concurrent requests (e.g. the web app) passes False and hands the data to each call instead. Defaults to True.
 
         Returns:
             Summary: Summary object containing the generated summary.
@@ -123,25 +157,40 @@ class Manager(object):
         """
         self.check_textgen(config=textgen_config)
 
+        data_properties = None
         if isinstance(data, str):
             file_name = data.split("/")[-1]
-            data = read_dataframe(data)
+            if streaming:
+                data_properties, data = self.summarizer.get_streaming_column_properties(data, n_samples)
+            else:
+                data = read_dataframe(data)
 
-        self.data = data
         # 获取summarizer返回的字典数据
         summary_dict = self.summarizer.summarize(
-            data=self.data, text_gen=self.text_gen, file_name=file_name, n_samples=n_samples,
-            summary_method=summary_method, textgen_config=textgen_config)
-        
+            data=data, text_gen=self.text_gen, file_name=file_name, n_samples=n_samples,
+            summary_method=summary_method, textgen_config=textgen_config,
+            top_k_associations=top_k_associations, data_properties=data_properties,
+            chunk_tokens=chunk_tokens, enrich_protocol=enrich_protocol)
+        data_memory = None
+        if optimize_data:
+            data, data_memory = optimize_dtypes(
+                data, fields=summary_dict.get("fields"), string_dtype=arrow_string_dtype())
+
         # 将字典转换为Summary对象
         summary_obj = Summary(
             name=summary_dict.get('name', file_name),
             file_name=summary_dict.get('file_name', file_name),
             dataset_description=summary_dict.get('dataset_description', ''),
             field_names=summary_dict.get('field_names', []),
-            fields=summary_dict.get('fields', [])
+            fields=summary_dict.get('fields', []),
+            associations=summary_dict.get('associations')
         )
-        
+        if keep_data:
+            self.data, self.data_memory = data, data_memory
+            # date fields are parsed once per dataset instead of on every execution
+            self._typed_data = (self.executor.date_fields(summary_obj),
+                                self.executor.typed_data(self.data, summary_obj))
+
         return summary_obj
 
     def goals(
@@ -149,7 +198,8 @@ class Manager(object):
         summary: Summary,
         textgen_config: TextGenerationConfig = TextGenerationConfig(),
         n: int = 5,
-        persona: Persona = None
+        persona: Persona = None,
+        method: str = "llm",
     ) -> List[Goal]:
         """
         Generate goals based on a summary.
@@ -159,6 +209,8 @@ class Manager(object):
             textgen_config (TextGenerationConfig, optional): Text generation configuration. Defaults to TextGenerationConfig().
             n (int, optional): Number of goals to generate. Defaults to 5.
             persona (Persona, str, dict, optional): Persona information. Defaults to None.
+            method (str, optional): "llm" to generate goals with the text generator, "heuristic" to
+                derive them instantly from the summary statistics. Defaults to "llm".
 
         Returns:
             List[Goal]: List of generated goals.
@@ -179,13 +231,17 @@ class Manager(object):
 
             Rationale: This tells about the distribution of horsepower of cars in the dataset.
         """
-        self.check_textgen(config=textgen_config)
-
         if isinstance(persona, dict):
             persona = Persona(**persona)
         if isinstance(persona, str):
             persona = Persona(persona=persona, rationale="")
 
+        if method == "heuristic":
+            return self.heuristic_goal.generate(summary=summary, n=n, persona=persona)
+        if method != "llm":
+            raise ValueError(f"Unsupported goal method {method}. Choose from 'llm', 'heuristic'.")
+
+        self.check_textgen(config=textgen_config)
         return self.goal.generate(summary=summary, text_gen=self.text_gen,
                                   textgen_config=textgen_config, n=n, persona=persona)
 
@@ -205,27 +261,221 @@ class Manager(object):
         library="seaborn",
         return_error: bool = False,
         data=None,
+        repair_attempts: int = 0,
+        repair_timeout: float = None,
+        first_k: int = None,
+        fast_path: bool = True,
     ):
+        """Generate and execute visualization code for a goal
+
+        Args:
+            summary (Summary): Dataset summary.
+            goal (Goal, dict, str): Visualization goal.
+            textgen_config (TextGenerationConfig, optional): Text generation configuration.
+            library (str, optional): Visualization library. Defaults to "seaborn".
+            return_error (bool, optional): Include failed charts in the result. Defaults to False.
+            data (pd.DataFrame, optional): Data to plot. Defaults to self.data.
+            repair_attempts (int, optional): Number of rounds in which failed charts are sent
+                to the repairer together with their traceback. Defaults to 0 (no repair).
+            repair_timeout (float, optional): Time budget in seconds for all repair rounds.
+                Defaults to None (no budget).
+            first_k (int, optional): Hedged mode. max(textgen_config.n, 2 * first_k) candidates
+                are requested independently, executed as they arrive, and the call returns as soon
+                as first_k of them render successfully. Defaults to None (wait for all n).
+            fast_path (bool, optional): Try deterministic code for common goals (histogram,
+                count bar chart, scatter, line over date) before calling the LLM. Skipped when
+                textgen_config.n > 1 asks for several variants. Defaults to True.
+
+        Returns:
+            List[ChartExecutorResponse]: The executed charts.
+        """
         if isinstance(goal, dict):
             goal = Goal(**goal)
         if isinstance(goal, str):
             goal = Goal(question=goal, visualization=goal, rationale="")
 
         self.check_textgen(config=textgen_config)
-        code_specs = self.vizgen.generate(
-            summary=summary, goal=goal, textgen_config=textgen_config, text_gen=self.text_gen,
-            library=library)
         # 使用传入的data参数，如果没有则使用self.data
         data_to_use = data if data is not None else self.data
+        charts = None
+        # the rule based chart is a single deterministic variant
+        if fast_path and (textgen_config.n or 1) <= 1:
+            code_specs = self.rulegen.generate(summary=summary, goal=goal, library=library)
+            if code_specs:
+                charts = [chart for chart in self.execute(
+                    code_specs=code_specs, data=data_to_use, summary=summary, library=library,
+                    return_error=True) if chart.status]
+        if not charts and self.code_library is not None:
+            charts = self.execute_from_library(
+                summary=summary, goal=goal, data=data_to_use, library=library)
+
+        if not charts:
+            if first_k:
+                charts = self.visualize_hedged(
+                    summary=summary, goal=goal, data=data_to_use, textgen_config=textgen_config,
+                    library=library, first_k=first_k)
+            else:
+                code_specs = self.vizgen.generate(
+                    summary=summary, goal=goal, textgen_config=textgen_config, text_gen=self.text_gen,
+                    library=library)
+                charts = self.execute(
+                    code_specs=code_specs,
+                    data=data_to_use,
+                    summary=summary,
+                    library=library,
+                    return_error=True,
+                )
+            if repair_attempts > 0:
+                charts = self.auto_repair(
+                    charts=charts, goal=goal, summary=summary, data=data_to_use,
+                    textgen_config=textgen_config, library=library,
+                    attempts=repair_attempts, timeout=repair_timeout)
+            if self.code_library is not None:
+                self.code_library.put(
+                    summary, goal, library, [chart.code for chart in charts if chart.status])
+
+        if not return_error:
+            charts = [chart for chart in charts if chart.status]
+        return charts
+
+    def execute_from_library(
+        self,
+        summary: Summary,
+        goal: Goal,
+        data,
+        library: str = "seaborn",
+    ) -> List[ChartExecutorResponse]:
+        """Re-execute stored code for a dataset with the same schema, without an LLM call.
+
+        Returns the charts that rendered successfully. If none did (validation or execution
+        failed against the new data), the stale entry is dropped and an empty list is returned
+        so the caller regenerates.
+        """
+        code_specs = self.code_library.get(summary, goal, library)
+        if not code_specs:
+            return []
         charts = self.execute(
-            code_specs=code_specs,
-            data=data_to_use,
-            summary=summary,
-            library=library,
-            return_error=return_error,
-        )
+            code_specs=code_specs, data=data, summary=summary, library=library, return_error=True)
+        successes = [chart for chart in charts if chart.status]
+        if not successes:
+            logger.info("Stored chart code failed for goal '%s', regenerating", goal.question)
+            self.code_library.remove(summary, goal, library)
+        return successes
+
+    def visualize_hedged(
+        self,
+        summary: Summary,
+        goal: Goal,
+        data,
+        textgen_config: TextGenerationConfig = TextGenerationConfig(),
+        library: str = "seaborn",
+        first_k: int = 1,
+        candidates: int = None,
+    ) -> List[ChartExecutorResponse]:
+        """Request candidates concurrently and return once first_k of them render.
+
+        `candidates` single completion requests (default max(textgen_config.n, 2 * first_k), so
+        a slow or failing candidate can be beaten by another) are issued in parallel. Each
+        candidate is executed as soon as its completion arrives. Once first_k charts succeed,
+        pending requests are cancelled and in-flight ones are abandoned. If fewer than first_k
+        succeed, the failed charts are returned after the successful ones.
+        """
+        candidates = max(candidates or max(textgen_config.n, 2 * first_k), first_k)
+        # identical single completion requests would otherwise all hit the same cache entry
+        candidate_config = replace(textgen_config, n=1, use_cache=False)
+
+        successes, failures = [], []
+        pool = ThreadPoolExecutor(max_workers=candidates)
+        futures = [
+            submit_in_context(
+                pool, self.vizgen.generate, summary=summary, goal=goal,
+                textgen_config=candidate_config, text_gen=self.text_gen, library=library)
+            for _ in range(candidates)]
+        try:
+            for future in as_completed(futures):
+                try:
+                    code_specs = future.result()
+                except Exception as exception_error:
+                    logger.info("Candidate generation failed: %s", exception_error)
+                    continue
+                for chart in self.execute(
+                        code_specs=code_specs, data=data, summary=summary, library=library,
+                        return_error=True):
+                    (successes if chart.status else failures).append(chart)
+                if len(successes) >= first_k:
+                    return successes[:first_k]
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return successes + failures
+
+    def auto_repair(
+        self,
+        charts: List[ChartExecutorResponse],
+        goal: Goal,
+        summary: Summary,
+        data,
+        textgen_config: TextGenerationConfig = TextGenerationConfig(),
+        library: str = "seaborn",
+        attempts: int = 1,
+        timeout: float = None,
+    ) -> List[ChartExecutorResponse]:
+        """Repair failed charts using their captured error as feedback.
+
+        Repairs (generation and execution) for all failed charts in a round run concurrently.
+        Rounds continue until every chart renders, `attempts` rounds have run or the `timeout`
+        budget (seconds) is spent. Charts whose repair does not complete in time keep their
+        last error.
+        """
+        charts = list(charts)
+        deadline = time.monotonic() + timeout if timeout else None
+        # a single repaired program per failed chart
+        repair_config = replace(textgen_config, n=1)
+
+        def repair(index: int) -> ChartExecutorResponse:
+            code_specs = self.repairer.generate(
+                code=charts[index].code,
+                feedback=self._repair_feedback(charts[index]),
+                goal=goal,
+                summary=summary,
+                textgen_config=repair_config,
+                text_gen=self.text_gen,
+                library=library,
+            )
+            repaired = self.execute(
+                code_specs=code_specs[:1],
+                data=data,
+                summary=summary,
+                library=library,
+                return_error=True,
+            )
+            return repaired[0] if repaired else charts[index]
+
+        for attempt in range(attempts):
+            failed = [index for index, chart in enumerate(charts) if not chart.status]
+            remaining = deadline - time.monotonic() if deadline else None
+            if not failed or (remaining is not None and remaining <= 0):
+                break
+            logger.info("Repair attempt %s for %s failed charts", attempt + 1, len(failed))
+
+            # repairs are generated and executed in the pool, so the budget bounds both
+            pool = ThreadPoolExecutor(max_workers=len(failed))
+            futures = {submit_in_context(pool, repair, index): index for index in failed}
+            done, _ = wait(futures, timeout=remaining)
+            pool.shutdown(wait=False, cancel_futures=True)
+
+            for future in done:
+                index = futures[future]
+                try:
+                    charts[index] = future.result()
+                except Exception as exception_error:
+                    logger.info("Repair of chart %s failed: %s", index, exception_error)
         return charts
 
+    @staticmethod
+    def _repair_feedback(chart: ChartExecutorResponse) -> str:
+        error = chart.error or {}
+        return error.get("traceback") or error.get("message") or "The code failed to execute."
+
     def execute(
         self,
         code_specs,
@@ -250,8 +500,21 @@ class Manager(object):
             summary=summary,
             library=library,
             return_error=return_error,
+            typed=self.typed_data(data, summary),
         )
 
+    def typed_data(self, data, summary: Summary):
+        """Return self.data with its date fields parsed (see ChartExecutor.typed_data), computed
+        once when it was summarized.
+
+        Returns None for other data or a summary with other date fields, the executor then
+        parses them itself.
+        """
+        if self._typed_data is None or data is not self.data:
+            return None
+        date_fields, typed = self._typed_data
+        return typed if date_fields == self.executor.date_fields(summary) else None
+
     def edit(
         self,
         code,
@@ -260,12 +523,14 @@ class Manager(object):
         textgen_config: TextGenerationConfig = TextGenerationConfig(),
         library: str = "seaborn",
         return_error: bool = False,
+        data=None,
     ):
         """Edit a visualization code given a set of instructions
 
         Args:
             code (_type_): _description_
             instructions (List[Dict]): A list of instructions
+            data (pd.DataFrame, optional): Data to plot. Defaults to self.data.
 
         Returns:
             _type_: _description_
@@ -287,7 +552,7 @@ class Manager(object):
 
         charts = self.execute(
             code_specs=code_specs,
-            data=self.data,
+            data=data if data is not None else self.data,
             summary=summary,
             library=library,
             return_error=return_error,
@@ -303,8 +568,9 @@ class Manager(object):
         textgen_config: TextGenerationConfig = TextGenerationConfig(),
         library: str = "seaborn",
         return_error: bool = False,
+        data=None,
     ):
-        """ Repair a visulization given some feedback"""
+        """ Repair a visulization given some feedback, data defaults to self.data"""
         self.check_textgen(config=textgen_config)
         code_specs = self.repairer.generate(
             code=code,
@@ -317,7 +583,7 @@ class Manager(object):
         )
         charts = self.execute(
             code_specs=code_specs,
-            data=self.data,
+            data=data if data is not None else self.data,
             summary=summary,
             library=library,
             return_error=return_error,
@@ -382,12 +648,14 @@ class Manager(object):
         textgen_config: TextGenerationConfig = TextGenerationConfig(),
         library: str = "seaborn",
         return_error: bool = False,
+        data=None,
     ):
         """Edit a visualization code given a set of instructions
 
         Args:
             code (_type_): _description_
             instructions (List[Dict]): A list of instructions
+            data (pd.DataFrame, optional): Data to plot. Defaults to self.data.
 
         Returns:
             _type_: _description_
@@ -405,7 +673,7 @@ class Manager(object):
         )
         charts = self.execute(
             code_specs=code_specs,
-            data=self.data,
+            data=data if data is not None else self.data,
             summary=summary,
             library=library,
             return_error=return_error,
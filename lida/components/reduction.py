@@ -0,0 +1,269 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("lida")
+
+
+def _as_float(values: Any) -> Optional[np.ndarray]:
+    """Values as float64 (datetimes as nanoseconds), None if they are not numeric or dates"""
+    values = np.asarray(values)
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    if values.dtype.kind in "iufb":
+        return values.astype(np.float64)
+    return None
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets downsampling of a series sorted by x.
+
+    Keeps the first and last point and, from each of threshold - 2 equal buckets in between,
+    the point forming the largest triangle with the previously kept point and the average of
+    the next bucket, which preserves peaks and the visual shape of the line.
+
+    :return: The indices of the kept points, in order.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    kept = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = x[end:edges[bucket + 2]].mean()
+            next_y = y[end:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        areas = np.abs((x[kept] - next_x) * (y[start:end] - y[kept]) -
+                       (x[kept] - x[start:end]) * (next_y - y[kept]))
+        kept = start + int(np.argmax(areas))
+        indices[bucket + 1] = kept
+    return indices
+
+
+def binned_density(x: np.ndarray, y: np.ndarray, bins: int = 100) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Aggregate points into a bins x bins grid.
+
+    :return: The x and y bin centers and the point count of every non-empty bin.
+    """
+    finite = np.isfinite(x) & np.isfinite(y)
+    counts, x_edges, y_edges = np.histogram2d(x[finite], y[finite], bins=bins)
+    x_index, y_index = np.nonzero(counts)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    return x_centers[x_index], y_centers[y_index], counts[x_index, y_index]
+
+
+def reduce_points(data: pd.DataFrame, x: str, y: str, max_points: int = 2000,
+                  method: str = "lttb", bins: int = 100) -> pd.DataFrame:
+    """Reduce data to a small number of rows that plot like the original.
+
+    Available to chart code. method="lttb" sorts by x and keeps at most max_points rows
+    selected by lttb (line charts); method="density" returns the x and y bin centers of a
+    bins x bins grid with a `count` column (dense scatter plots).
+    """
+    data = data.dropna(subset=[x, y])
+    if method == "density":
+        x_values, y_values = _as_float(data[x]), _as_float(data[y])
+        if x_values is None or y_values is None:
+            raise ValueError("density reduction requires numeric or date columns")
+        x_centers, y_centers, counts = binned_density(x_values, y_values, bins)
+        if data[x].dtype.kind == "M":
+            x_centers = pd.to_datetime(x_centers.astype(np.int64))
+        if data[y].dtype.kind == "M":
+            y_centers = pd.to_datetime(y_centers.astype(np.int64))
+        return pd.DataFrame({x: x_centers, y: y_centers, "count": counts.astype(np.int64)})
+    if method != "lttb":
+        raise ValueError(f"Unsupported reduction method: {method}")
+    if len(data) <= max_points:
+        return data
+    data = data.sort_values(x)
+    x_values, y_values = _as_float(data[x]), _as_float(data[y])
+    if x_values is None or y_values is None:
+        return data.iloc[np.linspace(0, len(data) - 1, max_points).astype(np.int64)]
+    return data.iloc[lttb(x_values, y_values, max_points)]
+
+
+def _reduction(kind: str, method: str, before: int, after: int) -> Dict:
+    return {"kind": kind, "method": method, "points_before": int(before), "points_after": int(after)}
+
+
+def reduce_matplotlib(max_line_points: Optional[int], max_scatter_points: Optional[int],
+                      seed: int = 42) -> List[Dict]:
+    """Reduce large lines (lttb) and scatters in the open matplotlib figures in place.
+
+    Scatters with a single color and size become a hexbin density with at most
+    max_scatter_points hexagons, others are sampled.
+    Lines with gaps (NaN) or unsorted x are left as they are.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PathCollection
+
+    reductions = []
+    rng = np.random.default_rng(seed)
+    for number in plt.get_fignums():
+        for ax in plt.figure(number).axes:
+            for line in ax.get_lines():
+                xy = np.asarray(line.get_xydata(), dtype=np.float64)
+                if not max_line_points or len(xy) <= max_line_points or \
+                        not np.isfinite(xy).all() or np.any(np.diff(xy[:, 0]) < 0):
+                    continue
+                keep = lttb(xy[:, 0], xy[:, 1], max_line_points)
+                line.set_data(xy[keep, 0], xy[keep, 1])
+                reductions.append(_reduction("line", "lttb", len(xy), len(keep)))
+
+            for collection in list(ax.collections):
+                if not isinstance(collection, PathCollection) or not max_scatter_points:
+                    continue
+                offsets = np.asarray(collection.get_offsets(), dtype=np.float64)
+                n = len(offsets)
+                if n <= max_scatter_points or collection.get_offset_transform() is not ax.transData:
+                    continue
+                uniform = len(collection.get_facecolors()) <= 1 and len(collection.get_sizes()) <= 1 \
+                    and collection.get_array() is None
+                if uniform:
+                    # a gridsize g grid has about 2 * (g + 1) ** 2 hexagons
+                    gridsize = max(2, int(np.sqrt(max_scatter_points / 2)) - 1)
+                    hexbin = ax.hexbin(offsets[:, 0], offsets[:, 1], gridsize=gridsize, mincnt=1,
+                                       cmap="Blues", zorder=collection.get_zorder())
+                    if len(hexbin.get_offsets()) <= max_scatter_points:
+                        collection.remove()
+                        reductions.append(_reduction("scatter", "density", n, len(hexbin.get_offsets())))
+                        continue
+                    hexbin.remove()
+                keep = np.sort(rng.choice(n, max_scatter_points, replace=False))
+                collection.set_offsets(offsets[keep])
+                for getter, setter in ((collection.get_facecolors, collection.set_facecolors),
+                                       (collection.get_edgecolors, collection.set_edgecolors),
+                                       (collection.get_sizes, collection.set_sizes)):
+                    values = getter()
+                    if len(values) == n:
+                        setter(values[keep])
+                if collection.get_array() is not None and len(collection.get_array()) == n:
+                    collection.set_array(collection.get_array()[keep])
+                reductions.append(_reduction("scatter", "sample", n, len(keep)))
+    return reductions
+
+
+def _subset_trace(trace, keep: np.ndarray, n: int) -> None:
+    """Subset the per-point arrays of a plotly trace"""
+    for name in ("x", "y", "customdata", "text", "hovertext", "ids"):
+        values = getattr(trace, name, None)
+        if values is not None and not isinstance(values, str) and len(values) == n:
+            setattr(trace, name, np.asarray(values)[keep])
+    for name in ("color", "size", "symbol", "opacity"):
+        values = getattr(trace.marker, name, None)
+        if values is not None and not isinstance(values, str) and np.ndim(values) == 1 and len(values) == n:
+            setattr(trace.marker, name, np.asarray(values)[keep])
+
+
+def reduce_plotly(fig, max_line_points: Optional[int],
+                  max_scatter_points: Optional[int]) -> Tuple[Any, List[Dict]]:
+    """Reduce large line traces (lttb) and marker traces of a plotly figure.
+
+    Marker traces with a per-point color are sampled, others become a binned density heatmap.
+    :return: The (possibly new) figure and the reductions applied.
+    """
+    import plotly.graph_objects as go
+
+    reductions = []
+    traces = []
+    for trace in fig.data:
+        traces.append(trace)
+        if trace.type not in ("scatter", "scattergl") or trace.x is None or trace.y is None:
+            continue
+        n = len(trace.x)
+        x_values, y_values = _as_float(trace.x), _as_float(trace.y)
+        if x_values is None or y_values is None or len(y_values) != n:
+            continue
+        # plotly draws lines+markers below 20 points and lines above when no mode is set
+        mode = trace.mode or ("lines+markers" if n < 20 else "lines")
+        if "lines" in mode and max_line_points and n > max_line_points:
+            if not (np.isfinite(x_values).all() and np.isfinite(y_values).all()) or \
+                    np.any(np.diff(x_values) < 0):
+                continue
+            keep = lttb(x_values, y_values, max_line_points)
+            _subset_trace(trace, keep, n)
+            reductions.append(_reduction("line", "lttb", n, len(keep)))
+        elif mode == "markers" and max_scatter_points and n > max_scatter_points:
+            marker_color = getattr(trace.marker, "color", None)
+            if marker_color is not None and not isinstance(marker_color, str) and np.ndim(marker_color) == 1:
+                keep = np.sort(np.random.default_rng(42).choice(n, max_scatter_points, replace=False))
+                _subset_trace(trace, keep, n)
+                reductions.append(_reduction("scatter", "sample", n, len(keep)))
+                continue
+            finite = np.isfinite(x_values) & np.isfinite(y_values)
+            bins = max(1, min(100, int(np.sqrt(max_scatter_points))))
+            counts, x_edges, y_edges = np.histogram2d(x_values[finite], y_values[finite], bins=bins)
+            x_centers, y_centers = (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2
+            if np.asarray(trace.x).dtype.kind == "M":
+                x_centers = pd.to_datetime(x_centers.astype(np.int64))
+            if np.asarray(trace.y).dtype.kind == "M":
+                y_centers = pd.to_datetime(y_centers.astype(np.int64))
+            traces[-1] = go.Heatmap(
+                x=x_centers, y=y_centers, z=np.where(counts > 0, counts, np.nan).T,
+                colorscale="Blues", showscale=False, name=trace.name,
+                xaxis=trace.xaxis, yaxis=trace.yaxis)
+            reductions.append(_reduction("scatter", "density", n, int(np.count_nonzero(counts))))
+    if any(reduction["method"] == "density" for reduction in reductions):
+        fig = go.Figure(data=traces, layout=fig.layout)
+    return fig, reductions
+
+
+LINE_MARKS = ("line", "area", "trail")
+POINT_MARKS = ("point", "circle", "square")
+# channels that split a line mark into separate series
+SERIES_CHANNELS = ("color", "detail", "strokeDash", "row", "column", "facet")
+
+
+def reduce_altair(chart, max_line_points: Optional[int], max_scatter_points: Optional[int],
+                  seed: int = 42) -> Tuple[Any, List[Dict]]:
+    """Reduce the DataFrame of a single-view altair line or scatter chart before it is serialized.
+
+    Each line series (per color, detail, ... value) is reduced with lttb; scatters are sampled
+    since binning would change the chart's encodings (chart code can use reduce_points with
+    method="density" instead). Charts with transforms, aggregates or bins are left as they are.
+    :return: The (possibly new) chart and the reductions applied.
+    """
+    data = getattr(chart, "data", None)
+    if not isinstance(data, pd.DataFrame) or not hasattr(chart, "mark"):
+        return chart, []
+    # parse the mark and encodings on a one-row copy, serializing the full data is what we avoid
+    spec = chart.properties(data=data.head(1)).to_dict()
+    if "mark" not in spec or "transform" in spec:
+        return chart, []
+    mark = spec["mark"] if isinstance(spec["mark"], str) else spec["mark"].get("type")
+    encoding = spec.get("encoding", {})
+    if any("aggregate" in channel or "bin" in channel
+           for channel in encoding.values() if isinstance(channel, dict)):
+        return chart, []
+    x, y = encoding.get("x", {}).get("field"), encoding.get("y", {}).get("field")
+    if x not in data.columns or y not in data.columns:
+        return chart, []
+
+    if mark in LINE_MARKS and max_line_points and len(data) > max_line_points:
+        if encoding["x"].get("type") not in ("quantitative", "temporal"):
+            return chart, []
+        groups = [encoding[channel]["field"] for channel in SERIES_CHANNELS
+                  if isinstance(encoding.get(channel), dict) and encoding[channel].get("field") in data.columns]
+        if groups:
+            reduced = pd.concat([reduce_points(group, x, y, max_line_points)
+                                 for _, group in data.groupby(groups, sort=False, dropna=False)])
+        else:
+            reduced = reduce_points(data, x, y, max_line_points)
+        method = "lttb"
+    elif mark in POINT_MARKS and max_scatter_points and len(data) > max_scatter_points:
+        reduced = data.sample(max_scatter_points, random_state=seed).sort_index()
+        method = "sample"
+    else:
+        return chart, []
+    if len(reduced) >= len(data):
+        return chart, []
+    kind = "line" if method == "lttb" else "scatter"
+    return chart.properties(data=reduced), [_reduction(kind, method, len(data), len(reduced))]
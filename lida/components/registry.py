@@ -0,0 +1,75 @@
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from llmx import llm, TextGenerator
+
+logger = logging.getLogger("lida")
+
+
+class TextGeneratorRegistry:
+    """Thread-safe pool of warm text generators keyed by provider, model and endpoint.
+
+    Text generators hold the underlying HTTP clients, so handing out the same instance for
+    the same (provider, model, endpoint) reuses keep-alive connections and skips client
+    initialization on every request.
+    """
+
+    def __init__(self) -> None:
+        self._generators: Dict[Tuple, TextGenerator] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+
+    def get(
+        self,
+        provider: str = "openai",
+        model: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        factory: Optional[Callable[[], TextGenerator]] = None,
+        **kwargs,
+    ) -> TextGenerator:
+        """Return the pooled generator for the key, creating it on first use.
+
+        Args:
+            provider (str): Text generation provider e.g. openai, palm, cohere.
+            model (str, optional): Model name, passed to llm() when no factory is given.
+            endpoint (str, optional): Endpoint the generator talks to, only used as part of the key.
+            factory (Callable, optional): Builds the generator. Defaults to llm(provider, model, **kwargs).
+        """
+        key = (provider, model, endpoint)
+        generator = self._generators.get(key)
+        if generator is not None:
+            return generator
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # build outside the registry lock so slow initializations do not block other keys
+        with key_lock:
+            generator = self._generators.get(key)
+            if generator is None:
+                logger.info("Initializing text generator for %s", key)
+                if factory is None:
+                    if model is not None:
+                        kwargs["model"] = model
+                    generator = llm(provider=provider, **kwargs)
+                else:
+                    generator = factory()
+                self._generators[key] = generator
+        return generator
+
+    def remove(self, provider: str = "openai", model: Optional[str] = None,
+               endpoint: Optional[str] = None) -> None:
+        """Drop a pooled generator, e.g. after its credentials changed"""
+        with self._lock:
+            self._generators.pop((provider, model, endpoint), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generators.clear()
+
+    def __len__(self) -> int:
+        return len(self._generators)
+
+
+# process wide registry shared by all managers
+text_generators = TextGeneratorRegistry()
@@ -0,0 +1,254 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Union
+
+from llmx import TextGenerator, TextGenerationConfig, TextGenerationResponse
+
+from .limiter import submit_in_context
+
+logger = logging.getLogger("lida")
+
+
+class _CallTimer:
+    """When a backend call was submitted to the pool and when a worker started it"""
+
+    def __init__(self) -> None:
+        self.submitted = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.started = threading.Event()
+
+    def start(self) -> float:
+        self.started_at = time.monotonic()
+        self.started.set()
+        return self.started_at
+
+
+class BackendStats:
+    """Latency and error statistics of a single backend, including its circuit state"""
+
+    def __init__(self, window: int = 100, alpha: float = 0.2) -> None:
+        # time spent in the backend call, and including the wait for a pool worker
+        self.latencies = deque(maxlen=window)
+        self.end_to_end_latencies = deque(maxlen=window)
+        self.alpha = alpha
+        self.ewma_latency: Optional[float] = None
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.opened_at: Optional[float] = None
+        # True while the single trial request of a half-open circuit is in flight
+        self.probing = False
+        # recent outcomes, True for an error
+        self.outcomes = deque(maxlen=window)
+
+    def record_success(self, latency: float, end_to_end_latency: Optional[float] = None) -> None:
+        self.calls += 1
+        self.latencies.append(latency)
+        self.end_to_end_latencies.append(latency if end_to_end_latency is None else end_to_end_latency)
+        self.outcomes.append(False)
+        self.ewma_latency = latency if self.ewma_latency is None else \
+            self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+        self.consecutive_errors = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_error(self, failure_threshold: int) -> None:
+        self.calls += 1
+        self.errors += 1
+        self.outcomes.append(True)
+        self.consecutive_errors += 1
+        self.probing = False
+        if self.consecutive_errors >= failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def recent_error_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def expected_latency(self) -> float:
+        """Latency until a successful answer, counting the retries failures cause"""
+        if self.ewma_latency is None:
+            # unmeasured backends go first so they get a latency estimate, failing ones last
+            return float("inf") if self.outcomes else 0.0
+        return self.ewma_latency / max(1.0 - self.recent_error_rate(), 0.05)
+
+    def percentile(self, q: float, end_to_end: bool = False) -> Optional[float]:
+        latencies = self.end_to_end_latencies if end_to_end else self.latencies
+        if not latencies:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def as_dict(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": self.errors / self.calls if self.calls else 0.0,
+            "recent_error_rate": self.recent_error_rate(),
+            "ewma_latency": self.ewma_latency,
+            "p50_latency": self.percentile(0.5),
+            "p95_latency": self.percentile(0.95),
+            "p50_end_to_end_latency": self.percentile(0.5, end_to_end=True),
+            "p95_end_to_end_latency": self.percentile(0.95, end_to_end=True),
+            "circuit_open": self.opened_at is not None,
+        }
+
+
+class RoutingTextGenerator(TextGenerator):
+    """Route requests across several text generators.
+
+    Each request goes to the healthy backend with the lowest expected latency, its exponentially
+    weighted latency scaled up by its recent error rate.
+    If `hedge_percentile` is set and the request takes longer than that latency percentile of
+    the chosen backend, a duplicate request is sent to the next backend and the first answer
+    wins. A backend that fails `failure_threshold` times in a row is skipped (circuit open) for
+    `cooldown` seconds, after which a single trial request decides whether it is closed again
+    (concurrent requests skip it meanwhile).
+    If every circuit is open, requests fail immediately instead of waiting on a dead endpoint.
+
+    Backend calls run in a pool of `max_concurrency` workers (default 4 per backend) shared by
+    all requests; calls beyond it wait for a worker. Hedge delays and the latencies used for
+    ranking count from the moment a call starts, stats() also reports end-to-end latencies
+    including that wait.
+    """
+
+    def __init__(
+        self,
+        backends: List[TextGenerator],
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        latency_window: int = 100,
+        provider: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
+        if not backends:
+            raise ValueError("RoutingTextGenerator requires at least one backend")
+        # a wrapper, responses are cached (or not) by the backends
+        self.provider = provider or backends[0].provider
+        self.model_name = getattr(backends[0], "model_name", None)
+        self.backends = backends
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.backend_stats = [BackendStats(window=latency_window) for _ in backends]
+        self._lock = threading.Lock()
+        self.max_concurrency = max_concurrency or 4 * len(backends)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+    def _ranked_backends(self) -> List[int]:
+        """Backends due for a trial (see _claim) followed by healthy backends ordered by latency"""
+        now = time.monotonic()
+        closed, half_open = [], []
+        with self._lock:
+            for index, stats in enumerate(self.backend_stats):
+                if stats.opened_at is None:
+                    closed.append(index)
+                elif now - stats.opened_at >= self.cooldown:
+                    half_open.append(index)
+            closed.sort(key=lambda index: self.backend_stats[index].expected_latency())
+        return half_open + closed
+
+    def _claim(self, index: int) -> bool:
+        """Closed backends take any number of requests, a half-open one a single trial request"""
+        with self._lock:
+            stats = self.backend_stats[index]
+            if stats.opened_at is None:
+                return True
+            if stats.probing:
+                return False
+            stats.probing = True
+            return True
+
+    def _hedge_delay(self, index: int) -> Optional[float]:
+        if self.hedge_percentile is None:
+            return None
+        stats = self.backend_stats[index]
+        with self._lock:
+            if len(stats.latencies) < self.hedge_min_samples:
+                return None
+            return stats.percentile(self.hedge_percentile)
+
+    def _call(self, index: int, timer: _CallTimer, messages, config: TextGenerationConfig, **kwargs):
+        start = timer.start()
+        try:
+            response = self.backends[index].generate(messages=messages, config=config, **kwargs)
+        except Exception:
+            with self._lock:
+                self.backend_stats[index].record_error(self.failure_threshold)
+            raise
+        with self._lock:
+            end = time.monotonic()
+            self.backend_stats[index].record_success(end - start, end - timer.submitted)
+        return response
+
+    def generate(
+        self,
+        messages: Union[List[Dict], str],
+        config: TextGenerationConfig = TextGenerationConfig(),
+        **kwargs,
+    ) -> TextGenerationResponse:
+        queue = self._ranked_backends()
+        errors = []
+        futures = {}
+        hedge_delay = None
+        timer = None
+
+        def launch() -> bool:
+            nonlocal hedge_delay, timer
+            while queue:
+                index = queue.pop(0)
+                if self._claim(index):
+                    break
+            else:
+                return False
+            timer = _CallTimer()
+            futures[submit_in_context(self._pool, self._call, index, timer, messages, config, **kwargs)] = index
+            # hedge only while a single request is in flight
+            hedge_delay = self._hedge_delay(index) if len(futures) == 1 and queue else None
+            return True
+
+        if not launch():
+            raise RuntimeError(
+                "All text generation backends are unavailable (circuit open). Retry later.")
+        while futures:
+            timeout = None
+            if hedge_delay is not None:
+                # the hedge timer starts when the call does, not while it waits for a worker
+                timer.started.wait()
+                timeout = max(0.0, timer.started_at + hedge_delay - time.monotonic())
+            done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.info("Hedging slow request after %.2f seconds", hedge_delay)
+                hedge_delay = None
+                launch()
+                continue
+            for future in done:
+                index = futures.pop(future)
+                try:
+                    return future.result()
+                except Exception as exception_error:
+                    logger.info("Backend %s failed: %s", index, exception_error)
+                    errors.append(f"backend {index}: {exception_error}")
+            # fail over to the next backend if nothing else is in flight
+            if not futures and queue:
+                launch()
+
+        raise RuntimeError(f"All text generation backends failed. {'; '.join(errors)}")
+
+    def count_tokens(self, text) -> int:
+        for backend in self.backends:
+            count_tokens = getattr(backend, "count_tokens", None)
+            if count_tokens is not None:
+                return count_tokens(text)
+        # roughly four characters per token
+        return len(str(text)) // 4
+
+    def stats(self) -> List[Dict]:
+        """Per backend latency, error rate and circuit state"""
+        with self._lock:
+            return [stats.as_dict() for stats in self.backend_stats]
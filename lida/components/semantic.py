@@ -0,0 +1,132 @@
+import re
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+# value patterns, matched against the whole (stripped) value
+EMAIL_PATTERN = r"[^@\s]+@[^@\s]+\.[a-z]{2,}"
+URL_PATTERN = r"(?:https?://|www\.)[^\s]+"
+IP_PATTERN = r"(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)"
+UUID_PATTERN = r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+ZIP_PATTERN = r"(?=.*\d)[a-z0-9][a-z0-9 \-]{1,8}[a-z0-9]"
+PHONE_PATTERN = r"\+?[\d\s\-().]{7,20}"
+
+GENDER_VALUES = {"m", "f", "male", "female", "man", "woman", "men", "women", "boy", "girl",
+                 "non-binary", "nonbinary", "other", "unknown", "x"}
+CORE_GENDER_VALUES = {"male", "female", "man", "woman", "men", "women"}
+
+# column name tokens hinting at a semantic type
+NAME_HINTS = {
+    "zip code": {"zip", "zipcode", "postal", "postcode"},
+    "phone number": {"phone", "telephone", "tel", "mobile", "fax"},
+    "latitude": {"lat", "latitude"},
+    "longitude": {"lon", "lng", "long", "longitude"},
+    "year": {"year", "yr"},
+    "city": {"city", "town"},
+    "country": {"country", "nation"},
+    "state": {"state", "province", "region"},
+    "identifier": {"id", "uuid", "key"},
+}
+
+DESCRIPTIONS = {
+    "email": "Email address",
+    "url": "Web address (URL)",
+    "ip address": "IP address",
+    "identifier": "Unique identifier",
+    "zip code": "Zip or postal code",
+    "phone number": "Phone number",
+    "latitude": "Latitude in decimal degrees",
+    "longitude": "Longitude in decimal degrees",
+    "gender": "Gender",
+    "year": "Calendar year",
+    "city": "City name",
+    "country": "Country name",
+    "state": "State, province or region",
+}
+
+
+def name_tokens(column: str) -> List[str]:
+    """Lowercase tokens of a column name e.g. `pickupLat` -> [`pickup`, `lat`]"""
+    name = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", str(column))
+    return [token for token in re.split(r"[^a-z0-9]+", name.lower()) if token]
+
+
+def _share(matches: pd.Series) -> float:
+    return float(matches.mean()) if len(matches) else 0.0
+
+
+class SemanticTypeInferrer(object):
+    """Infer the semantic type of a column locally from its name and values.
+
+    Checks are vectorized over a sample of at most max_values non-null values, and a type is
+    assigned only if at least `threshold` of the sampled values agree with it. Detects email,
+    url, ip address, identifier, zip code, phone number, latitude, longitude, gender, year,
+    city, country and state.
+    """
+
+    def __init__(self, max_values: int = 1000, threshold: float = 0.9) -> None:
+        self.max_values = max_values
+        self.threshold = threshold
+
+    def _matches(self, values: pd.Series, pattern: str) -> bool:
+        return _share(values.str.fullmatch(pattern, case=False)) >= self.threshold
+
+    def _in_range(self, numbers: pd.Series, low: float, high: float) -> bool:
+        return numbers.notna().all() and _share(numbers.between(low, high)) >= self.threshold
+
+    def infer_type(self, column: str, series: pd.Series, dtype: str) -> Optional[str]:
+        values = series.dropna()
+        if len(values) == 0:
+            return None
+        if len(values) > self.max_values:
+            values = values.sample(self.max_values, random_state=42)
+        tokens = set(name_tokens(column))
+
+        def hinted(semantic_type: str) -> bool:
+            return bool(tokens & NAME_HINTS[semantic_type])
+
+        if dtype == "number":
+            numbers = pd.to_numeric(values, errors="coerce")
+            if hinted("latitude") and self._in_range(numbers, -90, 90):
+                return "latitude"
+            if hinted("longitude") and self._in_range(numbers, -180, 180):
+                return "longitude"
+            if hinted("year") and self._in_range(numbers, 1000, 2200):
+                return "year"
+            if hinted("zip code") and self._in_range(numbers, 0, 99999):
+                return "zip code"
+            if hinted("identifier"):
+                return "identifier"
+            return None
+
+        if dtype not in ("string", "category", "object", "boolean"):
+            return None
+        text = values.astype(str).str.strip()
+        if self._matches(text, EMAIL_PATTERN):
+            return "email"
+        if self._matches(text, URL_PATTERN):
+            return "url"
+        if self._matches(text, IP_PATTERN):
+            return "ip address"
+        if self._matches(text, UUID_PATTERN):
+            return "identifier"
+        if hinted("zip code") and self._matches(text, ZIP_PATTERN):
+            return "zip code"
+        if hinted("phone number") and self._matches(text, PHONE_PATTERN) and \
+                _share(text.str.count(r"\d") >= 7) >= self.threshold:
+            return "phone number"
+        lower = text.str.lower()
+        if _share(lower.isin(GENDER_VALUES)) >= self.threshold and \
+                (tokens & {"gender", "sex"} or lower.isin(CORE_GENDER_VALUES).any()):
+            return "gender"
+        for semantic_type in ("city", "country", "state", "identifier"):
+            if hinted(semantic_type):
+                return semantic_type
+        return None
+
+    def infer(self, column: str, series: pd.Series, dtype: str) -> Optional[Tuple[str, str]]:
+        """Return (semantic_type, description) for the column, None if no type is detected"""
+        semantic_type = self.infer_type(column, series, dtype)
+        if semantic_type is None:
+            return None
+        return semantic_type, DESCRIPTIONS[semantic_type]
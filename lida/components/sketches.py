@@ -0,0 +1,220 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("lida")
+
+
+class HyperLogLog(object):
+    """HyperLogLog distinct count sketch with 2**p registers (relative error ~1.04 / sqrt(2**p))"""
+
+    def __init__(self, p: int = 14) -> None:
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values: pd.Series) -> None:
+        if len(values) == 0:
+            return
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+        index = (hashes & np.uint64(self.m - 1)).astype(np.int64)
+        # the remaining 64 - p bits fit a float64 mantissa, so frexp gives their exact bit length
+        remaining = (hashes >> np.uint64(self.p)).astype(np.float64)
+        bit_length = np.frexp(remaining)[1]
+        ranks = (64 - self.p - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, ranks)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            # linear counting for small cardinalities
+            estimate = self.m * np.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class QuantileSketch(object):
+    """Mergeable KLL-style quantile sketch.
+
+    Values are kept in levels of at most k items, an item at level i standing for 2**i values.
+    A full level is sorted and every other item (random offset) is promoted to the next level,
+    so memory is O(k log(n / k)) and rank error O(log(n / k) / k).
+    """
+
+    def __init__(self, k: int = 256, seed: int = 42) -> None:
+        self.k = k
+        self.count = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        self.count += other.count
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compact()
+
+    def _compact(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                # an odd item out stays at this level
+                kept, items = items[len(items) - len(items) % 2:], items[:len(items) - len(items) % 2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate(
+                    [self.levels[level + 1], items[self.rng.integers(2)::2]])
+                self.levels[level] = kept
+            level += 1
+
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        if self.count == 0:
+            return [None] * len(qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level)
+                                  for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1])
+        return [float(items[min(position, len(items) - 1)]) for position in positions]
+
+
+class MisraGries(object):
+    """Mergeable Misra-Gries heavy hitters summary with at most `capacity` counters.
+
+    Reported counts are lower bounds, off by at most n / (capacity + 1).
+    """
+
+    def __init__(self, capacity: int = 200) -> None:
+        self.capacity = capacity
+        self.counters: Dict[Any, int] = {}
+
+    def update(self, values: pd.Series) -> None:
+        self._merge_counts(values.value_counts(dropna=True).to_dict())
+
+    def merge(self, other: "MisraGries") -> None:
+        self._merge_counts(other.counters)
+
+    def _merge_counts(self, counts: Dict[Any, int]) -> None:
+        counters = dict(self.counters)
+        for value, count in counts.items():
+            counters[value] = counters.get(value, 0) + int(count)
+        if len(counters) > self.capacity:
+            threshold = sorted(counters.values(), reverse=True)[self.capacity]
+            counters = {value: count - threshold for value, count in counters.items() if count > threshold}
+        self.counters = counters
+
+    def top_k(self, k: int) -> List[Tuple[Any, int]]:
+        return sorted(self.counters.items(), key=lambda item: -item[1])[:k]
+
+
+def _to_python(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class ColumnSketch(object):
+    """Bounded-memory, mergeable statistics of one column, updated chunk by chunk.
+
+    Tracks counts, a distinct count (HyperLogLog), and depending on the summary dtype: mean,
+    std, min, max and p5/p50/p95 (QuantileSketch) of numbers, min and max of dates, and the
+    most frequent values (MisraGries) of everything else.
+    """
+
+    def __init__(self, dtype: str, top_k: int = 10, chunk_size: int = 100000) -> None:
+        self.dtype = dtype
+        self.top_k = top_k
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.nulls = 0
+        self.distinct = HyperLogLog()
+        self.min = None
+        self.max = None
+        self.numbers = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.quantiles = QuantileSketch() if dtype == "number" else None
+        self.frequent = MisraGries(capacity=max(200, 20 * top_k)) if dtype not in ("number", "date") else None
+
+    def update(self, series: pd.Series) -> None:
+        for start in range(0, len(series), self.chunk_size):
+            self._update_chunk(series.iloc[start:start + self.chunk_size])
+
+    def _update_chunk(self, chunk: pd.Series) -> None:
+        values = chunk.dropna()
+        self.count += len(chunk)
+        self.nulls += len(chunk) - len(values)
+        self.distinct.update(values)
+        if self.dtype == "number":
+            numbers = pd.to_numeric(values, errors="coerce").dropna().to_numpy(dtype=np.float64)
+            if len(numbers):
+                self._update_moments(len(numbers), numbers.mean(), ((numbers - numbers.mean()) ** 2).sum())
+                self._update_range(values.min(), values.max())
+            self.quantiles.update(numbers)
+        elif self.dtype == "date":
+            dates = values if pd.api.types.is_datetime64_any_dtype(values) else \
+                pd.to_datetime(values, errors="coerce")
+            dates = dates.dropna()
+            if len(dates):
+                self._update_range(dates.min(), dates.max())
+        else:
+            self.frequent.update(values)
+
+    def _update_moments(self, n: int, mean: float, m2: float) -> None:
+        # parallel variance (Chan et al.)
+        total = self.numbers + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta ** 2 * self.numbers * n / total
+        self.mean += delta * n / total
+        self.numbers = total
+
+    def _update_range(self, low, high) -> None:
+        self.min = low if self.min is None or low < self.min else self.min
+        self.max = high if self.max is None or high > self.max else self.max
+
+    def merge(self, other: "ColumnSketch") -> None:
+        self.count += other.count
+        self.nulls += other.nulls
+        self.distinct.merge(other.distinct)
+        if other.numbers:
+            self._update_moments(other.numbers, other.mean, other.m2)
+        if other.min is not None:
+            self._update_range(other.min, other.max)
+        if self.quantiles is not None and other.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        if self.frequent is not None and other.frequent is not None:
+            self.frequent.merge(other.frequent)
+
+    def properties(self) -> Dict:
+        """Summary properties of the column, in the order used by Summarizer"""
+        properties = {}
+        if self.dtype == "number":
+            properties["std"] = float(np.sqrt(self.m2 / (self.numbers - 1))) if self.numbers > 1 else None
+            properties["min"] = _to_python(self.min)
+            properties["max"] = _to_python(self.max)
+            for name, value in zip(("p5", "p50", "p95"), self.quantiles.quantiles([0.05, 0.5, 0.95])):
+                properties[name] = value
+        elif self.dtype == "date":
+            properties["min"] = self.min
+            properties["max"] = self.max
+        else:
+            properties["top_values"] = [[_to_python(value), count]
+                                        for value, count in self.frequent.top_k(self.top_k)]
+        # the estimate may exceed the number of values for tiny columns
+        properties["num_unique_values"] = min(self.distinct.count(), self.count - self.nulls)
+        return properties
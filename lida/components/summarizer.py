@@ -1,9 +1,19 @@
+import copy
 import json
 import logging
-from typing import Union
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
-from lida.utils import clean_code_snippet, read_dataframe
+from lida.utils import clean_code_snippet, iter_dataframe_chunks, read_dataframe
 from lida.datamodel import TextGenerationConfig
+from .annotations import ColumnAnnotationCache
+from .associations import compute_associations
+from .limiter import submit_in_context
+from .semantic import SemanticTypeInferrer
+from .sketches import ColumnSketch
 from llmx import TextGenerator
 import warnings
 
@@ -15,12 +25,97 @@ iii.) ALWAYS generate a semantic_type (a single word) for each field given its v
 You must return an updated JSON dictionary without any preamble or explanation.
 """
 
+delta_system_prompt = """
+You are an experienced data analyst that can annotate datasets. Given the name, dtype and sample values of each field of a dataset, return a JSON object of the form
+{"name": <dataset name>, "dataset_description": <dataset description>, "fields": {<column>: [<semantic_type>, <description>], ...}}
+with an entry for every field. The semantic_type is a single word given the field values e.g. company, city, number, supplier, location, gender, longitude, latitude, url, ip address, zip code, email, etc.
+Only return the JSON object, without any preamble or explanation.
+"""
+
+dataset_system_prompt = """
+You are an experienced data analyst that can annotate datasets. Given the annotated fields of a dataset, return a JSON object of the form
+{"name": <dataset name>, "dataset_description": <dataset description>}
+Only return the JSON object, without any preamble or explanation.
+"""
+
 logger = logging.getLogger("lida")
 
+# most frequent values reported for non numeric fields
+TOP_VALUES = 10
+# properties added with distribution_stats
+DISTRIBUTION_STATS = ("p5", "p50", "p95", "top_values")
+
+# (summarizer, DataFrame, n_samples) inherited by forked profiling workers
+_profile_state = None
+
+
+def _profile_forked_shard(positions: List[int]) -> list[dict]:
+    summarizer, df, n_samples = _profile_state
+    return summarizer._profile_shard(df, positions, n_samples)
+
 
 class Summarizer():
-    def __init__(self) -> None:
+    def __init__(self, chunk_tokens: Optional[int] = None, max_workers: int = 8,
+                 chunk_retries: int = 1, enrich_protocol: str = "full",
+                 annotation_cache: Optional[ColumnAnnotationCache] = None,
+                 infer_semantic_types: bool = True,
+                 sketch_threshold: Optional[int] = 1000000, sketch_sample_rows: int = 10000,
+                 profile_workers: int = 1, profile_processes: bool = False,
+                 distribution_stats: bool = False) -> None:
+        """
+        :param chunk_tokens: If set, enrich wide summaries in concurrent chunks of fields of at
+            most (roughly) chunk_tokens prompt tokens each, see enrich_chunked.
+        :param max_workers: Maximum number of chunks enriched concurrently.
+        :param chunk_retries: Number of times a failed chunk is retried.
+        :param enrich_protocol: "full" asks the model to return the annotated summary, "delta"
+            asks only for the annotations and merges them locally, see enrich_delta.
+        :param annotation_cache: If set, fields with a cached annotation are not sent to the
+            model, see enrich_cached.
+        :param infer_semantic_types: Fill semantic_type and description of common types (email,
+            url, zip code, latitude, ...) locally, see SemanticTypeInferrer.
+        :param sketch_threshold: DataFrames with more rows are summarized with approximate,
+            bounded-memory statistics, see get_sketch_column_properties. None disables sketches.
+        :param sketch_sample_rows: Number of rows sampled for dtypes and samples in sketch mode.
+        :param profile_workers: Number of column shards profiled concurrently, see
+            get_parallel_column_properties.
+        :param profile_processes: Profile shards in forked processes instead of threads.
+        :param distribution_stats: Add p5/p50/p95 of number fields and the most frequent values
+            (top_values) of other fields, in exact and sketch mode alike. Off by default to keep
+            summaries, and the prompts they go into, small.
+        """
+        self._check_protocol(enrich_protocol)
         self.summary = None
+        self.enrich_protocol = enrich_protocol
+        self.annotation_cache = annotation_cache
+        self.semantic_inferrer = SemanticTypeInferrer() if infer_semantic_types else None
+        self.sketch_threshold = sketch_threshold
+        self.sketch_sample_rows = sketch_sample_rows
+        self.profile_workers = profile_workers
+        self.profile_processes = profile_processes
+        self.distribution_stats = distribution_stats
+        self.chunk_tokens = chunk_tokens
+        self.max_workers = max_workers
+        self.chunk_retries = chunk_retries
+
+    @staticmethod
+    def _check_protocol(enrich_protocol: str) -> None:
+        if enrich_protocol not in ("full", "delta"):
+            raise ValueError(f"Unsupported enrich_protocol: {enrich_protocol}")
+
+    def with_options(self, **options) -> "Summarizer":
+        """A copy of this summarizer with the given (non None) constructor options replaced,
+        e.g. to use chunked or delta enrichment for a single summarize call"""
+        options = {name: value for name, value in options.items() if value is not None}
+        if not options:
+            return self
+        if "enrich_protocol" in options:
+            self._check_protocol(options["enrich_protocol"])
+        summarizer = copy.copy(self)
+        for name, value in options.items():
+            if not hasattr(summarizer, name):
+                raise ValueError(f"Unknown Summarizer option: {name}")
+            setattr(summarizer, name, value)
+        return summarizer
 
     def check_type(self, dtype: str, value):
         """Cast value to right type to ensure it is JSON serializable"""
@@ -31,69 +126,217 @@ class Summarizer():
         else:
             return value
 
+    def get_dtype(self, series: pd.Series) -> str:
+        """Map the dtype of a column to number, boolean, date, category or string"""
+        dtype = series.dtype
+        if dtype in [int, float, complex]:
+            return "number"
+        elif hasattr(dtype, "pyarrow_dtype"):
+            # Arrow-backed columns, e.g. from read_dataframe(dtype_backend="pyarrow")
+            return self._arrow_dtype(series)
+        elif dtype == bool:
+            return "boolean"
+        elif pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            # sized and nullable numbers, e.g. int32 or float32 from optimize_dtypes
+            return "number"
+        elif dtype == object or pd.api.types.is_string_dtype(dtype):
+            # object or string (the default for text in pandas 3) columns
+            # Check if the string column can be cast to a valid datetime
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    pd.to_datetime(series, errors='raise')
+                    return "date"
+            except ValueError:
+                # Check if the string column has a limited number of values
+                if series.nunique() / len(series) < 0.5:
+                    return "category"
+                else:
+                    return "string"
+        elif isinstance(dtype, pd.CategoricalDtype):
+            return "category"
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            return "date"
+        else:
+            return str(dtype)
+
+    def _arrow_dtype(self, series: pd.Series) -> str:
+        import pyarrow as pa
+        arrow_type = series.dtype.pyarrow_dtype
+        if pa.types.is_boolean(arrow_type):
+            return "boolean"
+        if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+            return "number"
+        if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+            return "date"
+        if pa.types.is_dictionary(arrow_type):
+            return "category"
+        if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+            return self.get_dtype(series.astype(object))
+        return str(series.dtype)
+
     def get_column_properties(self, df: pd.DataFrame, n_samples: int = 3) -> list[dict]:
         """Get properties of each column in a pandas DataFrame"""
+        if self.sketch_threshold is not None and len(df) > self.sketch_threshold:
+            return self.get_sketch_column_properties(df, n_samples)
+        if self.profile_workers > 1 and len(df.columns) > 1:
+            return self.get_parallel_column_properties(df, n_samples)
+        return self._profile_shard(df, range(len(df.columns)), n_samples)
+
+    def get_field_properties(self, column, series: pd.Series, n_samples: int = 3) -> dict:
+        """Get properties of a single column"""
+        dtype = series.dtype
+        properties = {}
+        properties["dtype"] = self.get_dtype(series)
+        if properties["dtype"] == "number":
+            properties["std"] = self.check_type(dtype, series.std())
+            properties["min"] = self.check_type(dtype, series.min())
+            properties["max"] = self.check_type(dtype, series.max())
+            if self.distribution_stats:
+                # the same keys as get_sketch_column_properties, whatever the row count
+                for name, value in zip(("p5", "p50", "p95"), series.quantile([0.05, 0.5, 0.95]).tolist()):
+                    properties[name] = None if pd.isna(value) else float(value)
+
+        # add min max if dtype is date
+        if properties["dtype"] == "date":
+            try:
+                properties["min"] = series.min()
+                properties["max"] = series.max()
+            except TypeError:
+                cast_date_col = pd.to_datetime(series, errors='coerce')
+                properties["min"] = cast_date_col.min()
+                properties["max"] = cast_date_col.max()
+        elif properties["dtype"] != "number" and self.distribution_stats:
+            counts = series.value_counts().head(TOP_VALUES)
+            properties["top_values"] = [[value, count] for value, count in
+                                        zip(counts.index.tolist(), counts.tolist())]
+        # Add additional properties to the output dictionary
+        nunique = series.nunique()
+        if "samples" not in properties:
+            non_null_values = series[series.notnull()].unique()
+            n_samples = min(n_samples, len(non_null_values))
+            samples = pd.Series(non_null_values).sample(
+                n_samples, random_state=42).tolist()
+            properties["samples"] = samples
+        properties["num_unique_values"] = nunique
+        properties["semantic_type"] = ""
+        properties["description"] = ""
+        if self.semantic_inferrer is not None:
+            inferred = self.semantic_inferrer.infer(column, series, properties["dtype"])
+            if inferred:
+                properties["semantic_type"], properties["description"] = inferred
+        return {"column": column, "properties": properties}
+
+    def _profile_shard(self, df: pd.DataFrame, positions, n_samples: int) -> list[dict]:
+        return [self.get_field_properties(df.columns[i], df.iloc[:, i], n_samples) for i in positions]
+
+    def get_parallel_column_properties(self, df: pd.DataFrame, n_samples: int = 3) -> list[dict]:
+        """Profile contiguous shards of columns concurrently and merge them in column order.
+
+        Shards run in a thread pool, or with profile_processes in forked worker processes that
+        share the DataFrame copy-on-write instead of receiving a pickled copy. Forking a process
+        with other threads alive (e.g. a web server) can deadlock the children, so threads are
+        used then.
+        """
+        n_shards = min(self.profile_workers, len(df.columns))
+        shards = [positions.tolist() for positions in np.array_split(np.arange(len(df.columns)), n_shards)]
+        can_fork = "fork" in multiprocessing.get_all_start_methods() and threading.active_count() == 1
+        if self.profile_processes and not can_fork:
+            logger.info("Profiling in threads, forking is not safe with other threads alive")
+        if self.profile_processes and can_fork:
+            global _profile_state
+            _profile_state = (self, df, n_samples)
+            try:
+                with ProcessPoolExecutor(n_shards, mp_context=multiprocessing.get_context("fork")) as pool:
+                    results = list(pool.map(_profile_forked_shard, shards))
+            finally:
+                _profile_state = None
+        else:
+            with ThreadPoolExecutor(n_shards) as pool:
+                results = list(pool.map(lambda shard: self._profile_shard(df, shard, n_samples), shards))
+        return [field for shard in results for field in shard]
+
+    def get_sketch_column_properties(self, df: pd.DataFrame, n_samples: int = 3) -> list[dict]:
+        """Get properties of each column in bounded memory, for very long DataFrames.
+
+        Distinct counts and, with distribution_stats, p5/p50/p95 and the most frequent values
+        (top_values) are approximated with sketches (see ColumnSketch); dtypes and samples are
+        taken from a row sample.
+        """
+        sample_df = df.sample(min(len(df), self.sketch_sample_rows), random_state=42)
         properties_list = []
         for column in df.columns:
-            dtype = df[column].dtype
-            properties = {}
-            if dtype in [int, float, complex]:
-                properties["dtype"] = "number"
-                properties["std"] = self.check_type(dtype, df[column].std())
-                properties["min"] = self.check_type(dtype, df[column].min())
-                properties["max"] = self.check_type(dtype, df[column].max())
-
-            elif dtype == bool:
-                properties["dtype"] = "boolean"
-            elif dtype == object:
-                # Check if the string column can be cast to a valid datetime
-                try:
-                    with warnings.catch_warnings():
-                        warnings.simplefilter("ignore")
-                        pd.to_datetime(df[column], errors='raise')
-                        properties["dtype"] = "date"
-                except ValueError:
-                    # Check if the string column has a limited number of values
-                    if df[column].nunique() / len(df[column]) < 0.5:
-                        properties["dtype"] = "category"
-                    else:
-                        properties["dtype"] = "string"
-            elif pd.api.types.is_categorical_dtype(df[column]):
-                properties["dtype"] = "category"
-            elif pd.api.types.is_datetime64_any_dtype(df[column]):
-                properties["dtype"] = "date"
-            else:
-                properties["dtype"] = str(dtype)
-
-            # add min max if dtype is date
-            if properties["dtype"] == "date":
-                try:
-                    properties["min"] = df[column].min()
-                    properties["max"] = df[column].max()
-                except TypeError:
-                    cast_date_col = pd.to_datetime(df[column], errors='coerce')
-                    properties["min"] = cast_date_col.min()
-                    properties["max"] = cast_date_col.max()
-            # Add additional properties to the output dictionary
-            nunique = df[column].nunique()
-            if "samples" not in properties:
-                non_null_values = df[column][df[column].notnull()].unique()
-                n_samples = min(n_samples, len(non_null_values))
-                samples = pd.Series(non_null_values).sample(
-                    n_samples, random_state=42).tolist()
-                properties["samples"] = samples
-            properties["num_unique_values"] = nunique
-            properties["semantic_type"] = ""
-            properties["description"] = ""
-            properties_list.append(
-                {"column": column, "properties": properties})
-
+            sketch = ColumnSketch(self.get_dtype(sample_df[column]), top_k=TOP_VALUES)
+            sketch.update(df[column])
+            properties_list.append(self._sketch_field(column, sketch, sample_df[column], n_samples))
         return properties_list
 
+    def get_streaming_column_properties(
+            self, file_location: str, n_samples: int = 3, encoding: str = 'utf-8',
+            chunk_size: int = 100000) -> Tuple[list[dict], pd.DataFrame]:
+        """Get properties of each column of a csv, tsv or parquet file without loading it.
+
+        The file is read chunk by chunk into mergeable column sketches (see ColumnSketch) and a
+        uniform random sample of sketch_sample_rows rows, so memory does not grow with the file.
+        Dtypes are detected on the first chunk.
+
+        :return: The properties of each column and the row sample.
+        """
+        rng = np.random.default_rng(42)
+        sketches, sample_df, sample_keys = {}, None, np.empty(0)
+        for chunk in iter_dataframe_chunks(file_location, chunk_size=chunk_size, encoding=encoding):
+            if not sketches:
+                sketches = {column: ColumnSketch(self.get_dtype(chunk[column]), top_k=TOP_VALUES,
+                                                 chunk_size=chunk_size)
+                            for column in chunk.columns}
+            for column, sketch in sketches.items():
+                sketch.update(chunk[column])
+            # bottom-k sampling: keep the rows with the smallest random keys
+            keys = np.concatenate([sample_keys, rng.random(len(chunk))])
+            rows = chunk if sample_df is None else pd.concat([sample_df, chunk], ignore_index=True)
+            keep = np.argsort(keys)[:self.sketch_sample_rows]
+            sample_df, sample_keys = rows.iloc[keep].reset_index(drop=True), keys[keep]
+        if sample_df is None:
+            raise ValueError(f"No rows to summarize in {file_location}")
+
+        properties_list = [self._sketch_field(column, sketch, sample_df[column], n_samples)
+                           for column, sketch in sketches.items()]
+        return properties_list, sample_df
+
+    def _sketch_field(self, column, sketch: ColumnSketch, sample: pd.Series, n_samples: int) -> dict:
+        properties = {"dtype": sketch.dtype}
+        properties.update(sketch.properties())
+        if not self.distribution_stats:
+            for name in DISTRIBUTION_STATS:
+                properties.pop(name, None)
+        non_null_values = sample[sample.notnull()].unique()
+        properties["samples"] = pd.Series(non_null_values).sample(
+            min(n_samples, len(non_null_values)), random_state=42).tolist()
+        properties["num_unique_values"] = properties.pop("num_unique_values")
+        properties["semantic_type"] = ""
+        properties["description"] = ""
+        if self.semantic_inferrer is not None:
+            inferred = self.semantic_inferrer.infer(column, sample, properties["dtype"])
+            if inferred:
+                properties["semantic_type"], properties["description"] = inferred
+        return {"column": column, "properties": properties}
+
     def enrich(self, base_summary: dict, text_gen: TextGenerator,
                textgen_config: TextGenerationConfig) -> dict:
         """Enrich the data summary with descriptions"""
         logger.info(f"Enriching the data summary with descriptions")
+        if self.annotation_cache is not None:
+            return self.enrich_cached(base_summary, text_gen, textgen_config)
+        return self._enrich(base_summary, text_gen, textgen_config)
+
+    def _enrich(self, base_summary: dict, text_gen: TextGenerator,
+                textgen_config: TextGenerationConfig) -> dict:
+        if self.chunk_tokens:
+            chunks = self.chunk_fields(base_summary["fields"], text_gen, self.chunk_tokens)
+            if len(chunks) > 1:
+                return self.enrich_chunked(base_summary, chunks, text_gen, textgen_config)
+        if self.enrich_protocol == "delta":
+            return self.enrich_delta(base_summary, text_gen, textgen_config)
 
         messages = [
             {"role": "system", "content": system_prompt},
@@ -112,22 +355,243 @@ class Summarizer():
             error_msg = f"The model did not return a valid JSON object while attempting to generate an enriched data summary. Consider using a default summary or  a larger model with higher max token length. | {response.text[0]['content']}"
             logger.info(error_msg)
             print(response.text[0]["content"])
-            raise ValueError(error_msg + "" + response.usage)
+            raise ValueError(error_msg + "" + str(response.usage))
+        return enriched_summary
+
+    def enrich_cached(self, base_summary: dict, text_gen: TextGenerator,
+                      textgen_config: TextGenerationConfig) -> dict:
+        """Annotate fields from the annotation cache and enrich only the remaining fields.
+
+        New annotations are added to the cache. If every field and the dataset description are
+        cached, no LLM call is made; if only the dataset is new, only its description is requested.
+        """
+        fields, missing = [], []
+        for field in base_summary["fields"]:
+            annotation = self.annotation_cache.get(field)
+            if annotation:
+                field = self._merge_field(field, {"properties": annotation})
+            else:
+                missing.append(field)
+            fields.append(field)
+        enriched_summary = {**base_summary, "fields": fields}
+        dataset_description = self.annotation_cache.get_dataset(base_summary)
+        if dataset_description and not enriched_summary.get("dataset_description"):
+            enriched_summary["dataset_description"] = dataset_description
+        logger.info("%d of %d fields annotated from cache", len(fields) - len(missing), len(fields))
+        if not missing:
+            if not enriched_summary.get("dataset_description"):
+                description = self.describe_dataset(enriched_summary, text_gen, textgen_config)
+                for key in ("name", "dataset_description"):
+                    if description.get(key) and not enriched_summary.get(key):
+                        enriched_summary[key] = description[key]
+                self.annotation_cache.put_dataset(enriched_summary)
+            return enriched_summary
+
+        partial_summary = self._enrich({**base_summary, "fields": missing}, text_gen, textgen_config)
+        enriched_fields = {
+            field["column"]: field for field in partial_summary.get("fields") or []
+            if isinstance(field, dict) and "column" in field}
+        enriched_summary["fields"] = [
+            self._merge_field(field, enriched_fields.get(field["column"])) for field in fields]
+        for key in ("name", "dataset_description"):
+            if partial_summary.get(key) and not enriched_summary.get(key):
+                enriched_summary[key] = partial_summary[key]
+
+        missing_columns = {field["column"] for field in missing}
+        for field in enriched_summary["fields"]:
+            if field["column"] in missing_columns:
+                self.annotation_cache.put(field)
+        self.annotation_cache.put_dataset(enriched_summary)
         return enriched_summary
 
+    def describe_dataset(self, summary: dict, text_gen: TextGenerator,
+                         textgen_config: TextGenerationConfig) -> dict:
+        """Ask the model only for the name and dataset description of an annotated summary"""
+        compact_fields = [
+            {"column": field["column"], "dtype": field["properties"].get("dtype"),
+             "semantic_type": field["properties"].get("semantic_type"),
+             "description": field["properties"].get("description")}
+            for field in summary["fields"]]
+        messages = [
+            {"role": "system", "content": dataset_system_prompt},
+            {"role": "assistant", "content": f"""
+        Describe the dataset {summary.get("name", "")} with the fields below. Only return a JSON object.
+        {json.dumps(compact_fields, default=str)}
+        """},
+        ]
+
+        response = text_gen.generate(messages=messages, config=textgen_config)
+        try:
+            description = json.loads(clean_code_snippet(response.text[0]["content"]))
+        except json.decoder.JSONDecodeError:
+            logger.info("The model did not return a valid JSON dataset description | %s",
+                        response.text[0]["content"])
+            return {}
+        return description if isinstance(description, dict) else {}
+
+    def enrich_delta(self, base_summary: dict, text_gen: TextGenerator,
+                     textgen_config: TextGenerationConfig) -> dict:
+        """Ask the model only for the name, dataset description and the semantic type and
+        description of each field, and merge them into the locally computed summary"""
+        compact_fields = [
+            {"column": field["column"], "dtype": field["properties"].get("dtype"),
+             "samples": field["properties"].get("samples")}
+            for field in base_summary["fields"]]
+        messages = [
+            {"role": "system", "content": delta_system_prompt},
+            {"role": "assistant", "content": f"""
+        Annotate the fields of the dataset {base_summary.get("name", "")} below. Only return a JSON object.
+        {json.dumps(compact_fields, default=str)}
+        """},
+        ]
+
+        response = text_gen.generate(messages=messages, config=textgen_config)
+        try:
+            annotations = json.loads(clean_code_snippet(response.text[0]["content"]))
+            if not isinstance(annotations, dict):
+                raise ValueError("expected a JSON object")
+        except (json.decoder.JSONDecodeError, ValueError) as exception_error:
+            error_msg = f"The model did not return a valid JSON object of field annotations while attempting to generate an enriched data summary. | {exception_error} | {response.text[0]['content']}"
+            logger.info(error_msg)
+            raise ValueError(error_msg) from exception_error
+
+        field_annotations = annotations.get("fields") or {}
+        enriched_summary = dict(base_summary)
+        for key in ("name", "dataset_description"):
+            if annotations.get(key):
+                enriched_summary[key] = annotations[key]
+        enriched_fields = []
+        for field in base_summary["fields"]:
+            annotation = field_annotations.get(str(field["column"])) if isinstance(
+                field_annotations, dict) else None
+            if isinstance(annotation, dict):
+                annotation = [annotation.get("semantic_type"), annotation.get("description")]
+            if isinstance(annotation, (list, tuple)) and len(annotation) == 2:
+                semantic_type, description = annotation
+                annotation = {"properties": {"semantic_type": semantic_type, "description": description}}
+            else:
+                annotation = None
+            enriched_fields.append(self._merge_field(field, annotation))
+        enriched_summary["fields"] = enriched_fields
+        return enriched_summary
+
+    @staticmethod
+    def count_tokens(text: str, text_gen: TextGenerator) -> int:
+        try:
+            return text_gen.count_tokens(text)
+        except Exception:
+            # roughly four characters per token
+            return len(text) // 4
+
+    def chunk_fields(self, fields: List[dict], text_gen: TextGenerator,
+                     chunk_tokens: int) -> List[List[dict]]:
+        """Partition fields, in order, into batches of at most chunk_tokens prompt tokens"""
+        chunks, chunk, used = [], [], 0
+        for field in fields:
+            tokens = self.count_tokens(str(field), text_gen)
+            if chunk and used + tokens > chunk_tokens:
+                chunks.append(chunk)
+                chunk, used = [], 0
+            chunk.append(field)
+            used += tokens
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def enrich_chunked(self, base_summary: dict, chunks: List[List[dict]],
+                       text_gen: TextGenerator, textgen_config: TextGenerationConfig) -> dict:
+        """Enrich each chunk of fields concurrently and merge the results into base_summary.
+
+        Chunks that fail (e.g. malformed JSON) are retried up to chunk_retries times; fields of
+        chunks that still fail keep their empty annotations. Raises ValueError only if every
+        chunk fails.
+        """
+        logger.info("Enriching %d fields in %d chunks", len(base_summary["fields"]), len(chunks))
+
+        def enrich_chunk(chunk: List[dict]) -> dict:
+            return self._enrich({**base_summary, "fields": chunk}, text_gen, textgen_config)
+
+        results = [None] * len(chunks)
+        pending = list(range(len(chunks)))
+        errors = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+            for attempt in range(self.chunk_retries + 1):
+                futures = {i: submit_in_context(pool, enrich_chunk, chunks[i]) for i in pending}
+                pending = []
+                for i, future in futures.items():
+                    try:
+                        results[i] = future.result()
+                    except Exception as exception_error:
+                        errors[i] = exception_error
+                        pending.append(i)
+                if not pending:
+                    break
+                logger.info("Retrying %d failed enrichment chunks", len(pending))
+
+        if len(pending) == len(chunks):
+            raise ValueError(
+                f"Enrichment failed for all {len(chunks)} chunks of the data summary | {errors[pending[0]]}")
+        for i in pending:
+            logger.warning("Enrichment failed for fields %s: %s",
+                           [field["column"] for field in chunks[i]], errors[i])
+
+        enriched_fields = {}
+        enriched_summary = dict(base_summary)
+        for result in results:
+            if not isinstance(result, dict):
+                continue
+            for key in ("name", "dataset_description"):
+                if result.get(key) and not enriched_summary.get(key):
+                    enriched_summary[key] = result[key]
+            for field in result.get("fields") or []:
+                if isinstance(field, dict) and "column" in field:
+                    enriched_fields[field["column"]] = field
+        # keep the original field order and local stats, take annotations from the model
+        enriched_summary["fields"] = [
+            self._merge_field(field, enriched_fields.get(field["column"]))
+            for field in base_summary["fields"]]
+        return enriched_summary
+
+    @staticmethod
+    def _merge_field(field: dict, enriched_field: Optional[dict]) -> dict:
+        if not enriched_field:
+            return field
+        properties = dict(field["properties"])
+        enriched_properties = enriched_field.get("properties") or {}
+        for key in ("semantic_type", "description"):
+            if enriched_properties.get(key):
+                properties[key] = enriched_properties[key]
+        return {**field, "properties": properties}
+
     def summarize(
             self, data: Union[pd.DataFrame, str],
             text_gen: TextGenerator, file_name="", n_samples: int = 3,
             textgen_config=TextGenerationConfig(n=1),
-            summary_method: str = "default", encoding: str = 'utf-8') -> dict:
-        """Summarize data from a pandas DataFrame or a file location"""
+            summary_method: str = "default", encoding: str = 'utf-8',
+            top_k_associations: int = 0, streaming: bool = False,
+            data_properties: Optional[list[dict]] = None,
+            chunk_tokens: Optional[int] = None, enrich_protocol: Optional[str] = None) -> dict:
+        """Summarize data from a pandas DataFrame or a file location.
+
+        If top_k_associations > 0, the strongest top_k_associations field pairs (see
+        compute_associations) are added to the summary under "associations". If streaming is
+        set and data is a file location, the file is summarized chunk by chunk (see
+        get_streaming_column_properties) instead of being loaded into memory. data_properties
+        are precomputed column properties of data, e.g. from get_streaming_column_properties.
+        chunk_tokens and enrich_protocol override the constructor options for this call.
+        """
 
         # if data is a file path, read it into a pandas DataFrame, set file_name to the file name
         if isinstance(data, str):
             file_name = data.split("/")[-1]
-            # modified to include encoding
-            data = read_dataframe(data, encoding=encoding)
-        data_properties = self.get_column_properties(data, n_samples)
+            if streaming:
+                data_properties, data = self.get_streaming_column_properties(
+                    data, n_samples, encoding=encoding)
+            else:
+                # modified to include encoding
+                data = read_dataframe(data, encoding=encoding)
+        if data_properties is None:
+            data_properties = self.get_column_properties(data, n_samples)
 
         # default single stage summary construction
         base_summary = {
@@ -141,7 +605,8 @@ class Summarizer():
 
         if summary_method == "llm":
             # two stage summarization with llm enrichment
-            data_summary = self.enrich(
+            data_summary = self.with_options(
+                chunk_tokens=chunk_tokens, enrich_protocol=enrich_protocol).enrich(
                 base_summary,
                 text_gen=text_gen,
                 textgen_config=textgen_config)
@@ -155,5 +620,8 @@ class Summarizer():
 
         data_summary["field_names"] = data.columns.tolist()
         data_summary["file_name"] = file_name
+        if top_k_associations > 0:
+            data_summary["associations"] = compute_associations(
+                data, data_properties, top_k=top_k_associations)
 
         return data_summary
@@ -0,0 +1,453 @@
+import ast
+import difflib
+import re
+from typing import Dict, List, Optional, Set
+
+from lida.datamodel import Summary
+
+
+# keyword arguments that name a data field in seaborn, plotly express and altair calls
+ENCODING_KEYWORDS = {
+    "x", "y", "x2", "y2", "hue", "size", "style", "col", "row", "column", "units", "weights",
+    "color", "facet_row", "facet_col", "names", "values", "theta", "text", "shape", "detail",
+    "opacity", "z", "line_group", "symbol", "hover_name", "field", "tooltip"}
+
+# seaborn helpers that take style keywords rather than field names
+SEABORN_STYLE_FUNCTIONS = {"despine", "color_palette", "axes_style", "plotting_context", "palplot"}
+
+# dataframe methods whose first argument (or by/subset keyword) names columns of data
+COLUMN_METHODS = {"groupby", "sort_values", "set_index", "drop_duplicates", "dropna", "nlargest", "nsmallest"}
+
+# altair channel classes whose first positional argument is a field shorthand
+ALTAIR_CHANNELS = {
+    "X", "Y", "X2", "Y2", "Color", "Size", "Shape", "Opacity", "Theta", "Radius", "Text",
+    "Tooltip", "Detail", "Row", "Column", "Facet", "Order", "Latitude", "Longitude"}
+
+# column names pandas and altair create implicitly (value_counts, melt, fold, reset_index ..)
+IMPLICIT_COLUMNS = {"index", "count", "value", "variable", "key", "size", "proportion", "level_0"}
+# columns of describe()
+DESCRIBE_COLUMNS = {"count", "mean", "std", "min", "25%", "50%", "75%", "max", "unique", "top", "freq"}
+# methods that name columns after data values or computed names the code does not spell out
+OPAQUE_COLUMN_METHODS = {"pivot", "pivot_table", "unstack", "crosstab", "get_dummies", "add_prefix",
+                         "add_suffix", "explode", "json_normalize"}
+
+NUMERIC_METHODS = {"mean", "sum", "std", "var", "median", "quantile", "skew", "kurt", "cumsum", "prod"}
+NON_NUMERIC_DTYPES = {"string", "category"}
+
+# DataFrame attributes and methods whose result depends on which columns the frame has
+FRAME_WIDE_ATTRIBUTES = {"columns", "values", "dtypes", "T", "shape", "size", "axes", "iloc"}
+FRAME_WIDE_METHODS = NUMERIC_METHODS | {
+    "count", "agg", "aggregate", "apply", "applymap", "map", "max", "min", "nunique", "first",
+    "last", "transform", "value_counts", "describe", "corr", "cov", "corrwith", "melt", "stack",
+    "unstack", "pivot_table", "plot", "hist", "boxplot", "info", "to_dict", "to_records", "to_numpy",
+    "select_dtypes", "iterrows", "itertuples", "items", "keys", "dropna", "drop_duplicates",
+    "duplicated", "isna", "isnull", "notna", "notnull", "mode", "idxmax", "idxmin", "cummax",
+    "cummin", "cumprod", "diff", "pct_change", "rank", "round", "abs", "clip"}
+# DataFrame methods that return a frame with the same columns
+FRAME_METHODS = {
+    "copy", "dropna", "sort_values", "sort_index", "head", "tail", "sample", "reset_index",
+    "set_index", "query", "nlargest", "nsmallest", "drop", "rename", "assign", "fillna", "astype",
+    "filter", "drop_duplicates", "merge", "join", "where", "mask", "infer_objects"}
+# builtins that can reach columns by computed names
+DYNAMIC_NAMES = {"getattr", "eval", "exec", "globals", "locals", "vars", "__import__"}
+
+ALTAIR_TYPES = {"Q", "O", "N", "T", "G", "quantitative", "ordinal", "nominal", "temporal", "geojson"}
+SHORTHAND_PATTERN = re.compile(r"^\s*(?:(\w+)\()?([^()]*?)\)?\s*$")
+# identifiers and `quoted names` in expression strings (query, eval, vega expressions)
+IDENTIFIER_PATTERN = re.compile(r"`([^`]+)`|([A-Za-z_]\w*)")
+
+
+class CodeValidationError(Exception):
+    """Raised when chart code fails static validation against the dataset summary"""
+
+    def __init__(self, diagnostics: List[Dict]) -> None:
+        super().__init__(format_diagnostics(diagnostics))
+        self.diagnostics = diagnostics
+
+
+def parse_shorthand(shorthand: str) -> Optional[str]:
+    """Return the field referenced by an altair shorthand e.g. mean(Horsepower):Q -> Horsepower"""
+    if ":" in shorthand and shorthand.rsplit(":", 1)[1] in ALTAIR_TYPES:
+        shorthand = shorthand.rsplit(":", 1)[0]
+    match = SHORTHAND_PATTERN.match(shorthand)
+    if not match:
+        return shorthand
+    field = match.group(2).strip()
+    return field or None
+
+
+def _string_constants(node: ast.AST) -> List[str]:
+    """Return string constants in a node that is a constant or a list/tuple of constants"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return [elt.value for elt in node.elts
+                if isinstance(elt, ast.Constant) and isinstance(elt.value, str)]
+    return []
+
+
+def _call_name(node: ast.Call) -> Optional[str]:
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    return None
+
+
+def _call_root(node: ast.Call) -> Optional[str]:
+    """Return the module alias a call is made on e.g. sns for sns.barplot(..)"""
+    func = node.func
+    while isinstance(func, ast.Attribute):
+        func = func.value
+    return func.id if isinstance(func, ast.Name) else None
+
+
+def _is_data_column(node: ast.AST) -> Optional[str]:
+    """Return the column name if node is of the form data['column']"""
+    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) \
+            and node.value.id == "data":
+        names = _string_constants(node.slice)
+        if len(names) == 1 and isinstance(node.slice, ast.Constant):
+            return names[0]
+    return None
+
+
+def get_field_dtypes(summary: Summary) -> Dict[str, str]:
+    """Map each field in the summary to its summary dtype"""
+    dtypes = {}
+    for field in summary.fields or []:
+        if isinstance(field, dict) and "column" in field:
+            dtypes[field["column"]] = field.get("properties", {}).get("dtype", "")
+    return dtypes
+
+
+def defined_columns(tree: ast.AST) -> Set[str]:
+    """Collect column names the code creates itself (assignments, aggregations, renames ..)"""
+    defined = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Assign, ast.AugAssign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                if isinstance(target, ast.Subscript):
+                    defined.update(_string_constants(target.slice))
+                # df.columns = ['a', 'b']
+                if isinstance(target, ast.Attribute) and target.attr == "columns":
+                    defined.update(_string_constants(node.value))
+        elif isinstance(node, ast.Call):
+            name = _call_name(node)
+            # .agg(['mean', 'max']) names the result columns after the functions
+            if name in ("agg", "aggregate", "transform", "set_axis"):
+                for arg in node.args:
+                    defined.update(_string_constants(arg))
+            if name == "describe":
+                defined.update(DESCRIBE_COLUMNS)
+            for keyword in node.keywords:
+                if keyword.arg is None:
+                    continue
+                if name in ("agg", "aggregate", "assign") or (name or "").startswith("transform_"):
+                    defined.add(keyword.arg)
+                if keyword.arg in ("name", "names", "var_name", "value_name", "as_", "columns"):
+                    defined.update(_string_constants(keyword.value))
+                if keyword.arg in ("columns", "mapper", "index") and isinstance(keyword.value, ast.Dict):
+                    for value in keyword.value.values:
+                        defined.update(_string_constants(value))
+            if name in ("rename", "rename_axis", "to_frame", "DataFrame"):
+                for arg in node.args:
+                    if isinstance(arg, ast.Dict):
+                        key_or_value = arg.values if name == "rename" else arg.keys
+                        for item in key_or_value:
+                            if item is not None:
+                                defined.update(_string_constants(item))
+                    else:
+                        defined.update(_string_constants(arg))
+    return defined
+
+
+def opaque_columns(tree: ast.AST) -> bool:
+    """Whether the code creates columns whose names cannot be known statically.
+
+    e.g. pivot_table(columns='Origin') names columns after data values and
+    rename(columns=str.upper) after a function of the current names.
+    """
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        name = _call_name(node)
+        if name in OPAQUE_COLUMN_METHODS:
+            return True
+        if name in ("rename", "set_axis"):
+            mappings = list(node.args[:1]) + [keyword.value for keyword in node.keywords
+                                              if keyword.arg in ("columns", "mapper", "labels")]
+            # Series.rename('total') and literal mappings name their columns
+            if any(not isinstance(mapping, (ast.Dict, ast.List, ast.Tuple, ast.Constant)) for mapping in mappings):
+                return True
+    return False
+
+
+def _diagnostic(kind: str, column: str, node: ast.AST, message: str,
+                field_names: List[str]) -> Dict:
+    return {
+        "type": kind,
+        "column": column,
+        "line": getattr(node, "lineno", None),
+        "message": message,
+        "suggestions": difflib.get_close_matches(column, field_names, n=3) if field_names else [],
+    }
+
+
+def validate_code(code: str, summary: Summary) -> List[Dict]:
+    """Statically check chart code against the dataset summary.
+
+    Field references (data[..], x=/y=/hue= keywords, altair encodings) are resolved against
+    summary.field_names plus the columns the code defines itself, and column methods are
+    checked against the summary dtypes. Unknown columns are not reported for code that
+    creates columns it does not name (see opaque_columns). Returns a list of diagnostics,
+    empty if the code looks valid.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as syntax_error:
+        return [{"type": "syntax_error", "column": None, "line": syntax_error.lineno,
+                 "message": f"Syntax error: {syntax_error.msg}", "suggestions": []}]
+
+    field_names = [str(name) for name in summary.field_names or []]
+    if not field_names:
+        return []
+    dtypes = get_field_dtypes(summary)
+    defined = defined_columns(tree)
+    known = set(field_names) | defined | IMPLICIT_COLUMNS
+    unknown_columns_reliable = not opaque_columns(tree)
+
+    diagnostics = []
+    reported = set()
+
+    def check(column: Optional[str], node: ast.AST) -> None:
+        if column is None or column in known or not unknown_columns_reliable or \
+                (column, node.lineno) in reported:
+            return
+        reported.add((column, node.lineno))
+        diagnostic = _diagnostic(
+            "unknown_column", column, node,
+            f"line {node.lineno}: column '{column}' does not exist in the dataset", field_names)
+        if diagnostic["suggestions"]:
+            diagnostic["message"] += f" (did you mean '{diagnostic['suggestions'][0]}'?)"
+        diagnostics.append(diagnostic)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Subscript) and isinstance(node.ctx, ast.Load) \
+                and isinstance(node.value, ast.Name) and node.value.id == "data":
+            for column in _string_constants(node.slice):
+                check(column, node)
+
+        elif isinstance(node, ast.Call):
+            name = _call_name(node)
+            root = _call_root(node)
+            is_style_call = root == "sns" and (
+                (name or "").startswith("set") or name in SEABORN_STYLE_FUNCTIONS)
+            if not is_style_call and (name == "encode" or root in ("sns", "px") or
+                                      any(k.arg == "data" for k in node.keywords)):
+                for keyword in node.keywords:
+                    if keyword.arg not in ENCODING_KEYWORDS:
+                        continue
+                    # in seaborn color is a matplotlib color, not a field
+                    if keyword.arg == "color" and root == "sns":
+                        continue
+                    for value in _string_constants(keyword.value):
+                        check(parse_shorthand(value) if name == "encode" else value, node)
+            if root == "alt" and name in ALTAIR_CHANNELS:
+                if node.args:
+                    for value in _string_constants(node.args[0]):
+                        check(parse_shorthand(value), node)
+                for keyword in node.keywords:
+                    if keyword.arg == "field":
+                        for value in _string_constants(keyword.value):
+                            check(value, node)
+
+            # data.groupby('column'), data.sort_values(by='column') ..
+            if isinstance(node.func, ast.Attribute) and name in COLUMN_METHODS and \
+                    isinstance(node.func.value, ast.Name) and node.func.value.id == "data":
+                if node.args and name not in ("nlargest", "nsmallest"):
+                    for column in _string_constants(node.args[0]):
+                        check(column, node)
+                for keyword in node.keywords:
+                    if keyword.arg in ("by", "subset", "keys", "columns"):
+                        for column in _string_constants(keyword.value):
+                            check(column, node)
+
+            # data['column'].mean() on a string column
+            if isinstance(node.func, ast.Attribute) and name in NUMERIC_METHODS:
+                column = _is_data_column(node.func.value)
+                if column in dtypes and column not in defined \
+                        and dtypes[column] in NON_NUMERIC_DTYPES:
+                    diagnostics.append(_diagnostic(
+                        "dtype_mismatch", column, node,
+                        f"line {node.lineno}: '{name}' requires a numeric column but '{column}' has dtype {dtypes[column]}",
+                        field_names))
+
+        # data['column'].dt / .str accessors on the wrong dtype
+        elif isinstance(node, ast.Attribute) and node.attr in ("dt", "str"):
+            column = _is_data_column(node.value)
+            if column not in dtypes or column in defined:
+                continue
+            if node.attr == "dt" and dtypes[column] in ("number", "boolean") or \
+                    node.attr == "str" and dtypes[column] == "number":
+                diagnostics.append(_diagnostic(
+                    "dtype_mismatch", column, node,
+                    f"line {node.lineno}: '.{node.attr}' accessor used on '{column}' which has dtype {dtypes[column]}",
+                    field_names))
+
+    return sorted(diagnostics, key=lambda diagnostic: diagnostic["line"] or 0)
+
+
+def _frame_chain(node: ast.AST, frames: Set[str], fields: Set[str]) -> Optional[bool]:
+    """Follow an attribute/call/subscript chain down to its root name.
+
+    Returns None if the chain is not rooted at a frame, True if columns are selected along
+    the way (data['a'].., data[['a', 'b']].., data.a..) and False otherwise.
+    """
+    selected = False
+    while True:
+        if isinstance(node, ast.Call):
+            node = node.func
+        elif isinstance(node, ast.Attribute):
+            selected = selected or node.attr in fields
+            node = node.value
+        elif isinstance(node, ast.Subscript):
+            selected = selected or (isinstance(node.slice, (ast.Constant, ast.List, ast.Tuple))
+                                    and bool(_string_constants(node.slice)))
+            node = node.value
+        elif isinstance(node, ast.Name):
+            return selected if node.id in frames else None
+        else:
+            return None
+
+
+def _is_row_selector(node: ast.AST) -> bool:
+    """Whether a subscript selects rows (mask, slice, position) rather than computed columns"""
+    if isinstance(node, ast.Constant):
+        return not isinstance(node.value, str)
+    if isinstance(node, ast.BinOp):
+        return isinstance(node.op, (ast.BitAnd, ast.BitOr))
+    return isinstance(node, (ast.Compare, ast.BoolOp, ast.UnaryOp, ast.Slice, ast.Call))
+
+
+def _is_whole_frame(node: ast.AST, frames: Set[str], fields: Set[str]) -> bool:
+    """Whether node evaluates to a frame with all its columns e.g. data, data.dropna()"""
+    if isinstance(node, ast.Name):
+        return node.id in frames
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and \
+        node.func.attr in FRAME_METHODS and _frame_chain(node, frames, fields) is False
+
+
+def _imported_modules(tree: ast.AST) -> Dict[str, str]:
+    """Map each import alias to its module e.g. sns -> seaborn"""
+    modules = {"pd": "pandas", "plt": "matplotlib.pyplot"}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                modules[alias.asname or alias.name.split(".")[0]] = alias.name
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            for alias in node.names:
+                modules[alias.asname or alias.name] = node.module
+    return modules
+
+
+def _is_dynamic(tree: ast.AST, fields: Set[str]) -> bool:
+    """Whether the code may use columns it does not name, e.g. data.corr(), data[name]"""
+    modules = _imported_modules(tree)
+    functions = {node.name for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)}
+    frames = {"data"}
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.Lambda)):
+            frames.update(arg.arg for arg in node.args.args)
+    # names bound to (filtered, sorted ..) copies of a frame are frames too
+    changed = True
+    while changed:
+        changed = False
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and _frame_chain(node.value, frames, fields) is False:
+                for target in node.targets:
+                    if isinstance(target, ast.Name) and target.id not in frames:
+                        frames.add(target.id)
+                        changed = True
+
+    # dropna/drop_duplicates with a subset and named aggregations only use the named columns
+    exempt = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            if node.func.attr in ("dropna", "drop_duplicates", "duplicated") and (
+                    node.args or any(keyword.arg == "subset" for keyword in node.keywords)) or \
+                    node.func.attr in ("agg", "aggregate") and (
+                    node.keywords or any(isinstance(arg, ast.Dict) for arg in node.args)):
+                exempt.add(id(node.func))
+    called = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id in DYNAMIC_NAMES:
+            return True
+        if isinstance(node, ast.Attribute) and id(node) not in exempt and \
+                _frame_chain(node.value, frames, fields) is False:
+            if id(node) in called and node.attr in FRAME_WIDE_METHODS or \
+                    id(node) not in called and node.attr in FRAME_WIDE_ATTRIBUTES:
+                return True
+        if isinstance(node, ast.Subscript) and _frame_chain(node.value, frames, fields) is False:
+            column_part = node.slice
+            if isinstance(node.value, ast.Attribute) and node.value.attr == "loc":
+                if not isinstance(column_part, ast.Tuple) or len(column_part.elts) < 2:
+                    continue
+                column_part = column_part.elts[1]
+                if isinstance(column_part, ast.Slice):
+                    continue
+            if not _string_constants(column_part) and not _is_row_selector(column_part):
+                return True
+        if isinstance(node, ast.Call):
+            frame_args = [arg for arg in list(node.args) + [keyword.value for keyword in node.keywords]
+                          if _is_whole_frame(arg, frames, fields)]
+            if not frame_args:
+                continue
+            root = _call_root(node)
+            module = modules.get(root, "") if root else ""
+            if root in functions or _call_name(node) == "len" or \
+                    module.startswith(("altair", "plotnine")):
+                continue
+            # seaborn and plotly express use all columns only for wide-form data
+            if module.startswith(("seaborn", "plotly")) and any(
+                    keyword.arg in ENCODING_KEYWORDS | {"dimensions", "vars", "x_vars", "y_vars", "path"}
+                    for keyword in node.keywords):
+                continue
+            return True
+    return False
+
+
+def used_columns(code: str, field_names: List[str]) -> Optional[Set[str]]:
+    """Statically determine the columns of data that chart code uses.
+
+    Columns are found in string constants (including altair shorthands and expressions such
+    as "datum.Horsepower > 100" or query strings) and attribute access. Returns None if the
+    usage cannot be determined statically, i.e. the code may use columns it does not name
+    (data.corr(), data[name], wide-form seaborn calls ..), or if no column is named.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    fields = {str(name) for name in field_names}
+    if _is_dynamic(tree, fields):
+        return None
+
+    used = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            candidates = {node.value, parse_shorthand(node.value)}
+            candidates.update(token for match in IDENTIFIER_PATTERN.findall(node.value) for token in match)
+            used.update(fields.intersection(candidates))
+        elif isinstance(node, ast.Attribute) and node.attr in fields:
+            used.add(node.attr)
+    return used or None
+
+
+def format_diagnostics(diagnostics: List[Dict]) -> str:
+    """Render diagnostics as feedback text suitable for the repair prompt"""
+    lines = ["The code failed static validation against the dataset summary:"]
+    lines += [f"- {diagnostic['message']}" for diagnostic in diagnostics]
+    return "\n".join(lines)
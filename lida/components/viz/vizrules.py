@@ -0,0 +1,227 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from lida.datamodel import Goal, Summary
+
+
+# goal.visualization patterns handled without an LLM, e.g. "histogram of Horsepower", matched
+# case-insensitively so the captured field text keeps its original casing
+GOAL_PATTERNS = [
+    ("histogram", re.compile(
+        r"^(?:a\s+)?(?:histogram|distribution)\s+(?:plot\s+)?of\s+(?:the\s+)?(?P<x>.+)$", re.IGNORECASE)),
+    ("bar_count", re.compile(
+        r"^(?:a\s+)?bar\s*(?:chart|plot|graph)?\s+(?:of|showing)\s+(?:the\s+)?(?:count|number|frequency)"
+        r"(?:\s+of\s+\w+)?\s+(?:by|per|for each|across)\s+(?P<x>.+)$", re.IGNORECASE)),
+    ("bar_count", re.compile(
+        r"^(?:a\s+)?(?:bar\s*(?:chart|plot|graph)\s+of\s+)?(?:the\s+)?(?:count|number|frequency)\s+of\s+(?:each\s+)?(?P<x>.+)$", re.IGNORECASE)),
+    ("scatter", re.compile(
+        r"^(?:a\s+)?scatter\s*(?:plot|chart|graph)?\s+of\s+(?:the\s+)?(?P<x>.+?)\s+"
+        r"(?:vs\.?|versus|against|and)\s+(?:the\s+)?(?P<y>.+)$", re.IGNORECASE)),
+    ("line", re.compile(
+        r"^(?:a\s+)?line\s*(?:chart|plot|graph)?\s+of\s+(?:the\s+)?(?P<y>.+?)\s+"
+        r"(?:over|by|across|over time by)\s+(?:the\s+)?(?P<x>.+)$", re.IGNORECASE)),
+]
+
+# maximum number of categories shown in count bar charts
+TOP_N = 20
+
+TEMPLATES: Dict[Tuple[str, str], str] = {
+    ("histogram", "matplotlib"): """
+    plt.hist(data[{x}].dropna(), bins=30, color='steelblue', edgecolor='white')
+    plt.xlabel({x})
+    plt.ylabel('Count')
+    plt.title({title}, wrap=True)
+    return plt""",
+    ("histogram", "seaborn"): """
+    sns.histplot(data=data, x={x}, bins=30)
+    plt.title({title}, wrap=True)
+    return plt""",
+    ("histogram", "altair"): """
+    chart = alt.Chart(data).mark_bar().encode(
+        x=alt.X({x_q}, bin=alt.Bin(maxbins=30), title={x}),
+        y=alt.Y('count():Q', title='Count')).properties(title={title})
+    return chart""",
+    ("histogram", "plotly"): """
+    fig = px.histogram(data, x={x}, nbins=30, title={title})
+    return fig""",
+    ("histogram", "ggplot"): """
+    chart = p9.ggplot(data, p9.aes(x={x})) + p9.geom_histogram(bins=30) + p9.ggtitle({title})
+    return chart""",
+
+    ("bar_count", "matplotlib"): """
+    plt.bar(counts[{x}], counts['count'], color='steelblue')
+    plt.xticks(rotation=45, ha='right')
+    plt.xlabel({x})
+    plt.ylabel('Count')
+    plt.title({title}, wrap=True)
+    return plt""",
+    ("bar_count", "seaborn"): """
+    sns.barplot(data=counts, x={x}, y='count')
+    plt.xticks(rotation=45, ha='right')
+    plt.title({title}, wrap=True)
+    return plt""",
+    ("bar_count", "altair"): """
+    chart = alt.Chart(counts).mark_bar().encode(
+        x=alt.X({x_n}, sort='-y', title={x}),
+        y=alt.Y('count:Q', title='Count'),
+        tooltip=[{x}, 'count']).properties(title={title})
+    return chart""",
+    ("bar_count", "plotly"): """
+    fig = px.bar(counts, x={x}, y='count', title={title})
+    return fig""",
+    ("bar_count", "ggplot"): """
+    counts[{x}] = pd.Categorical(counts[{x}], categories=counts[{x}].tolist())
+    chart = p9.ggplot(counts, p9.aes(x={x}, y='count')) + p9.geom_col() + p9.ggtitle({title}) + \\
+        p9.theme(axis_text_x=p9.element_text(rotation=45, hjust=1))
+    return chart""",
+
+    ("scatter", "matplotlib"): """
+    plt.scatter(data[{x}], data[{y}], alpha=0.6)
+    plt.xlabel({x})
+    plt.ylabel({y})
+    plt.title({title}, wrap=True)
+    return plt""",
+    ("scatter", "seaborn"): """
+    sns.scatterplot(data=data, x={x}, y={y}, alpha=0.6)
+    plt.title({title}, wrap=True)
+    return plt""",
+    ("scatter", "altair"): """
+    chart = alt.Chart(data).mark_circle(opacity=0.6).encode(
+        x=alt.X({x_q}, title={x}), y=alt.Y({y_q}, title={y}),
+        tooltip=[{x}, {y}]).properties(title={title})
+    return chart""",
+    ("scatter", "plotly"): """
+    fig = px.scatter(data, x={x}, y={y}, opacity=0.6, title={title})
+    return fig""",
+    ("scatter", "ggplot"): """
+    chart = p9.ggplot(data, p9.aes(x={x}, y={y})) + p9.geom_point(alpha=0.6) + p9.ggtitle({title})
+    return chart""",
+
+    ("line", "matplotlib"): """
+    plt.plot(series[{x}], series[{y}], color='steelblue')
+    plt.xticks(rotation=45, ha='right')
+    plt.xlabel({x})
+    plt.ylabel({y})
+    plt.title({title}, wrap=True)
+    return plt""",
+    ("line", "seaborn"): """
+    sns.lineplot(data=series, x={x}, y={y})
+    plt.xticks(rotation=45, ha='right')
+    plt.title({title}, wrap=True)
+    return plt""",
+    ("line", "altair"): """
+    chart = alt.Chart(series).mark_line().encode(
+        x=alt.X({x_t}, title={x}), y=alt.Y({y_q}, title={y}),
+        tooltip=[{x}, {y}]).properties(title={title})
+    return chart""",
+    ("line", "plotly"): """
+    fig = px.line(series, x={x}, y={y}, title={title})
+    return fig""",
+    ("line", "ggplot"): """
+    chart = p9.ggplot(series, p9.aes(x={x}, y={y})) + p9.geom_line() + p9.ggtitle({title}) + \\
+        p9.theme(axis_text_x=p9.element_text(rotation=45, hjust=1))
+    return chart""",
+}
+
+IMPORTS = {
+    "matplotlib": "import matplotlib.pyplot as plt\nimport pandas as pd",
+    "seaborn": "import seaborn as sns\nimport pandas as pd\nimport matplotlib.pyplot as plt",
+    "altair": "import altair as alt\nimport pandas as pd",
+    "plotly": "import plotly.express as px\nimport pandas as pd",
+    "ggplot": "import plotnine as p9\nimport pandas as pd",
+}
+
+
+def _field_dtypes(summary: Summary) -> Dict[str, str]:
+    dtypes = {str(name): "" for name in summary.field_names or []}
+    for field in summary.fields or []:
+        if isinstance(field, dict) and "column" in field:
+            dtypes[str(field["column"])] = field.get("properties", {}).get("dtype", "")
+    return dtypes
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[^0-9a-z]", "", name.lower())
+
+
+def resolve_field(text: str, dtypes: Dict[str, str]) -> Optional[str]:
+    """Match free text from a goal (e.g. `Retail Price`) to a field name, None if ambiguous"""
+    text = text.strip().strip(".`'\"").strip()
+    if text in dtypes:
+        return text
+    normalized = _normalize(text)
+    matches = [name for name in dtypes if _normalize(name) == normalized]
+    return matches[0] if len(matches) == 1 else None
+
+
+class VizRuleGenerator(object):
+    """Generate chart code for common goal patterns deterministically, without an LLM.
+
+    Handles histograms of numeric fields, count bar charts by a category (top 20 categories),
+    scatter plots of two numeric fields and line charts of a numeric field over a date field,
+    for every library supported by ChartScaffold.
+    """
+
+    def match(self, goal: Goal, summary: Summary) -> Optional[Tuple[str, Dict[str, str]]]:
+        """Return (chart kind, fields) if the goal matches a supported pattern"""
+        dtypes = _field_dtypes(summary)
+        text = " ".join(goal.visualization.strip().rstrip(".").split())
+        for kind, pattern in GOAL_PATTERNS:
+            match = pattern.match(text)
+            if not match:
+                continue
+            fields = {role: resolve_field(value, dtypes) for role, value in match.groupdict().items()}
+            if None in fields.values():
+                continue
+            if self._valid(kind, fields, dtypes):
+                return kind, fields
+        return None
+
+    @staticmethod
+    def _valid(kind: str, fields: Dict[str, str], dtypes: Dict[str, str]) -> bool:
+        if kind == "histogram":
+            return dtypes[fields["x"]] == "number"
+        if kind == "bar_count":
+            return dtypes[fields["x"]] in ("category", "string", "boolean", "number")
+        if kind == "scatter":
+            return dtypes[fields["x"]] == "number" and dtypes[fields["y"]] == "number"
+        if kind == "line":
+            return dtypes[fields["y"]] == "number" and (
+                dtypes[fields["x"]] == "date" or
+                dtypes[fields["x"]] == "number" and "year" in fields["x"].lower())
+        return False
+
+    def generate(self, summary: Summary, goal: Goal, library: str = "seaborn") -> Optional[List[str]]:
+        """Return code specs for the goal, or None if the goal is not matched"""
+        if isinstance(summary, dict):
+            summary = Summary(**summary)
+        if library not in IMPORTS:
+            return None
+        matched = self.match(goal, summary)
+        if matched is None:
+            return None
+        kind, fields = matched
+        dtypes = _field_dtypes(summary)
+
+        x, y = fields.get("x"), fields.get("y")
+        prep = []
+        if kind == "bar_count":
+            prep = [
+                f"counts = data[{x!r}].value_counts().head({TOP_N}).rename_axis({x!r}).reset_index(name='count')",
+                f"counts[{x!r}] = counts[{x!r}].astype(str)"]
+        elif kind == "line":
+            if dtypes[x] == "date":
+                prep = [
+                    "data = data.copy()",
+                    f"data[{x!r}] = pd.to_datetime(data[{x!r}], errors='coerce')",
+                    f"data = data[pd.notna(data[{x!r}])]"]
+            prep.append(
+                f"series = data.groupby({x!r})[{y!r}].mean().reset_index().sort_values({x!r})")
+
+        body = TEMPLATES[(kind, library)].format(
+            x=repr(x), y=repr(y), title=repr(goal.question),
+            x_q=repr(f"{x}:Q"), y_q=repr(f"{y}:Q"), x_n=repr(f"{x}:N"),
+            x_t=repr(f"{x}:T" if dtypes.get(x) == "date" else f"{x}:O"))
+        prep_code = "".join(f"\n    {line}" for line in prep)
+        code = f"{IMPORTS[library]}\n\n\ndef plot(data: pd.DataFrame):{prep_code}{body}\n\n\nchart = plot(data)\n"
+        return [code]
@@ -60,6 +60,7 @@ class Summary:
     dataset_description: str
     field_names: List[Any]
     fields: Optional[List[Any]] = None
+    associations: Optional[List[Any]] = None  # strongest field pairs, see compute_associations
 
     def _repr_markdown_(self):
         field_lines = "\n".join([f"- **{name}:** {field}" for name,
@@ -109,6 +110,7 @@ class GoalWebRequest:
         default_factory=TextGenerationConfig
     )
     n: int = 5
+    method: str = "llm"
 
 
 @dataclass
@@ -121,6 +123,9 @@ class VisualizeWebRequest:
     textgen_config: Optional[TextGenerationConfig] = field(
         default_factory=TextGenerationConfig
     )
+    repair_attempts: int = 0
+    repair_timeout: Optional[float] = None
+    first_k: Optional[int] = None
 
 
 @dataclass
@@ -195,6 +200,7 @@ class ChartExecutorResponse:
     code: str  # code used to generate the visualization
     library: str  # library used to generate the visualization
     error: Optional[Dict] = None  # error message if status is False
+    reductions: Optional[List[Dict]] = None  # points reduced at render time, see ChartExecutor
 
     def _repr_mimebundle_(self, include=None, exclude=None):
         bundle = {"text/plain": self.code}
@@ -232,3 +238,14 @@ class InfographicsRequest:
     n: int = 1
     style_prompt: Union[str, List[str]] = ""
     # return_pil: bool = False
+
+
+@dataclass
+class ExecutionLimits:
+    """Resource limits applied when executing generated chart code"""
+
+    timeout: Optional[float] = 30  # wall clock seconds per chart
+    cpu_time: Optional[int] = 30  # cpu seconds per chart
+    memory_mb: Optional[int] = 2048  # address space added on top of the parent process
+    max_image_mb: Optional[float] = 10  # max size of the rendered raster/spec
+    isolate: bool = True  # run each chart in a forked child process
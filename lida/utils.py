@@ -1,12 +1,14 @@
 import base64
+import importlib.util
 import json
 import logging
-from typing import Any, List, Tuple, Union
+from typing import Any, Iterator, List, Optional, Tuple, Union
 import os
 import io
 import numpy as np
 import pandas as pd
 import re
+import warnings
 import matplotlib.pyplot as plt
 import tiktoken
 from diskcache import Cache
@@ -42,32 +44,127 @@ def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
     return cleaned_df
 
 
-def read_dataframe(file_location: str, encoding: str = 'utf-8') -> pd.DataFrame:
+# files at least this large are read with a multithreaded engine when engine="auto"
+LARGE_FILE_MB = 50
+
+READ_EXTENSIONS = ('json', 'csv', 'xls', 'xlsx', 'parquet', 'feather', 'tsv')
+
+# rows kept for visualization when reading a file
+SAMPLE_ROWS = 4500
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def select_engine(file_location: str, engine: str = "auto") -> str:
     """
-    Read a dataframe from a given file location and clean its column names.
-    It also samples down to 4500 rows if the data exceeds that limit.
+    Choose the ingestion engine for a file.
+
+    "auto" uses pandas for small files and, for csv/tsv files of at least LARGE_FILE_MB, the
+    multithreaded polars or pyarrow CSV reader, whichever is installed (polars first). Both
+    need pyarrow, which polars uses to convert its frames to pandas.
+
+    :param file_location: The path to the file containing the data.
+    :param engine: One of "auto", "pandas", "pyarrow" or "polars".
+    :return: The engine to use.
+    """
+    if engine not in ("auto", "pandas", "pyarrow", "polars"):
+        raise ValueError(f"Unsupported ingestion engine: {engine}")
+    if engine != "auto":
+        return engine
+    file_extension = file_location.split('.')[-1]
+    if file_extension not in ('csv', 'tsv') or not os.path.exists(file_location) or \
+            os.path.getsize(file_location) < LARGE_FILE_MB * 1024 * 1024:
+        return "pandas"
+    if _installed("pyarrow"):
+        # polars frames are converted to pandas through Arrow
+        return "polars" if _installed("polars") else "pyarrow"
+    return "pandas"
+
+
+def load_dataframe(file_location: str, encoding: str = 'utf-8', engine: str = "auto",
+                   dtype_backend: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read a dataframe from a given file location as is.
+
+    The pyarrow and polars engines parse csv/tsv files on all cores; other formats are always
+    read with pandas (parquet and feather are read through Arrow already).
 
     :param file_location: The path to the file containing the data.
     :param encoding: Encoding to use for the file reading.
-    :return: A cleaned DataFrame.
+    :param engine: Ingestion engine, see select_engine.
+    :param dtype_backend: "pyarrow" for zero-copy Arrow-backed dtypes, None for NumPy dtypes.
+    :return: A DataFrame.
     """
     file_extension = file_location.split('.')[-1]
+    if file_extension not in READ_EXTENSIONS:
+        raise ValueError('Unsupported file type')
+    engine = select_engine(file_location, engine)
+    arrow_backend = {"dtype_backend": dtype_backend} if dtype_backend else {}
+    sep = "\t" if file_extension == 'tsv' else ","
+
+    if file_extension in ('csv', 'tsv') and engine == "polars":
+        if not _installed("pyarrow"):
+            engine = "pandas"
+            logger.info("polars needs pyarrow to convert to pandas, using pandas for %s", file_location)
+        elif encoding.lower().replace("-", "") != "utf8":
+            engine = "pyarrow"
+            logger.info("polars only reads utf-8 files, using pyarrow for %s", encoding)
+        else:
+            import polars as pl
+            try:
+                return pl.read_csv(file_location, separator=sep, infer_schema_length=10000).to_pandas(
+                    use_pyarrow_extension_array=dtype_backend == "pyarrow")
+            except pl.exceptions.ComputeError as e:
+                # e.g. a column changing type after the rows polars inferred the schema from
+                engine = "pyarrow"
+                logger.info("polars could not read %s, using pyarrow: %s", file_location, e)
+    if file_extension in ('csv', 'tsv') and engine == "pyarrow":
+        return pd.read_csv(file_location, sep=sep, encoding=encoding, engine="pyarrow", **arrow_backend)
 
     read_funcs = {
-        'json': lambda: pd.read_json(file_location, orient='records', encoding=encoding),
-        'csv': lambda: pd.read_csv(file_location, encoding=encoding),
-        'xls': lambda: pd.read_excel(file_location),
-        'xlsx': lambda: pd.read_excel(file_location),
-        'parquet': pd.read_parquet,
-        'feather': pd.read_feather,
-        'tsv': lambda: pd.read_csv(file_location, sep="\t", encoding=encoding)
+        'json': lambda: pd.read_json(file_location, orient='records', encoding=encoding, **arrow_backend),
+        'csv': lambda: pd.read_csv(file_location, encoding=encoding, **arrow_backend),
+        'xls': lambda: pd.read_excel(file_location, **arrow_backend),
+        'xlsx': lambda: pd.read_excel(file_location, **arrow_backend),
+        'parquet': lambda: pd.read_parquet(file_location, **arrow_backend),
+        'feather': lambda: pd.read_feather(file_location, **arrow_backend),
+        'tsv': lambda: pd.read_csv(file_location, sep="\t", encoding=encoding, **arrow_backend)
     }
+    return read_funcs[file_extension]()
+
+
+def sample_dataframe(df: pd.DataFrame, max_rows: int = SAMPLE_ROWS) -> pd.DataFrame:
+    """Sample a DataFrame down to max_rows rows if it exceeds that limit."""
+    if len(df) > max_rows:
+        logger.info(
+            "Dataframe has more than %d rows. We will sample %d rows.", max_rows, max_rows)
+        return df.sample(max_rows)
+    return df
+
+
+def read_dataframe(file_location: str, encoding: str = 'utf-8', engine: str = "auto",
+                   dtype_backend: Optional[str] = None,
+                   sample_rows: Optional[int] = SAMPLE_ROWS) -> pd.DataFrame:
+    """
+    Read a dataframe from a given file location and clean its column names.
+    It also samples down to sample_rows rows if the data exceeds that limit.
+
+    :param file_location: The path to the file containing the data.
+    :param encoding: Encoding to use for the file reading.
+    :param engine: Ingestion engine ("auto", "pandas", "pyarrow" or "polars"), see select_engine.
+    :param dtype_backend: "pyarrow" for zero-copy Arrow-backed dtypes, None for NumPy dtypes.
+    :param sample_rows: Maximum number of rows to return, None to keep every row.
+    :return: A cleaned DataFrame.
+    """
+    file_extension = file_location.split('.')[-1]
 
-    if file_extension not in read_funcs:
+    if file_extension not in READ_EXTENSIONS:
         raise ValueError('Unsupported file type')
 
     try:
-        df = read_funcs[file_extension]()
+        df = load_dataframe(file_location, encoding=encoding, engine=engine, dtype_backend=dtype_backend)
     except Exception as e:
         logger.error(f"Failed to read file: {file_location}. Error: {e}")
         raise
@@ -75,11 +172,9 @@ def read_dataframe(file_location: str, encoding: str = 'utf-8') -> pd.DataFrame:
     # Clean column names
     cleaned_df = clean_column_names(df)
 
-    # Sample down to 4500 rows if necessary
-    if len(cleaned_df) > 4500:
-        logger.info(
-            "Dataframe has more than 4500 rows. We will sample 4500 rows.")
-        cleaned_df = cleaned_df.sample(4500)
+    # Sample down to sample_rows rows if necessary
+    if sample_rows is not None:
+        cleaned_df = sample_dataframe(cleaned_df, sample_rows)
 
     if cleaned_df.columns.tolist() != df.columns.tolist():
         write_funcs = {
@@ -104,22 +199,136 @@ def read_dataframe(file_location: str, encoding: str = 'utf-8') -> pd.DataFrame:
     return cleaned_df
 
 
+def parse_dates(series: pd.Series) -> Optional[pd.Series]:
+    """
+    Parse a column of date values into datetime64.
+
+    :param series: The column to parse.
+    :return: The parsed column, the column itself if it is already datetime64, or None if
+        some non-null values are not valid dates.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parsed = pd.to_datetime(series, errors="coerce")
+    if parsed.notna().sum() != series.notna().sum():
+        return None
+    return parsed
+
+
+def arrow_string_dtype() -> Optional[Any]:
+    """
+    The Arrow-backed string dtype with NaN for missing values (like object string columns),
+    i.e. the pandas 3 default "str". None if pyarrow or the dtype is not available.
+    """
+    if not _installed("pyarrow"):
+        return None
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        # pandas 2.1 and 2.2
+        try:
+            return pd.api.types.pandas_dtype("string[pyarrow_numpy]")
+        except TypeError:
+            return None
+
+
+def optimize_dtypes(df: pd.DataFrame, fields: Optional[List[dict]] = None,
+                    category_ratio: float = 0.5,
+                    string_dtype: Optional[Any] = None,
+                    categories: bool = False,
+                    narrow_integers: bool = False) -> Tuple[pd.DataFrame, dict]:
+    """
+    Reduce the memory footprint of a DataFrame without losing information.
+
+    Date columns are parsed once, strings optionally become `string_dtype` (e.g.
+    arrow_string_dtype()) and floats become float32 where every value round-trips exactly.
+    With narrow_integers, 64-bit integers become int32 when their values fit; this is lossy
+    for later arithmetic, which can overflow. With categories, low-cardinality strings become
+    `category`, which rejects writes of new values (e.g. fillna("Unknown")). Only use either for
+    data that generated code does not compute on or modify. Column dtypes from summary fields
+    (see Summarizer) are used when given, otherwise strings with fewer than category_ratio
+    unique values per row are treated as categories.
+
+    :param df: The DataFrame to optimize, it is not modified.
+    :param fields: Summary fields, i.e. [{"column": .., "properties": {"dtype": ..}}, ...].
+    :param category_ratio: Maximum unique values per row of category columns without fields.
+    :param string_dtype: Dtype for the remaining string columns, None to keep them as they are.
+    :param categories: Convert low-cardinality string columns to `category`.
+    :param narrow_integers: Convert int64 columns to int32 when their values fit.
+    :return: The optimized DataFrame and a report with memory_before, memory_after (bytes)
+        and the converted columns.
+    """
+    summary_dtypes = {field["column"]: field.get("properties", {}).get("dtype")
+                      for field in fields or [] if isinstance(field, dict) and "column" in field}
+    memory_before = int(df.memory_usage(deep=True).sum())
+    optimized = df.copy(deep=False)
+    converted = {}
+    int32 = np.iinfo(np.int32)
+    for column in df.columns:
+        series = df[column]
+        summary_dtype = summary_dtypes.get(column)
+        result = None
+        # object columns, or str columns (the default for text in pandas 3)
+        if pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+            if summary_dtype == "date":
+                result = parse_dates(series)
+            elif categories and (summary_dtype == "category" or summary_dtype is None and len(series) and
+                                 series.nunique() / len(series) < category_ratio):
+                result = series.astype("category")
+            if result is None and string_dtype and \
+                    pd.api.types.infer_dtype(series, skipna=True) == "string":
+                result = series.astype(string_dtype)
+        elif narrow_integers and series.dtype == np.int64:
+            if len(series) and int32.min <= series.min() and series.max() <= int32.max:
+                result = series.astype(np.int32)
+        elif series.dtype == np.float64:
+            downcast = series.astype(np.float32)
+            if ((downcast.astype(np.float64) == series) | series.isna()).all():
+                result = downcast
+        if result is not None and result.dtype != series.dtype:
+            optimized[column] = result
+            converted[column] = [str(series.dtype), str(result.dtype)]
+
+    memory_after = int(optimized.memory_usage(deep=True).sum())
+    logger.info("Optimized dtypes of %d columns: %.1f MB -> %.1f MB", len(converted),
+                memory_before / 1024 ** 2, memory_after / 1024 ** 2)
+    return optimized, {"memory_before": memory_before, "memory_after": memory_after, "converted": converted}
+
+
+def iter_dataframe_chunks(file_location: str, chunk_size: int = 100000,
+                          encoding: str = 'utf-8') -> Iterator[pd.DataFrame]:
+    """
+    Read a csv, tsv or parquet file in chunks of rows (row batches for parquet) with clean column names.
+
+    :param file_location: The path to the file containing the data.
+    :param chunk_size: Number of rows per chunk.
+    :param encoding: Encoding to use for the file reading.
+    :return: An iterator of DataFrames.
+    """
+    file_extension = file_location.split('.')[-1]
+    if file_extension in ('csv', 'tsv'):
+        chunks = pd.read_csv(file_location, sep="\t" if file_extension == 'tsv' else ",",
+                             encoding=encoding, chunksize=chunk_size)
+    elif file_extension == 'parquet':
+        import pyarrow.parquet as pq
+        chunks = (batch.to_pandas() for batch in
+                  pq.ParquetFile(file_location).iter_batches(batch_size=chunk_size))
+    else:
+        raise ValueError('Streaming is only supported for csv, tsv and parquet files')
+
+    for chunk in chunks:
+        chunk.columns = [clean_column_name(str(col)) for col in chunk.columns]
+        yield chunk
+
+
 def file_to_df(file_location: str):
     """ Get summary of data from file location """
     file_name = file_location.split("/")[-1]
-    df = None
-    if "csv" in file_name:
-        df = pd.read_csv(file_location)
-    elif "xlsx" in file_name:
-        df = pd.read_excel(file_location)
-    elif "json" in file_name:
-        df = pd.read_json(file_location, orient="records")
-    elif "parquet" in file_name:
-        df = pd.read_parquet(file_location)
-    elif "feather" in file_name:
-        df = pd.read_feather(file_location)
-
-    return df
+    if file_name.split('.')[-1] not in READ_EXTENSIONS:
+        return None
+    return load_dataframe(file_location)
 
 
 def plot_raster(rasters: Union[str, List[str]], figsize: Tuple[int, int] = (10, 10)):
@@ -212,6 +421,24 @@ def cache_request(cache: Cache, params: Any, values: Any = None) -> Any:
     return values
 
 
+def schema_fingerprint(summary: Any) -> str:
+    """
+    Fingerprint the schema of a dataset summary (field names and dtypes, not the data).
+
+    :param summary: A Summary object or summary dictionary.
+    :return: An md5 hex digest that is identical for datasets with the same shape.
+    """
+    fields = summary.get("fields") if isinstance(summary, dict) else getattr(summary, "fields", None)
+    field_names = summary.get("field_names") if isinstance(summary, dict) else getattr(summary, "field_names", None)
+    dtypes = {}
+    for field in fields or []:
+        if isinstance(field, dict) and "column" in field:
+            dtypes[str(field["column"])] = field.get("properties", {}).get("dtype", "")
+    names = [str(name) for name in field_names] if field_names else list(dtypes)
+    schema = sorted([name, dtypes.get(name, "")] for name in names)
+    return hashlib.md5(json.dumps(schema).encode("utf-8")).hexdigest()
+
+
 def clean_code_snippet(code_string):
     # Extract code snippet using regex
     cleaned_snippet = re.search(r'```(?:\w+)?\s*([\s\S]*?)\s*```', code_string)
@@ -7,18 +7,26 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import traceback
 
-from llmx import llm, providers
+from llmx import providers
 from ..datamodel import GoalWebRequest, SummaryUrlRequest, TextGenerationConfig, UploadUrl, VisualizeEditWebRequest, VisualizeEvalWebRequest, VisualizeExplainWebRequest, VisualizeRecommendRequest, VisualizeRepairWebRequest, VisualizeWebRequest, InfographicsRequest
 from ..components import Manager
+from ..components.coalescer import CoalescingTextGenerator
+from ..components.registry import text_generators
+from ..utils import read_dataframe
 
 
 # instantiate model and generator
-textgen = llm()
+textgen = text_generators.get()
 logger = logging.getLogger("lida")
 api_docs = os.environ.get("LIDA_API_DOCS", "False") == "True"
 
 
-lida = Manager(text_gen=textgen)
+# identical requests in flight at the same time (e.g. several users on a shared dataset) share one completion.
+# the handlers are plain functions: fastapi runs them in its threadpool, so the blocking Manager
+# calls do not hold up the event loop and concurrent requests can actually overlap.
+# the Manager is shared by all requests, so each request passes its own data (see request_data)
+# and nothing writes Manager.data
+lida = Manager(text_gen=CoalescingTextGenerator(textgen))
 app = FastAPI()
 # allow cross origin requests for testing on localhost:800* ports only
 app.add_middleware(
@@ -46,10 +54,15 @@ app.mount("/", StaticFiles(directory=static_folder_root, html=True), name="ui")
 api.mount("/files", StaticFiles(directory=files_static_root, html=True), name="files")
 
 
+def request_data(summary):
+    """Load the uploaded dataset a request's summary was made from"""
+    return read_dataframe(os.path.join(data_folder, summary.file_name))
+
+
 # def check_model
 
 @api.post("/visualize")
-async def visualize_data(req: VisualizeWebRequest) -> dict:
+def visualize_data(req: VisualizeWebRequest) -> dict:
     """Generate goals given a dataset summary"""
     try:
         # print(req.textgen_config)
@@ -57,7 +70,11 @@ async def visualize_data(req: VisualizeWebRequest) -> dict:
             summary=req.summary,
             goal=req.goal,
             textgen_config=req.textgen_config if req.textgen_config else TextGenerationConfig(),
-            library=req.library, return_error=True)
+            library=req.library, return_error=True,
+            repair_attempts=req.repair_attempts,
+            repair_timeout=req.repair_timeout,
+            first_k=req.first_k,
+            data=request_data(req.summary))
         print("found charts: ", len(charts), " for goal: ")
         if len(charts) == 0:
             return {"status": False, "message": "No charts generated"}
@@ -71,7 +88,7 @@ async def visualize_data(req: VisualizeWebRequest) -> dict:
 
 
 @api.post("/visualize/edit")
-async def edit_visualization(req: VisualizeEditWebRequest) -> dict:
+def edit_visualization(req: VisualizeEditWebRequest) -> dict:
     """Given a visualization code, and a goal, generate a new visualization"""
     try:
         textgen_config = req.textgen_config if req.textgen_config else TextGenerationConfig()
@@ -80,7 +97,8 @@ async def edit_visualization(req: VisualizeEditWebRequest) -> dict:
             summary=req.summary,
             instructions=req.instructions,
             textgen_config=textgen_config,
-            library=req.library, return_error=True)
+            library=req.library, return_error=True,
+            data=request_data(req.summary))
 
         # charts = [asdict(chart) for chart in charts]
         if len(charts) == 0:
@@ -96,7 +114,7 @@ async def edit_visualization(req: VisualizeEditWebRequest) -> dict:
 
 
 @api.post("/visualize/repair")
-async def repair_visualization(req: VisualizeRepairWebRequest) -> dict:
+def repair_visualization(req: VisualizeRepairWebRequest) -> dict:
     """ Given a visualization goal and some feedback, generate a new visualization that addresses the feedback"""
 
     try:
@@ -108,7 +126,8 @@ async def repair_visualization(req: VisualizeRepairWebRequest) -> dict:
             summary=req.summary,
             textgen_config=req.textgen_config if req.textgen_config else TextGenerationConfig(),
             library=req.library,
-            return_error=True
+            return_error=True,
+            data=request_data(req.summary)
         )
 
         if len(charts) == 0:
@@ -123,7 +142,7 @@ async def repair_visualization(req: VisualizeRepairWebRequest) -> dict:
 
 
 @api.post("/visualize/explain")
-async def explain_visualization(req: VisualizeExplainWebRequest) -> dict:
+def explain_visualization(req: VisualizeExplainWebRequest) -> dict:
     """Given a visualization code, provide an explanation of the code"""
     textgen_config = req.textgen_config if req.textgen_config else TextGenerationConfig(
         n=1,
@@ -144,7 +163,7 @@ async def explain_visualization(req: VisualizeExplainWebRequest) -> dict:
 
 
 @api.post("/visualize/evaluate")
-async def evaluate_visualization(req: VisualizeEvalWebRequest) -> dict:
+def evaluate_visualization(req: VisualizeEvalWebRequest) -> dict:
     """Given a visualization code, provide an evaluation of the code"""
 
     try:
@@ -165,7 +184,7 @@ async def evaluate_visualization(req: VisualizeEvalWebRequest) -> dict:
 
 
 @api.post("/visualize/recommend")
-async def recommend_visualization(req: VisualizeRecommendRequest) -> dict:
+def recommend_visualization(req: VisualizeRecommendRequest) -> dict:
     """Given a dataset summary, generate a visualization recommendations"""
 
     try:
@@ -175,7 +194,8 @@ async def recommend_visualization(req: VisualizeRecommendRequest) -> dict:
             code=req.code,
             textgen_config=textgen_config,
             library=req.library,
-            return_error=True)
+            return_error=True,
+            data=request_data(req.summary))
 
         if len(charts) == 0:
             return {"status": False, "message": "No charts generated"}
@@ -189,7 +209,7 @@ async def recommend_visualization(req: VisualizeRecommendRequest) -> dict:
 
 
 @api.post("/text/generate")
-async def generate_text(textgen_config: TextGenerationConfig) -> dict:
+def generate_text(textgen_config: TextGenerationConfig) -> dict:
     """Generate text given some prompt"""
 
     try:
@@ -201,11 +221,11 @@ async def generate_text(textgen_config: TextGenerationConfig) -> dict:
 
 
 @api.post("/goal")
-async def generate_goal(req: GoalWebRequest) -> dict:
+def generate_goal(req: GoalWebRequest) -> dict:
     """Generate goals given a dataset summary"""
     try:
         textgen_config = req.textgen_config if req.textgen_config else TextGenerationConfig()
-        goals = lida.goals(req.summary, n=req.n, textgen_config=textgen_config)
+        goals = lida.goals(req.summary, n=req.n, textgen_config=textgen_config, method=req.method)
         return {"status": True, "data": goals,
                 "message": f"Successfully generated {len(goals)} goals"}
     except Exception as exception_error:
@@ -225,7 +245,7 @@ async def generate_goal(req: GoalWebRequest) -> dict:
 
 
 @api.post("/summarize")
-async def upload_file(file: UploadFile):
+def upload_file(file: UploadFile):
     """ Upload a file and return a summary of the data """
     # allow csv, excel, json
     allowed_types = ["text/csv", "application/vnd.ms-excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "application/json"]
@@ -250,7 +270,8 @@ async def upload_file(file: UploadFile):
             data=file_location,
             file_name=file.filename,
             summary_method="llm",
-            textgen_config=textgen_config)
+            textgen_config=textgen_config,
+            keep_data=False)
         return {"status": True, "summary": summary, "data_filename": file.filename}
     except Exception as exception_error:
         logger.error(f"Error processing file: {str(exception_error)}")
@@ -259,7 +280,7 @@ async def upload_file(file: UploadFile):
 
 # upload via url
 @api.post("/summarize/url")
-async def upload_file_via_url(req: SummaryUrlRequest) -> dict:
+def upload_file_via_url(req: SummaryUrlRequest) -> dict:
     """ Upload a file from a url and return a summary of the data """
     url = req.url
     textgen_config = req.textgen_config if req.textgen_config else TextGenerationConfig(
@@ -276,7 +297,8 @@ async def upload_file_via_url(req: SummaryUrlRequest) -> dict:
             data=file_location,
             file_name=file_name,
             summary_method="llm",
-            textgen_config=textgen_config)
+            textgen_config=textgen_config,
+            keep_data=False)
         return {"status": True, "summary": summary, "data_filename": file_name}
     except Exception as exception_error:
         # traceback.print_exc()
@@ -287,7 +309,7 @@ async def upload_file_via_url(req: SummaryUrlRequest) -> dict:
 
 
 @api.post("/infographer")
-async def generate_infographics(req: InfographicsRequest) -> dict:
+def generate_infographics(req: InfographicsRequest) -> dict:
     """Generate infographics using the peacasso package"""
     try:
         result = lida.infographics(
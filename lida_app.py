@@ -200,7 +200,8 @@ elif selected_tab_name == "📊 数据摘要":
                         # 生成数据摘要
                         summary = lida.summarize(
                             data=st.session_state.data,
-                            file_name=st.session_state.filename
+                            file_name=st.session_state.filename,
+                            keep_data=False
                         )
                         
                         # 保存摘要到session state
@@ -221,7 +222,8 @@ elif selected_tab_name == "📊 数据摘要":
                         # 生成数据摘要
                         summary = lida.summarize(
                             data=st.session_state.data,
-                            file_name=st.session_state.filename
+                            file_name=st.session_state.filename,
+                            keep_data=False
                         )
                         
                         # 保存摘要到session state
@@ -449,9 +451,6 @@ elif selected_tab_name == "✏️ 图表编辑":
                     # 获取LIDA管理器
                     lida = get_lida_manager()
                     
-                    # 设置数据到管理器中 - 这是关键修复
-                    lida.data = st.session_state.data
-                    
                     # 导入配置类
                     from lida.datamodel import TextGenerationConfig
                     
@@ -465,7 +464,8 @@ elif selected_tab_name == "✏️ 图表编辑":
                         instructions=instructions_list,
                         library="matplotlib",
                         textgen_config=TextGenerationConfig(n=1, temperature=0),
-                        return_error=True
+                        return_error=True,
+                        data=st.session_state.data
                     )
                     
                     if edited_charts:
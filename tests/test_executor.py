@@ -0,0 +1,255 @@
+import pandas as pd
+
+from lida.components import ChartExecutor, ColumnarDataSource, VizRuleGenerator
+from lida.datamodel import ExecutionLimits, Goal, Summary
+
+data = pd.DataFrame({"Horsepower": [130, 165, 150, 140], "Origin": ["USA", "USA", "Japan", "Europe"]})
+summary = Summary(name="cars", file_name="cars.csv", dataset_description="",
+                  field_names=["Horsepower", "Origin"], fields=[])
+
+
+def test_execution_timeout():
+    executor = ChartExecutor(limits=ExecutionLimits(timeout=2))
+    code = """
+import matplotlib.pyplot as plt
+def plot(data):
+    while True:
+        pass
+    return plt
+
+chart = plot(data)"""
+    charts = executor.execute([code], data, summary, library="matplotlib", return_error=True)
+
+    assert charts[0].status is False
+    assert charts[0].error["limit"] == "timeout"
+
+
+def test_execution_success():
+    executor = ChartExecutor()
+    code = """
+import matplotlib.pyplot as plt
+def plot(data):
+    plt.hist(data["Horsepower"])
+    return plt
+
+chart = plot(data)"""
+    charts = executor.execute([code], data, summary, library="matplotlib", return_error=True)
+
+    assert charts[0].status is True
+    assert len(charts[0].raster) > 0
+
+
+def test_static_validation():
+    executor = ChartExecutor()
+    code = """
+import seaborn as sns
+import matplotlib.pyplot as plt
+def plot(data):
+    sns.histplot(data=data, x='HorsePower')
+    return plt
+
+chart = plot(data)"""
+    charts = executor.execute([code], data, summary, library="seaborn", return_error=True)
+
+    assert charts[0].status is False
+    diagnostic = charts[0].error["diagnostics"][0]
+    assert diagnostic["type"] == "unknown_column"
+    assert diagnostic["suggestions"][0] == "Horsepower"
+
+
+def test_validation_of_created_columns():
+    from lida.components.validator import validate_code
+
+    aggregated = """
+import seaborn as sns
+import matplotlib.pyplot as plt
+def plot(data):
+    stats = data.groupby('Origin')['Horsepower'].agg(['mean', 'max']).reset_index()
+    sns.barplot(data=stats, x='Origin', y='max')
+    return plt
+
+chart = plot(data)"""
+    pivoted = """
+import seaborn as sns
+import matplotlib.pyplot as plt
+def plot(data):
+    wide = data.pivot_table(columns='Origin', values='Horsepower', aggfunc='mean')
+    sns.barplot(data=wide, y='USA')
+    return plt
+
+chart = plot(data)"""
+    # columns named after aggregation functions or data values are not unknown columns
+    for code in [aggregated, pivoted]:
+        assert validate_code(code, summary) == []
+        charts = ChartExecutor().execute([code], data, summary, library="seaborn", return_error=True)
+        assert charts[0].status is True
+
+
+def test_rule_based_charts():
+    executor = ChartExecutor()
+    rulegen = VizRuleGenerator()
+    typed_summary = Summary(
+        name="cars", file_name="cars.csv", dataset_description="",
+        field_names=["Horsepower", "Origin"],
+        fields=[{"column": "Horsepower", "properties": {"dtype": "number"}},
+                {"column": "Origin", "properties": {"dtype": "category"}}])
+    goal = Goal(question="How many cars per origin?", visualization="bar chart of count by Origin",
+                rationale="")
+
+    for library in ["seaborn", "altair"]:
+        code_specs = rulegen.generate(typed_summary, goal, library=library)
+        charts = executor.execute(code_specs, data, typed_summary, library=library, return_error=True)
+        assert charts[0].status is True
+
+    assert rulegen.generate(typed_summary, Goal(question="", visualization="box plot of Origin",
+                                                rationale=""), library="seaborn") is None
+
+
+def test_typed_data():
+    executor = ChartExecutor()
+    dated = data.assign(Date=["2004-01-05", "2004-02-10", "not a date", "2004-03-01"],
+                        Launch=["2004-01-05", "2004-02-10", "2004-02-11", "2004-03-01"])
+    date_summary = Summary(
+        name="cars", file_name="cars.csv", dataset_description="",
+        field_names=dated.columns.tolist(),
+        fields=[{"column": "Date", "properties": {"dtype": "date"}},
+                {"column": "Launch", "properties": {"dtype": "date"}}])
+
+    typed = executor.typed_data(dated, date_summary)
+    assert pd.api.types.is_datetime64_any_dtype(typed["Launch"])
+    assert not pd.api.types.is_datetime64_any_dtype(typed["Date"])
+    assert not pd.api.types.is_datetime64_any_dtype(dated["Launch"])
+
+    # code slicing date strings still gets strings
+    code = """
+import matplotlib.pyplot as plt
+def plot(data):
+    plt.hist(data["Launch"].str[:4].astype(int))
+    return plt
+
+chart = plot(data)"""
+    charts = executor.execute([code], dated, date_summary, library="matplotlib", return_error=True)
+    assert charts[0].status is True
+    assert executor.materialize(dated, code, date_summary, typed)["Launch"].equals(dated["Launch"])
+
+
+def test_data_isolation():
+    original = data.copy()
+    code = """
+import matplotlib.pyplot as plt
+def plot(data):
+    data['Horsepower'] = data['Horsepower'] * 2
+    data.loc[data['Origin'] == 'USA', 'Origin'] = 'United States'
+    data.dropna(inplace=True)
+    plt.hist(data['Horsepower'])
+    return plt
+
+chart = plot(data)"""
+    for limits in [ExecutionLimits(), ExecutionLimits(isolate=False)]:
+        charts = ChartExecutor(limits=limits).execute(
+            [code, code], data, summary, library="matplotlib", return_error=True)
+        assert all(chart.status for chart in charts)
+        assert data.equals(original)
+
+
+def test_column_projection():
+    source = ColumnarDataSource(data.assign(Weight=[3504, 3693, 3436, 3433]))
+    code = """
+import matplotlib.pyplot as plt
+def plot(data):
+    plt.hist(data["Horsepower"])
+    return plt
+
+chart = plot(data)"""
+    charts = ChartExecutor().execute([code], source, summary, library="matplotlib", return_error=True)
+
+    assert charts[0].status is True
+    assert list(source._cache) == [("Horsepower", False)]
+    assert source.to_pandas().columns.tolist() == ["Horsepower", "Origin", "Weight"]
+
+    # raw and parsed dates are cached separately, whichever is requested first
+    for parse_first in [False, True]:
+        dated = ColumnarDataSource(pd.DataFrame({"Date": ["2004-01-05", "2004-02-10"]}))
+        orders = [["Date"], []] if parse_first else [[], ["Date"]]
+        frames = [dated.to_pandas(parse_date_columns=parse) for parse in orders]
+        parsed = [pd.api.types.is_datetime64_any_dtype(frame["Date"]) for frame in frames]
+        assert parsed == [bool(parse) for parse in orders]
+
+
+def test_point_reduction():
+    long_data = pd.DataFrame({"Horsepower": [i % 97 for i in range(50000)], "Origin": "USA"})
+    code = """
+import matplotlib.pyplot as plt
+def plot(data):
+    plt.plot(data.index, data["Horsepower"])
+    plt.scatter(data.index, data["Horsepower"])
+    return plt
+
+chart = plot(data)"""
+    charts = ChartExecutor().execute([code], long_data, summary, library="matplotlib", return_error=True)
+
+    assert charts[0].status is True
+    line, scatter = charts[0].reductions
+    assert line["method"] == "lttb" and line["points_before"] == 50000 and line["points_after"] == 2000
+    assert scatter["method"] == "density" and scatter["points_after"] < 10000
+
+
+def test_point_reduction_budget():
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    from lida.components.reduction import reduce_matplotlib
+
+    points = np.random.default_rng(0).random((5000, 2))
+    for max_points in [8, 50, 700, 4999]:
+        plt.scatter(points[:, 0], points[:, 1])
+        reduction, = reduce_matplotlib(None, max_points)
+        plt.close("all")
+        assert reduction["points_after"] <= max_points
+
+
+def test_execution_from_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    code = """
+import matplotlib.pyplot as plt
+def plot(data):
+    plt.hist(data["Horsepower"])
+    return plt
+
+chart = plot(data)"""
+    executor = ChartExecutor(limits=ExecutionLimits(timeout=60))
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(
+            lambda _: executor.execute([code], data, summary, library="matplotlib", return_error=True), range(2)))
+    assert all(charts[0].status for charts in results)
+
+
+def test_kill_attribution():
+    import signal
+
+    from lida.components.governor import ExecutionGovernor
+
+    governor = ExecutionGovernor(ExecutionLimits(cpu_time=5))
+    assert governor._limit_from_exitcode(-signal.SIGXCPU).limit == "cpu_time"
+    assert governor._limit_from_exitcode(-signal.SIGKILL, cpu_used=6.5).limit == "cpu_time"
+    assert governor._limit_from_exitcode(-signal.SIGKILL, cpu_used=0.2).limit == "memory_mb"
+    assert governor._limit_from_exitcode(-signal.SIGKILL).limit == "memory_mb"
+
+
+def test_rule_based_line_and_casing():
+    rulegen = VizRuleGenerator()
+    dated = pd.DataFrame({"Date": ["2004-01-05", "2004-02-10", "2004-02-11", "2004-03-01"],
+                          "İl Nüfusu": [1, 2, 3, 4]})
+    dated_summary = Summary(
+        name="cities", file_name="cities.csv", dataset_description="",
+        field_names=dated.columns.tolist(),
+        fields=[{"column": "Date", "properties": {"dtype": "date"}},
+                {"column": "İl Nüfusu", "properties": {"dtype": "number"}}])
+    # "İ".lower() is two characters, the field text must still be recovered exactly
+    goal = Goal(question="", visualization="Line chart of İl Nüfusu over Date", rationale="")
+    assert rulegen.match(goal, dated_summary) == ("line", {"y": "İl Nüfusu", "x": "Date"})
+
+    namespace = {"data": dated}
+    exec(rulegen.generate(dated_summary, goal, library="matplotlib")[0], namespace)
+    assert dated["Date"].tolist()[0] == "2004-01-05"
@@ -0,0 +1,37 @@
+from lida.components import HeuristicGoalExplorer
+from lida.datamodel import Persona
+
+summary = {
+    "name": "orders", "file_name": "orders.csv", "dataset_description": "",
+    "fields": [
+        {"column": "CustomerID", "properties": {"dtype": "number", "num_unique_values": 400}},
+        {"column": "order_date", "properties": {"dtype": "date", "num_unique_values": 300}},
+        {"column": "Revenue", "properties": {"dtype": "number", "num_unique_values": 350}},
+        {"column": "Shipping_Cost", "properties": {"dtype": "number", "num_unique_values": 80}},
+        {"column": "Region", "properties": {"dtype": "category", "num_unique_values": 5}},
+    ],
+    "associations": [{"fields": ["Revenue", "Shipping_Cost"], "measure": "pearson", "score": 0.6}],
+}
+
+
+def test_heuristic_goal_ranking():
+    explorer = HeuristicGoalExplorer()
+    candidates = explorer.candidates(summary)
+    visualizations = [goal.visualization for _, goal in candidates]
+    # identifiers are not charted, camelCase or not
+    assert not any("CustomerID" in visualization for visualization in visualizations)
+    assert max(candidates, key=lambda item: item[0])[1].visualization == "line of Revenue over order_date"
+    assert "scatter of Revenue vs Shipping_Cost" in visualizations
+
+    goals = explorer.generate(summary, n=4)
+    # the best goal of each kind comes first
+    assert [goal.visualization.split(" of ")[0] for goal in goals] == ["line", "scatter", "bar chart", "histogram"]
+    assert [goal.index for goal in goals] == [0, 1, 2, 3]
+
+
+def test_heuristic_goals_follow_persona():
+    explorer = HeuristicGoalExplorer()
+    persona = Persona(persona="A logistics manager tracking shipping costs", rationale="")
+    assert explorer.persona_fields(summary, persona) == ["Shipping_Cost"]
+    goals = explorer.generate(summary, n=2, persona=persona)
+    assert all("Shipping_Cost" in goal.visualization for goal in goals)
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pandas as pd
+from llmx import TextGenerationConfig, TextGenerationResponse
+
+from lida.components import Manager
+from lida.datamodel import ExecutionLimits, Goal, Summary
+
+data = pd.DataFrame({"Horsepower": [130, 165, 150, 140], "Origin": ["USA", "USA", "Japan", "Europe"]})
+summary = Summary(name="cars", file_name="cars.csv", dataset_description="",
+                  field_names=["Horsepower", "Origin"], fields=[])
+
+CHART_CODE = """```
+import matplotlib.pyplot as plt
+def plot(data):
+    plt.hist(data["Horsepower"])
+    plt.title("{title}")
+    return plt
+
+chart = plot(data)
+```"""
+
+
+class FakeTextGenerator:
+    """Answers the i-th request with the i-th (delay, content) reply, the last one repeats"""
+
+    provider = "fake"
+
+    def __init__(self, replies) -> None:
+        self.replies = list(replies)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, messages, config=TextGenerationConfig(), **kwargs) -> TextGenerationResponse:
+        with self._lock:
+            delay, content = self.replies[min(self.calls, len(self.replies) - 1)]
+            self.calls += 1
+        time.sleep(delay)
+        if isinstance(content, Exception):
+            raise content
+        return TextGenerationResponse(text=[{"role": "assistant", "content": content}], config=config)
+
+    def count_tokens(self, text) -> int:
+        return len(text) // 4
+
+
+def test_hedged_candidates():
+    text_gen = FakeTextGenerator([(2, CHART_CODE.format(title="slow")), (0, CHART_CODE.format(title="fast"))])
+    # in process execution, the candidate race is what is timed
+    manager = Manager(text_gen=text_gen, execution_limits=ExecutionLimits(isolate=False))
+    goal = Goal(question="What is the distribution of Horsepower?", visualization="pie of Horsepower",
+                rationale="")
+
+    start = time.monotonic()
+    charts = manager.visualize(summary, goal, data=data, library="matplotlib", first_k=1, fast_path=False)
+    assert time.monotonic() - start < 1.5
+    assert text_gen.calls == 2
+    assert len(charts) == 1 and "fast" in charts[0].code
+
+    text_gen = FakeTextGenerator([(0, RuntimeError("rate limited")), (0.2, CHART_CODE.format(title="ok"))])
+    charts = Manager(text_gen=text_gen).visualize(
+        summary, goal, data=data, library="matplotlib", first_k=1, fast_path=False)
+    assert len(charts) == 1 and "ok" in charts[0].code
+
+
+def test_fast_path_respects_variants():
+    typed_summary = Summary(
+        name="cars", file_name="cars.csv", dataset_description="",
+        field_names=["Horsepower", "Origin"],
+        fields=[{"column": "Horsepower", "properties": {"dtype": "number"}},
+                {"column": "Origin", "properties": {"dtype": "category"}}])
+    goal = Goal(question="", visualization="histogram of Horsepower", rationale="")
+    text_gen = FakeTextGenerator([(0, CHART_CODE.format(title="llm"))])
+    manager = Manager(text_gen=text_gen, execution_limits=ExecutionLimits(isolate=False))
+
+    assert len(manager.visualize(typed_summary, goal, data=data, library="matplotlib")) == 1
+    assert text_gen.calls == 0
+    # several variants are requested from the LLM
+    charts = manager.visualize(typed_summary, goal, data=data, library="matplotlib",
+                               textgen_config=TextGenerationConfig(n=2))
+    assert text_gen.calls == 1 and len(charts) == 1 and "llm" in charts[0].code
+
+
+def test_auto_repair_runs_concurrently():
+    text_gen = FakeTextGenerator([(1, CHART_CODE.format(title="repaired"))])
+    manager = Manager(text_gen=text_gen, execution_limits=ExecutionLimits(isolate=False))
+    goal = Goal(question="What is the distribution of Horsepower?", visualization="histogram of Horsepower",
+                rationale="")
+    broken = CHART_CODE.strip("`\n").replace('data["Horsepower"]', 'data["HorsePower"]')
+    charts = manager.execute([broken, broken], data, summary, library="matplotlib", return_error=True)
+    assert not any(chart.status for chart in charts)
+
+    # both failed charts are repaired in a single concurrent round
+    start = time.monotonic()
+    repaired = manager.auto_repair(charts, goal, summary, data, library="matplotlib", attempts=2)
+    assert time.monotonic() - start < 1.8
+    assert text_gen.calls == 2 and all(chart.status and "repaired" in chart.code for chart in repaired)
+
+    # repairs that miss the time budget keep their error
+    text_gen = FakeTextGenerator([(1, CHART_CODE.format(title="late"))])
+    manager.text_gen = text_gen
+    start = time.monotonic()
+    repaired = manager.auto_repair(charts, goal, summary, data, library="matplotlib", attempts=2, timeout=0.2)
+    assert time.monotonic() - start < 0.6
+    assert repaired == charts
+
+    # the budget also bounds executing the repaired code
+    slow = CHART_CODE.format(title="slow").replace(
+        "    return plt", "    import time\n    time.sleep(1)\n    return plt")
+    manager.text_gen = FakeTextGenerator([(0, slow)])
+    start = time.monotonic()
+    repaired = manager.auto_repair(charts, goal, summary, data, library="matplotlib", attempts=2, timeout=0.3)
+    assert time.monotonic() - start < 0.8
+    assert repaired == charts
+
+
+def test_code_library_reuse(tmp_path):
+    from lida.components import ChartCodeLibrary
+
+    library = ChartCodeLibrary(path=str(tmp_path))
+    goal = Goal(question="What is the distribution of Horsepower?", visualization="histogram of Horsepower",
+                rationale="")
+    text_gen = FakeTextGenerator([(0, CHART_CODE.format(title="generated"))])
+    manager = Manager(text_gen=text_gen, execution_limits=ExecutionLimits(isolate=False), code_library=library)
+
+    charts = manager.visualize(summary, goal, data=data, library="matplotlib", first_k=0, fast_path=False)
+    assert text_gen.calls == 1 and len(charts) == 1
+    # another extract with the same schema and a differently punctuated goal reuses the code
+    extract = Summary(name="cars_2024", file_name="cars_2024.csv", dataset_description="",
+                      field_names=["Origin", "Horsepower"], fields=[])
+    same_goal = Goal(question="What is the distribution of horsepower", visualization="Histogram of Horsepower.",
+                     rationale="")
+    assert library.get(extract, same_goal, "matplotlib") == [charts[0].code]
+    charts = manager.visualize(extract, same_goal, data=data.iloc[:2], library="matplotlib", first_k=0,
+                               fast_path=False)
+    assert text_gen.calls == 1 and len(charts) == 1 and "generated" in charts[0].code
+
+    # other schemas and libraries miss, stored code that fails on the new data is dropped
+    assert library.get(summary, goal, "seaborn") is None
+    assert library.get(Summary(name="cars", file_name="cars.csv", dataset_description="",
+                               field_names=["Horsepower"], fields=[]), goal, "matplotlib") is None
+    assert manager.execute_from_library(summary, goal, data.drop(columns="Horsepower"), library="matplotlib") == []
+    assert library.get(summary, goal, "matplotlib") is None
+
+
+def test_dates_parsed_once(monkeypatch):
+    import lida.components.executor as executor_module
+
+    manager = Manager(text_gen=FakeTextGenerator([(0, "")]), execution_limits=ExecutionLimits(isolate=False))
+    dated_summary = manager.summarize(data.assign(Launch=["2004-01-05", "2004-02-10", "2004-02-11", "2004-03-01"]))
+    typed = manager.typed_data(manager.data, dated_summary)
+    assert pd.api.types.is_datetime64_any_dtype(typed["Launch"])
+
+    def parse_dates(series):
+        raise AssertionError("dates are parsed again")
+
+    monkeypatch.setattr(executor_module, "parse_dates", parse_dates)
+    code = CHART_CODE.strip("`\n").replace('data["Horsepower"]', 'data["Launch"].dt.month')
+    for _ in range(2):
+        charts = manager.execute([code], manager.data, dated_summary, library="matplotlib", return_error=True)
+        assert charts[0].status is True
+
+
+def test_shared_manager_takes_data_per_call():
+    text_gen = FakeTextGenerator([(0, CHART_CODE.format(title="edited"))])
+    manager = Manager(text_gen=text_gen, execution_limits=ExecutionLimits(isolate=False))
+
+    manager.summarize(data, file_name="cars.csv", keep_data=False)
+    assert manager.data is None
+
+    charts = manager.edit(CHART_CODE.format(title="plain"), summary, ["add a title"],
+                          library="matplotlib", data=data)
+    assert len(charts) == 1 and charts[0].status
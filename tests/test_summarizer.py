@@ -0,0 +1,248 @@
+import json
+import re
+import threading
+
+import pandas as pd
+import pytest
+from llmx import TextGenerationConfig, TextGenerationResponse
+
+from lida.components import ColumnAnnotationCache, Manager, Summarizer
+from lida.components.summarizer import dataset_system_prompt, delta_system_prompt
+from lida import utils
+from lida.utils import load_dataframe, optimize_dtypes, read_dataframe
+
+data = pd.DataFrame({
+    "email": ["ann@example.com", "bob@example.org", "cy@example.net", "dee@example.com"],
+    "pickupLat": [40.71, 40.73, 40.75, 40.69],
+    "zip_code": ["10001", "10002", "94105-1234", "60601"],
+    "gender": ["Female", "Male", "Male", "Female"],
+    "price": [10.5, 12.0, 9.75, 11.25],
+})
+
+
+def test_semantic_types():
+    fields = Summarizer().get_column_properties(data)
+    semantic_types = {field["column"]: field["properties"]["semantic_type"] for field in fields}
+    assert semantic_types == {
+        "email": "email", "pickupLat": "latitude", "zip_code": "zip code",
+        "gender": "gender", "price": ""}
+    assert all(field["properties"]["description"] for field in fields if field["column"] != "price")
+
+
+def test_sketch_statistics():
+    rows = 20000
+    long_data = pd.DataFrame({
+        "value": [i % 1000 for i in range(rows)],
+        "city": [f"city_{i % 50}" if i % 4 else "Seattle" for i in range(rows)],
+    })
+    fields = Summarizer(sketch_threshold=1000, distribution_stats=True).get_column_properties(long_data)
+    value, city = fields[0]["properties"], fields[1]["properties"]
+    assert abs(value["num_unique_values"] - 1000) < 50
+    assert abs(value["p50"] - 500) < 50 and value["min"] == 0 and value["max"] == 999
+    assert abs(city["num_unique_values"] - 51) <= 2
+    assert city["top_values"][0][0] == "Seattle"
+
+    # exact statistics have the same keys, the summary schema does not depend on the row count
+    exact = Summarizer(sketch_threshold=None, distribution_stats=True).get_column_properties(long_data)
+    assert [list(field["properties"]) for field in exact] == [list(field["properties"]) for field in fields]
+    # without distribution_stats neither mode adds them
+    keys = [[list(field["properties"]) for field in Summarizer(sketch_threshold=threshold).get_column_properties(
+        long_data)] for threshold in (1000, None)]
+    assert keys[0] == keys[1] and not {"p50", "top_values"} & set(keys[0][0] + keys[0][1])
+    assert exact[0]["properties"]["p50"] == 499.5 and exact[1]["properties"]["top_values"][0] == ["Seattle", 5000]
+
+
+def test_streaming_summary(tmp_path):
+    file_location = str(tmp_path / "long.csv")
+    pd.DataFrame({
+        "value": [i % 1000 for i in range(25000)],
+        "region": [["north", "south", "east"][i % 3] for i in range(25000)],
+    }).to_csv(file_location, index=False)
+    summarizer = Summarizer(sketch_sample_rows=500, distribution_stats=True)
+    fields, sample = summarizer.get_streaming_column_properties(file_location, chunk_size=4000)
+    assert len(sample) == 500 and sample.columns.tolist() == ["value", "region"]
+    value, region = fields[0]["properties"], fields[1]["properties"]
+    assert value["min"] == 0 and value["max"] == 999 and abs(value["p50"] - 500) < 50
+    assert region["num_unique_values"] == 3 and len(region["top_values"]) == 3
+
+
+def test_parallel_profiling():
+    serial = Summarizer().get_column_properties(data)
+    assert Summarizer(profile_workers=3).get_column_properties(data) == serial
+    assert Summarizer(profile_workers=2, profile_processes=True).get_column_properties(data) == serial
+
+
+def test_parallel_profiling_from_threads(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from lida.components import summarizer as summarizer_module
+
+    def no_fork(*args, **kwargs):
+        raise AssertionError("forked with other threads alive")
+
+    serial = Summarizer().get_column_properties(data)
+    monkeypatch.setattr(summarizer_module, "ProcessPoolExecutor", no_fork)
+    summarizer = Summarizer(profile_workers=2, profile_processes=True)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(summarizer.get_column_properties, data).result() == serial
+
+
+@pytest.mark.parametrize("engine", ["pyarrow", "polars"])
+def test_ingestion_engines(tmp_path, engine):
+    pytest.importorskip(engine)
+    file_location = str(tmp_path / "cars.csv")
+    data.to_csv(file_location, index=False)
+    expected = load_dataframe(file_location, engine="pandas")
+    pd.testing.assert_frame_equal(load_dataframe(file_location, engine=engine), expected, check_dtype=False)
+    arrow = load_dataframe(file_location, engine=engine, dtype_backend="pyarrow")
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in arrow.dtypes)
+    assert Summarizer().get_column_properties(arrow) == Summarizer().get_column_properties(expected)
+    assert read_dataframe(file_location, engine=engine).shape == data.shape
+
+
+def test_polars_schema_fallback(tmp_path):
+    pytest.importorskip("polars")
+    file_location = str(tmp_path / "mixed.csv")
+    # the schema polars infers from the first 10000 rows does not fit the last row
+    pd.DataFrame({"id": range(20001), "value": [str(i) for i in range(20000)] + ["unknown"]}).to_csv(
+        file_location, index=False)
+    frame = load_dataframe(file_location, engine="polars")
+    assert len(frame) == 20001 and frame["value"].iloc[-1] == "unknown"
+
+
+def test_ingestion_without_pyarrow(tmp_path, monkeypatch):
+    file_location = str(tmp_path / "cars.csv")
+    data.to_csv(file_location, index=False)
+    monkeypatch.setattr(utils, "LARGE_FILE_MB", 0)
+    monkeypatch.setattr(utils, "_installed", lambda module: module == "polars")
+    # polars cannot convert its frames to pandas without pyarrow
+    assert utils.select_engine(file_location) == "pandas"
+    pd.testing.assert_frame_equal(load_dataframe(file_location, engine="polars"), data)
+
+
+def test_optimize_dtypes():
+    frame = pd.DataFrame({
+        "region": pd.Series(["north", "south"] * 500, dtype=object),
+        "day": ["2024-01-01", "2024-01-02"] * 500,
+        "count": [50000000 + i for i in range(1000)],
+        "price": [0.5, 1.25] * 500,
+    })
+    fields = Summarizer().get_column_properties(frame)
+    optimized, report = optimize_dtypes(frame, fields=fields, string_dtype=utils.arrow_string_dtype())
+    assert pd.api.types.is_datetime64_any_dtype(optimized["day"])
+    assert optimized["count"].dtype == "int64" and optimized["price"].dtype == "float32"
+    if utils.arrow_string_dtype() is not None:
+        assert optimized["region"].dtype == utils.arrow_string_dtype()
+    assert report["memory_after"] < report["memory_before"]
+    # chart code can still write new values and compute without overflow
+    optimized.loc[0, "region"] = "west"
+    assert optimized["region"].fillna("Unknown")[0] == "west"
+    assert (optimized["count"] * 100).min() == 5000000000
+    assert Summarizer().get_column_properties(optimized)[3]["properties"]["dtype"] == "number"
+
+    optimized, report = optimize_dtypes(frame, fields=fields, categories=True, narrow_integers=True)
+    assert str(optimized["region"].dtype) == "category" and optimized["count"].dtype == "int32"
+
+
+class AnnotatingTextGenerator:
+    """Annotates every field named in the prompt, in the format each enrichment prompt asks for"""
+
+    provider = "fake"
+
+    def __init__(self) -> None:
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def generate(self, messages, config=TextGenerationConfig(), **kwargs) -> TextGenerationResponse:
+        system, prompt = messages[0]["content"], messages[-1]["content"]
+        with self._lock:
+            self.prompts.append(system)
+        columns = re.findall(r"""["']column["']: ["'](\w+)["']""", prompt)
+        if system == dataset_system_prompt:
+            answer = {"name": "cars", "dataset_description": "Cars and their prices"}
+        elif system == delta_system_prompt:
+            answer = {"name": "cars", "dataset_description": "Cars and their prices",
+                      "fields": {column: ["attribute", f"The {column} of a car"] for column in columns}}
+        else:
+            answer = {"name": "cars", "dataset_description": "Cars and their prices", "fields": [
+                {"column": column, "properties": {"semantic_type": "attribute",
+                                                  "description": f"The {column} of a car"}}
+                for column in columns]}
+        return TextGenerationResponse(text=[{"role": "assistant", "content": json.dumps(answer)}], config=config)
+
+    def count_tokens(self, text) -> int:
+        return len(text) // 4
+
+
+cars = pd.DataFrame({
+    "model": ["Civic", "Corolla", "Golf", "Focus"],
+    "maker": ["Honda", "Toyota", "VW", "Ford"],
+    "horsepower": [158, 169, 147, 160],
+    "price": [22000.0, 21000.0, 24000.0, 20000.0],
+    "weight": [2771, 2910, 3023, 2907],
+})
+
+
+def described(summary) -> bool:
+    return bool(summary.dataset_description) and all(
+        field["properties"]["description"] for field in summary.fields)
+
+
+def test_chunked_and_delta_enrichment():
+    text_gen = AnnotatingTextGenerator()
+    manager = Manager(text_gen=text_gen)
+    summary = manager.summarize(cars, summary_method="llm", chunk_tokens=60)
+    assert len(text_gen.prompts) > 1 and described(summary)
+    assert summary.fields[0]["properties"]["description"] == "The model of a car"
+
+    text_gen.prompts.clear()
+    summary = manager.summarize(cars, summary_method="llm", enrich_protocol="delta")
+    assert text_gen.prompts == [delta_system_prompt] and described(summary)
+    # the local statistics are kept
+    assert summary.fields[2]["properties"]["max"] == 169
+
+
+def test_cached_enrichment(tmp_path):
+    text_gen = AnnotatingTextGenerator()
+    manager = Manager(text_gen=text_gen, annotation_cache=ColumnAnnotationCache(str(tmp_path)))
+    first = manager.summarize(cars, summary_method="llm")
+    assert len(text_gen.prompts) == 1 and described(first)
+
+    # the same schema again is annotated entirely from the cache
+    assert manager.summarize(cars, summary_method="llm").fields == first.fields
+    assert len(text_gen.prompts) == 1
+
+    # known columns in a new dataset: only the dataset description is requested
+    subset = manager.summarize(cars[["model", "price"]], summary_method="llm")
+    assert text_gen.prompts[1:] == [dataset_system_prompt] and described(subset)
+
+
+def test_association_scores():
+    import numpy as np
+
+    from lida.components.associations import compute_associations
+
+    rng = np.random.default_rng(0)
+    x = np.arange(200)
+    group = np.array(["a", "b", "c", "d"])[x % 4]
+    frame = pd.DataFrame({
+        "x": x, "double": 2 * x, "growth": np.exp(x / 20), "noise": rng.random(200),
+        "group": group, "level": pd.Series(group).map({"a": 1.0, "b": 5.0, "c": 2.0, "d": 9.0}),
+        "label": np.where(group == "a", "first", "other"), "coin": rng.choice(["heads", "tails"], 200),
+    })
+    fields = Summarizer().get_column_properties(frame)
+    scores = {tuple(pair["fields"]): (pair["measure"], pair["score"])
+              for pair in compute_associations(frame, fields, top_k=100)}
+
+    assert scores[("x", "double")] == ("pearson", 1.0)
+    # monotonic but not linear, so the rank correlation wins
+    assert scores[("x", "growth")] == ("spearman", 1.0)
+    assert scores[("group", "level")] == ("correlation_ratio", 1.0)
+    assert scores[("group", "label")] == ("cramers_v", 1.0)
+    # the score of a category-numeric pair is the correlation ratio, sqrt(between / total variance)
+    between = frame.groupby("label")["x"].transform("mean").var(ddof=0) / frame["x"].var(ddof=0)
+    assert scores[("label", "x")][1] == round(float(np.sqrt(between)), 3)
+    assert scores[("group", "coin")][1] < 0.3 and scores[("x", "noise")][1] < 0.3
+
+    top = compute_associations(frame, fields, top_k=3)
+    assert len(top) == 3 and [pair["score"] for pair in top] == [1.0, 1.0, 1.0]
@@ -0,0 +1,168 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from llmx import TextGenerationConfig, TextGenerationResponse
+
+from lida.components.limiter import (BATCH, RateLimitedTextGenerator, TokenBucket, llm_priority,
+                                     submit_in_context)
+from lida.components.registry import TextGeneratorRegistry
+from lida.components.router import RoutingTextGenerator
+
+
+class FakeBackend:
+    """Text generator answering with its name after `delay` seconds, or raising if failing"""
+
+    provider = "fake"
+
+    def __init__(self, name: str, delay: float = 0.0, failing: bool = False) -> None:
+        self.name = name
+        self.delay = delay
+        self.failing = failing
+        self.calls = 0
+        self.messages = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def generate(self, messages, config=TextGenerationConfig(), **kwargs) -> TextGenerationResponse:
+        with self._lock:
+            self.calls += 1
+            self.messages.append(messages)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.failing:
+                raise RuntimeError(f"{self.name} is down")
+            return TextGenerationResponse(text=[{"role": "assistant", "content": self.name}], config=config)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def answer(text_gen) -> str:
+    return text_gen.generate("hello").text[0]["content"]
+
+
+def test_router_prefers_fast_reliable_backends():
+    slow, fast = FakeBackend("slow", delay=0.05), FakeBackend("fast", delay=0.01)
+    router = RoutingTextGenerator([slow, fast])
+    # both get measured first, then the fast one is preferred
+    assert {answer(router) for _ in range(2)} == {"slow", "fast"}
+    assert [answer(router) for _ in range(3)] == ["fast"] * 3
+
+    # a fast backend failing most of the time is ranked behind a slower reliable one
+    router.backend_stats[1].outcomes.extend([True] * 99)
+    assert answer(router) == "slow"
+
+
+def test_router_hedges_from_call_start():
+    first, second = FakeBackend("first", delay=0.1), FakeBackend("second", delay=0.1)
+    router = RoutingTextGenerator([first, second], hedge_percentile=0.95, hedge_min_samples=1,
+                                  max_concurrency=1)
+    [answer(router) for _ in range(2)]
+    first.delay = second.delay = 0.05
+    # requests queued behind a busy worker are not hedged, however long they wait
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: answer(router), range(4)))
+    assert first.calls + second.calls == 6
+    stats = router.stats()
+    assert max(backend["p95_end_to_end_latency"] for backend in stats) > max(
+        backend["p95_latency"] for backend in stats) + 0.05
+
+
+def test_router_circuit_breaker():
+    flaky, steady = FakeBackend("flaky", failing=True), FakeBackend("steady", delay=0.01)
+    router = RoutingTextGenerator([flaky, steady], failure_threshold=1, cooldown=0.2)
+    # the failure fails over to the next backend and opens the circuit
+    assert [answer(router) for _ in range(4)] == ["steady"] * 4
+    assert flaky.calls == 1 and router.stats()[0]["circuit_open"]
+
+    # after the cooldown, concurrent requests send a single trial request to the half-open backend
+    time.sleep(0.25)
+    flaky.failing, flaky.delay = False, 0.2
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        answers = list(pool.map(lambda _: answer(router), range(4)))
+    assert sorted(answers) == ["flaky", "steady", "steady", "steady"]
+    assert flaky.calls == 2 and flaky.max_active == 1
+    assert not router.stats()[0]["circuit_open"]
+
+
+def test_router_all_circuits_open():
+    router = RoutingTextGenerator([FakeBackend("down", failing=True)], failure_threshold=1, cooldown=60)
+    with pytest.raises(RuntimeError, match="All text generation backends failed"):
+        router.generate("hello")
+    with pytest.raises(RuntimeError, match="circuit open"):
+        router.generate("hello")
+
+
+def test_router_count_tokens_fallback():
+    # backends without count_tokens (e.g. custom OpenAI compatible clients) fall back to an estimate
+    assert RoutingTextGenerator([FakeBackend("a")]).count_tokens("x" * 40) == 10
+
+
+def test_token_bucket_caps_bursts():
+    bucket = TokenBucket(per_minute=600, burst_seconds=0.5)
+    # a cold start may spend half a second of budget, not the whole minute
+    assert bucket.capacity == 5
+    for _ in range(5):
+        assert bucket.wait_time(1) == 0
+        bucket.consume(1)
+    assert bucket.wait_time(1) == pytest.approx(0.1, abs=0.02)
+
+
+def test_rate_limiter_spreads_requests():
+    backend = FakeBackend("a", delay=0.05)
+    limiter = RateLimitedTextGenerator(backend, rpm=600, max_in_flight=2, burst_seconds=0.5)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: answer(limiter), range(10)))
+    # five requests of burst, the other five at ten per second
+    assert time.monotonic() - start >= 0.45
+    assert backend.calls == 10 and backend.max_active <= 2
+    assert limiter.metrics()["calls"] == 10
+
+
+def test_rate_limiter_priority_in_pools():
+    backend = FakeBackend("a", delay=0.2)
+    limiter = RateLimitedTextGenerator(backend, max_in_flight=1)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(limiter.generate, "first")]
+        time.sleep(0.05)
+        # batch work fanned out to a pool keeps its priority in the workers
+        with llm_priority(BATCH):
+            futures += [submit_in_context(pool, limiter.generate, "batch") for _ in range(2)]
+        time.sleep(0.05)
+        futures.append(pool.submit(limiter.generate, "interactive"))
+        [future.result() for future in futures]
+    assert backend.messages == ["first", "interactive", "batch", "batch"]
+
+
+def test_rate_limiter_token_estimate():
+    limiter = RateLimitedTextGenerator(FakeBackend("a"), tpm=60000)
+    # the backend cannot count tokens, so about four characters per token are assumed
+    assert limiter.estimate_tokens("x" * 40, TextGenerationConfig(max_tokens=10, n=2)) == 30
+
+
+def test_registry_reuses_generators():
+    registry = TextGeneratorRegistry()
+    built = []
+
+    def factory():
+        time.sleep(0.1)
+        built.append(FakeBackend(f"backend {len(built)}"))
+        return built[-1]
+
+    # concurrent first requests for a key build a single generator
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        generators = list(pool.map(lambda _: registry.get("fake", "model", factory=factory), range(4)))
+    assert len(built) == 1 and all(generator is built[0] for generator in generators)
+    assert registry.get("fake", "model", factory=factory) is built[0]
+
+    # another endpoint is another key, a removed generator is rebuilt
+    assert registry.get("fake", "model", endpoint="http://localhost", factory=factory) is built[1]
+    registry.remove("fake", "model")
+    assert registry.get("fake", "model", factory=factory) is built[2]
+    assert len(registry) == 2
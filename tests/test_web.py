@@ -0,0 +1,83 @@
+import importlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+from llmx import TextGenerationConfig, TextGenerationResponse
+
+from lida.components.coalescer import CoalescingTextGenerator, request_key
+
+GOALS = json.dumps([{"index": 0, "question": "What is the distribution of Horsepower?",
+                     "visualization": "histogram of Horsepower", "rationale": ""}])
+
+
+class SlowTextGenerator:
+    provider = "fake"
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, messages, config=TextGenerationConfig(), **kwargs) -> TextGenerationResponse:
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.5)
+        return TextGenerationResponse(text=[{"role": "assistant", "content": GOALS}], config=config)
+
+
+def test_concurrent_goal_requests_coalesce(monkeypatch):
+    # the module creates a default text generator on import
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    web = importlib.import_module("lida.web.app")
+    text_gen = SlowTextGenerator()
+    monkeypatch.setattr(web.lida, "text_gen", CoalescingTextGenerator(text_gen))
+
+    request = {"summary": {"name": "cars", "file_name": "cars.csv", "dataset_description": "",
+                           "field_names": ["Horsepower"], "fields": []},
+               "n": 1, "textgen_config": {"n": 1, "temperature": 0}}
+    # a single event loop serves both requests, as in the server
+    with TestClient(web.app) as client, ThreadPoolExecutor(max_workers=2) as pool:
+        responses = list(pool.map(lambda _: client.post("/api/goal", json=request).json(), range(2)))
+
+    assert all(response["status"] for response in responses)
+    assert text_gen.calls == 1
+    assert web.lida.text_gen.coalesced == 1
+
+
+def test_coalescing_only_shares_cacheable_requests():
+    text_gen = CoalescingTextGenerator(SlowTextGenerator())
+    config = TextGenerationConfig(n=1, temperature=0, use_cache=False)
+    # independent samples, e.g. hedged candidates, all go upstream
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: text_gen.generate("plot the data", config=config), range(4)))
+    assert text_gen.text_gen.calls == 4 and text_gen.coalesced == 0
+
+    code = [{"role": "user", "content": "if x:\n    y = 1\nz = 2"}]
+    indented = [{"role": "user", "content": "if x:\n    y = 1\n    z = 2"}]
+    assert request_key(code, TextGenerationConfig()) != request_key(indented, TextGenerationConfig())
+
+
+def test_requests_pass_their_own_data(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    web = importlib.import_module("lida.web.app")
+    code = ("```\nimport matplotlib.pyplot as plt\ndef plot(data):\n    plt.hist(data['Horsepower'])\n"
+            "    return plt\n\nchart = plot(data)\n```")
+
+    class CodeTextGenerator(SlowTextGenerator):
+        def generate(self, messages, config=TextGenerationConfig(), **kwargs) -> TextGenerationResponse:
+            return TextGenerationResponse(text=[{"role": "assistant", "content": code}], config=config)
+
+    (tmp_path / "cars.csv").write_text("Horsepower\n130\n165\n")
+    monkeypatch.setattr(web, "data_folder", str(tmp_path))
+    monkeypatch.setattr(web.lida, "text_gen", CodeTextGenerator())
+    request = {"summary": {"name": "cars", "file_name": "cars.csv", "dataset_description": "",
+                           "field_names": ["Horsepower"], "fields": []},
+               "code": code, "instructions": ["add a title"], "library": "matplotlib",
+               "textgen_config": {"n": 1, "temperature": 0}}
+    with TestClient(web.app) as client:
+        response = client.post("/api/visualize/edit", json=request).json()
+
+    assert response["status"] and response["charts"][0]["status"]
+    assert web.lida.data is None